@@ -0,0 +1,270 @@
+# backend/analytics.py
+# Cross-asset risk analytics: correlation/covariance, volatility and beta on a
+# (dates x symbols) returns matrix aligned across mismatched exchange
+# calendars (US and .NS files trade on different holidays).
+#
+# Alignment: closes are placed on the union of all dates and forward-filled
+# from each symbol's first bar, so a holiday on one exchange shows up as a
+# zero return followed by the two-day move. A file that ends a few rows
+# before the newest date (a later close on another exchange, or a bar
+# ingested for one symbol) is carried forward up to MAX_STALE_BARS rows;
+# only a longer gap takes the symbol out of windows that reach the end. freq=weekly samples
+# the last close of each week instead, which removes most of that lag.
+#
+# The covariance of the whole universe is one BLAS matmul per (freq, window)
+# and is cached until any CSV changes; sub-universe, top-k and beta queries
+# are index lookups into the cached matrix.
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from executor import run_io
+from http_cache import cached_json_offload, combined_version
+from indicators import to_json_list
+from metrics import span
+from price_store import PriceSeries, store
+from resample import bucket_ids
+
+router = APIRouter(prefix="/api", tags=["analytics"])
+
+REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "5"))
+PERIODS_PER_YEAR = {"daily": 252, "weekly": 52}
+MAX_MATRIX = 200  # largest correlation matrix returned inline
+# (freq, window) matrices kept per universe; each holds S x S cov/corr plus returns
+MAX_STATS = int(os.getenv("ANALYTICS_CACHE_SIZE", "8"))
+# union-calendar rows a symbol's last close is carried past its final bar
+MAX_STALE_BARS = int(os.getenv("ANALYTICS_MAX_STALE_BARS", "5"))
+
+
+class AlignedCloses:
+    """Forward-filled closes on the union calendar of every series.
+
+    NaN before each symbol's first bar and more than MAX_STALE_BARS rows past
+    its last one.
+    """
+
+    def __init__(self, series: List[PriceSeries]):
+        self.key = tuple((s.symbol, s.version) for s in series)
+        self.symbols = [s.symbol.upper() for s in series]
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        series = [s for s in series if len(s)]
+        self.dates = np.unique(np.concatenate([s.t for s in series])) if series else np.empty(0, np.int64)
+        D, S = self.dates.shape[0], len(self.symbols)
+        P = np.full((D, S), np.nan)
+        first = np.zeros(S, dtype=np.int64)
+        last = np.full(S, -1, dtype=np.int64)
+        for s in series:
+            i = self.index[s.symbol.upper()]
+            pos = np.searchsorted(self.dates, s.t)
+            P[pos, i] = s.c
+            first[i], last[i] = pos[0], pos[-1]
+        # forward-fill: carry the index of the latest valid row down each column
+        rows = np.where(~np.isnan(P), np.arange(D)[:, None], 0)
+        np.maximum.accumulate(rows, axis=0, out=rows)
+        P = np.take_along_axis(P, rows, axis=0)
+        r = np.arange(D)[:, None]
+        P[(r < first[None, :]) | (r > last[None, :] + MAX_STALE_BARS)] = np.nan
+        self.closes = P
+        self._stats: "OrderedDict[Tuple[str, int], ReturnStats]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sampled(self, freq: str) -> np.ndarray:
+        if freq == "weekly" and self.dates.shape[0]:
+            ids = bucket_ids(self.dates, "1wk")
+            ends = np.concatenate((np.flatnonzero(np.diff(ids)), [ids.shape[0] - 1]))
+            return self.closes[ends]
+        return self.closes
+
+    def stats(self, freq: str, window: int) -> "ReturnStats":
+        """Cached ReturnStats; the least recently used beyond MAX_STATS are dropped."""
+        key = (freq, window)
+        with self._lock:
+            st = self._stats.get(key)
+            if st is None:
+                with span("analytics_matrix"):
+                    st = self._stats[key] = ReturnStats(self, freq, window)
+            self._stats.move_to_end(key)
+            while len(self._stats) > MAX_STATS:
+                self._stats.popitem(last=False)
+        return st
+
+
+class ReturnStats:
+    """Covariance/correlation of log returns over the last `window` periods.
+
+    Only symbols with a complete window are included; the rest are listed in
+    `excluded`.
+    """
+
+    def __init__(self, closes: AlignedCloses, freq: str, window: int):
+        P = closes.sampled(freq)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            R = np.diff(np.log(P), axis=0)[-window:]
+        complete = ~np.isnan(R).any(axis=0) if R.shape[0] >= 2 else np.zeros(R.shape[1], dtype=bool)
+        self.freq, self.window, self.periods = freq, window, int(R.shape[0])
+        self.symbols = [s for s, ok in zip(closes.symbols, complete) if ok]
+        self.excluded = [s for s, ok in zip(closes.symbols, complete) if not ok]
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        X = np.ascontiguousarray(R[:, complete])
+        self.returns = X
+        Xc = X - X.mean(axis=0)
+        self.cov = (Xc.T @ Xc) / max(1, X.shape[0] - 1)   # BLAS gemm/syrk
+        self.std = np.sqrt(np.diag(self.cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.corr = self.cov / np.outer(self.std, self.std)
+        np.fill_diagonal(self.corr, 1.0)
+
+    def select(self, symbols: List[str]) -> np.ndarray:
+        """Column indices for `symbols` (all when empty); 404 for names not in the matrix."""
+        if not symbols:
+            return np.arange(len(self.symbols))
+        missing = [s for s in symbols if s.upper() not in self.index]
+        if missing:
+            raise HTTPException(status_code=404,
+                                detail=f"Not in the {self.freq} {self.window}-period matrix (no data or short history): {missing}")
+        return np.array([self.index[s.upper()] for s in dict.fromkeys(symbols)], dtype=np.int64)
+
+    def rolling_vol(self, idx: np.ndarray, n: int) -> np.ndarray:
+        tail = self.returns[-n:, idx]
+        if tail.shape[0] < 2:
+            return np.full(idx.shape[0], np.nan)
+        return tail.std(axis=0, ddof=1) * np.sqrt(PERIODS_PER_YEAR[self.freq])
+
+    def beta(self, idx: np.ndarray, bench: np.ndarray) -> np.ndarray:
+        """Beta of each idx column against the equal-weight basket of `bench` columns.
+
+        cov(r_i, mean_j r_j) = mean_j cov_ij, so this only reads the cached matrix.
+        """
+        var_b = self.cov[np.ix_(bench, bench)].mean()
+        if var_b <= 0:
+            return np.full(idx.shape[0], np.nan)
+        return self.cov[np.ix_(idx, bench)].mean(axis=1) / var_b
+
+
+_closes: Optional[AlignedCloses] = None
+_checked_at = 0.0
+_build_lock = threading.Lock()
+
+def get_closes() -> AlignedCloses:
+    """Current aligned universe; files are re-checked at most every REFRESH_SECONDS."""
+    global _closes, _checked_at
+    if _closes is not None and time.monotonic() - _checked_at < REFRESH_SECONDS:
+        return _closes
+    with _build_lock:
+        if _closes is None or time.monotonic() - _checked_at >= REFRESH_SECONDS:
+            series = store.all_series()
+            key = tuple((s.symbol, s.version) for s in series)
+            if _closes is None or _closes.key != key:
+                with span("analytics_align"):
+                    _closes = AlignedCloses(series)
+            _checked_at = time.monotonic()
+        return _closes
+
+
+def _universe_version(closes: AlignedCloses) -> Tuple[int, int]:
+    return combined_version(closes.key, store.dir_version()[0])
+
+def _matrix(M: np.ndarray) -> List[list]:
+    return [to_json_list(row) for row in np.round(M, 6)]
+
+
+@router.get("/analytics/correlation")
+async def correlation(
+    request: Request,
+    symbols: List[str] = Query([], description="Sub-universe (default: every symbol with a full window)"),
+    window: int = Query(252, ge=5, le=5000, description="Number of return periods"),
+    freq: str = Query("daily", pattern="^(daily|weekly)$"),
+    covariance: bool = Query(False, description="Also return the covariance matrix"),
+):
+    closes = await run_io(get_closes)
+
+    def build():
+        st = closes.stats(freq, window)
+        idx = st.select(symbols)
+        if idx.shape[0] > MAX_MATRIX:
+            raise HTTPException(status_code=400,
+                                detail=f"{idx.shape[0]} symbols; pass at most {MAX_MATRIX} or use /api/analytics/correlated")
+        sub = np.ix_(idx, idx)
+        out = {"freq": freq, "window": window, "periods": st.periods,
+               "symbols": [st.symbols[i] for i in idx], "correlation": _matrix(st.corr[sub])}
+        if covariance:
+            out["covariance"] = st.cov[sub].tolist()
+        if not symbols:
+            out["excluded"] = st.excluded
+        return out
+
+    return await cached_json_offload(request, _universe_version(closes), build)
+
+
+@router.get("/analytics/correlated")
+async def correlated(
+    request: Request,
+    symbol: str = Query(...),
+    k: int = Query(10, ge=1, le=500),
+    window: int = Query(252, ge=5, le=5000),
+    freq: str = Query("daily", pattern="^(daily|weekly)$"),
+    least: bool = Query(False, description="Most negatively correlated names instead"),
+):
+    """Top-k names by return correlation with `symbol` (one row of the cached matrix)."""
+    closes = await run_io(get_closes)
+
+    def build():
+        st = closes.stats(freq, window)
+        i = int(st.select([symbol])[0])
+        row = st.corr[i].copy()
+        row[i] = np.nan
+        order = np.argsort(np.where(np.isnan(row), np.inf, row if least else -row), kind="stable")[:k]
+        order = order[~np.isnan(row[order])]
+        return {"symbol": symbol.upper(), "freq": freq, "window": window, "periods": st.periods,
+                "results": [{"symbol": st.symbols[j], "correlation": float(row[j])} for j in order]}
+
+    return await cached_json_offload(request, _universe_version(closes), build)
+
+
+@router.get("/analytics/risk")
+async def risk(
+    request: Request,
+    symbols: List[str] = Query([], description="Names to report (default: every symbol with a full window)"),
+    benchmark: List[str] = Query([], description="Beta reference: one symbol, or several for an equal-weight basket"),
+    suffix: Optional[str] = Query(None, description="Restrict to names ending with this, e.g. .NS"),
+    window: int = Query(252, ge=5, le=5000),
+    freq: str = Query("daily", pattern="^(daily|weekly)$"),
+):
+    """Annualized volatility (window, 20 and 60 periods) and beta per symbol.
+
+    Without `benchmark`, beta is measured against the equal-weight basket
+    of the reported names.
+    """
+    closes = await run_io(get_closes)
+
+    def build():
+        st = closes.stats(freq, window)
+        idx = st.select(symbols)
+        if suffix:
+            idx = np.array([i for i in idx if st.symbols[i].endswith(suffix.upper())], dtype=np.int64)
+        if idx.shape[0] == 0:
+            raise HTTPException(status_code=404, detail="No symbols with a full window match the query")
+        bench = st.select(benchmark) if benchmark else idx
+        ann = np.sqrt(PERIODS_PER_YEAR[freq])
+        cols = {
+            "vol": st.std[idx] * ann,
+            "vol_20": st.rolling_vol(idx, 20),
+            "vol_60": st.rolling_vol(idx, 60),
+            "beta": st.beta(idx, bench),
+        }
+        rows = [{"symbol": st.symbols[i]} for i in idx]
+        for name, col in cols.items():
+            for row, v in zip(rows, to_json_list(col)):
+                row[name] = v
+        return {"freq": freq, "window": window, "periods": st.periods,
+                "benchmark": [st.symbols[i] for i in bench] if benchmark else "equal_weight",
+                "results": rows}
+
+    return await cached_json_offload(request, _universe_version(closes), build)
@@ -0,0 +1,323 @@
+# backend/backtest.py
+# Vectorized backtests of the dashboard's signals over backend/data.
+#
+# A strategy maps a series to a target position per bar (decided at that
+# bar's close); simulate() turns positions into net returns with fills,
+# fees and sizing, and summarize() reduces them to equity/drawdown/Sharpe/
+# hit rate. Everything is whole-array NumPy: no per-bar Python loop.
+#
+#   POST /api/backtest         one strategy, one or many symbols, equity curves
+#   POST /api/backtest/sweep   parameter grid x symbols, spread over the shared process pool
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, Body, HTTPException, Request
+from pydantic import BaseModel, Field
+
+from catalog import catalog
+from executor import CPU_WORKERS, run_cpu, run_io
+from http_cache import respond
+from indicators import linear_forecast, linear_slope, sma
+from metrics import span
+from price_store import PriceSeries, period_bounds, store, to_epoch_ms
+from resample import lttb
+
+router = APIRouter(prefix="/api", tags=["backtest"])
+
+TRADING_DAYS = 252
+SWEEP_MAX_COMBOS = 500
+INLINE_MAX_RUNS = 200  # sweeps smaller than this (symbols x combos) skip the pool
+
+
+# --- Strategies: series -> target position in [-1, 1] at each bar's close ---
+def sma_cross(s: PriceSeries, fast: int = 20, slow: int = 50, allow_short: bool = False) -> np.ndarray:
+    f, sl = sma(s.c, fast), sma(s.c, slow)
+    with np.errstate(invalid="ignore"):
+        pos = np.where(f > sl, 1.0, -1.0 if allow_short else 0.0)
+    pos[np.isnan(sl)] = 0.0
+    return pos
+
+def heuristic_trend(s: PriceSeries, allow_short: bool = False) -> np.ndarray:
+    """chatbot._heuristic_trend evaluated at every bar over all history up to it."""
+    c = s.c
+    n = np.arange(1, c.shape[0] + 1)
+    s20, s50, s200 = sma(c, 20), sma(c, 50), sma(c, 200)
+    slope20 = np.nan_to_num(linear_slope(c, 20))
+    slope50 = np.nan_to_num(linear_slope(c, 50))
+    with np.errstate(invalid="ignore"):
+        checks = [
+            (c > s20, ~np.isnan(s20)),
+            (s20 > s50, ~np.isnan(s50)),
+            (s50 > s200, ~np.isnan(s200)),
+            (slope20 > 0, np.ones(c.shape[0], dtype=bool)),
+            (slope50 >= 0, n >= 50),
+        ]
+    score = sum(np.where(used, np.where(ok, 1, -1), 0) for ok, used in checks)
+    need = np.ceil(sum(used.astype(np.int64) for _, used in checks) * 0.6)
+    pos = np.where(score >= need, 1.0, np.where((score <= -need) & allow_short, -1.0, 0.0))
+    pos[n < 20] = 0.0
+    return pos
+
+def forecast_signal(s: PriceSeries, window: int = 60, threshold_pct: float = 0.0,
+                    allow_short: bool = False) -> np.ndarray:
+    """Long when the linear-fit next-day forecast is above the close by more than threshold_pct."""
+    edge = (linear_forecast(s.c, window) / s.c - 1.0) * 100.0
+    with np.errstate(invalid="ignore"):
+        pos = np.where(edge > threshold_pct, 1.0,
+                       np.where((edge < -threshold_pct) & allow_short, -1.0, 0.0))
+    pos[np.isnan(edge)] = 0.0
+    return pos
+
+STRATEGIES = {
+    "sma_cross": (sma_cross, {"fast": 20, "slow": 50}),
+    "heuristic_trend": (heuristic_trend, {}),
+    "forecast": (forecast_signal, {"window": 60, "threshold_pct": 0.0}),
+}
+
+
+def _shift(x: np.ndarray, k: int) -> np.ndarray:
+    out = np.zeros_like(x)
+    out[k:] = x[:-k]
+    return out
+
+def simulate(s: PriceSeries, target: np.ndarray, start: int = 0, end: Optional[int] = None,
+             fill: str = "next_open", fee_bps: float = 0.0, sizing: str = "fixed", size: float = 1.0,
+             target_vol: float = 0.15, max_leverage: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """(position, net return) per bar of s[start:end], starting flat at `start`.
+
+    fill="close" trades at the signal bar's close; "next_open" at the next
+    bar's open, so the gap from close to open is still earned by the old
+    position. Fees are fee_bps per unit of position traded.
+    """
+    end = len(s) if end is None else end
+    c, o = s.c[start:end], s.o[start:end]
+    pos = target[start:end] * size
+    if sizing == "vol_target":
+        # scale by target / realized 20-bar volatility (annualized), known at each close
+        full_c = s.c[:end]
+        ret = np.concatenate(([0.0], full_c[1:] / full_c[:-1] - 1.0))
+        vol = np.sqrt(np.maximum(sma(ret * ret, 20) - sma(ret, 20) ** 2, 0.0) * TRADING_DAYS)[start:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(vol > 0, np.minimum(max_leverage, target_vol / vol), 0.0)
+        pos = pos * np.nan_to_num(scale)
+    prev_c = np.concatenate(([c[0]], c[:-1])) if c.shape[0] else c
+    traded = np.abs(np.diff(pos, prepend=0.0))
+    fees = fee_bps / 1e4
+    if fill == "close":
+        net = _shift(pos, 1) * (c / prev_c - 1.0) - traded * fees
+    else:
+        gap, intra = o / prev_c - 1.0, c / o - 1.0
+        net = (1.0 + _shift(pos, 2) * gap) * (1.0 + _shift(pos, 1) * intra) - 1.0 - _shift(traded, 1) * fees
+    return pos, net
+
+def summarize(pos: np.ndarray, net: np.ndarray, fill: str = "next_open") -> dict:
+    """Scalar performance metrics for one simulated run."""
+    n = net.shape[0]
+    if n < 2:
+        return {"total_return": 0.0, "cagr": None, "sharpe": None, "max_drawdown": 0.0,
+                "hit_rate": None, "trades": 0, "exposure": 0.0}
+    log_eq = np.cumsum(np.log1p(net))
+    equity = np.exp(log_eq)
+    dd = equity / np.maximum.accumulate(equity) - 1.0
+    sd = float(net[1:].std())
+    # trades = runs of constant position sign decided at bars a..b-1; with fills
+    # delayed by lag-1 bars their fees and returns land on bars a+lag-1 .. b+lag-1
+    sign = np.sign(pos)
+    edges = np.flatnonzero(np.diff(sign, prepend=0.0, append=0.0))
+    runs = [(a, b) for a, b in zip(edges[:-1], edges[1:]) if sign[a] != 0]
+    lag = 1 if fill == "close" else 2
+    lo = np.minimum(np.array([a for a, _ in runs], dtype=np.int64) + lag - 1, n - 1)
+    hi = np.minimum(np.array([b for _, b in runs], dtype=np.int64) + lag - 1, n - 1)
+    padded = np.concatenate(([0.0], log_eq))
+    trade_ret = np.expm1(padded[hi + 1] - padded[lo]) if runs else np.empty(0)
+    return {
+        "total_return": float(equity[-1] - 1.0),
+        "cagr": float(equity[-1] ** (TRADING_DAYS / n) - 1.0) if equity[-1] > 0 else None,
+        "sharpe": float(net[1:].mean() / sd * np.sqrt(TRADING_DAYS)) if sd > 0 else None,
+        "max_drawdown": float(dd.min()),
+        "hit_rate": float((trade_ret > 0).mean()) if trade_ret.shape[0] else None,
+        "trades": int(trade_ret.shape[0]),
+        "exposure": float((pos != 0).mean()),
+    }
+
+
+def run(s: PriceSeries, strategy: str, params: dict, cfg: dict, start: int = 0, end: Optional[int] = None,
+        curve: bool = True, max_points: Optional[int] = None) -> dict:
+    """Backtest one symbol; signals use all history, performance only bars start..end-1."""
+    fn, _ = STRATEGIES[strategy]
+    target = fn(s, **params, allow_short=cfg.get("allow_short", False))
+    sim = {k: v for k, v in cfg.items() if k != "allow_short"}
+    pos, net = simulate(s, target, start, end, **sim)
+    out = {"symbol": s.symbol.upper(), "bars": int(net.shape[0]), "metrics": summarize(pos, net, cfg.get("fill", "next_open"))}
+    if curve and net.shape[0]:
+        equity = np.exp(np.cumsum(np.log1p(net)))
+        t = s.t[start:start + net.shape[0]]
+        idx = lttb(t, equity, max_points) if max_points and net.shape[0] > max_points else slice(None)
+        out["curve"] = {
+            "t": t[idx].tolist(),
+            "equity": equity[idx].tolist(),
+            "drawdown": (equity / np.maximum.accumulate(equity) - 1.0)[idx].tolist(),
+            "position": pos[idx].tolist(),
+        }
+    return out
+
+
+# --- Parameter sweeps ---
+def expand_grid(strategy: str, grid: Dict[str, List[float]]) -> List[dict]:
+    defaults = STRATEGIES[strategy][1]
+    names = list(grid)
+    combos = [dict(defaults, **dict(zip(names, vals))) for vals in itertools.product(*(grid[k] for k in names))]
+    if strategy == "sma_cross":
+        combos = [p for p in combos if p["fast"] < p["slow"]]
+    for p in combos:
+        for k in ("fast", "slow", "window"):
+            if k in p:
+                p[k] = int(p[k])
+    return combos
+
+def sweep_chunk(symbols: List[str], strategy: str, combos: List[dict], cfg: dict,
+                period: str, start_ms: Optional[int], end_ms: Optional[int]) -> List[tuple]:
+    """Worker task: (symbol, combo index, metrics) for every pair; no curves."""
+    rows = []
+    for sym in symbols:
+        try:
+            s = store.get(sym)
+        except HTTPException:
+            continue
+        i, j = period_bounds(s, period, start_ms, end_ms)
+        if j - i < 2:
+            continue
+        for k, params in enumerate(combos):
+            rows.append((s.symbol.upper(), k, run(s, strategy, params, cfg, i, j, curve=False)["metrics"]))
+    return rows
+
+# --- API ---
+class BacktestConfig(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, max_length=100)
+    strategy: str = Field("sma_cross", pattern="^(sma_cross|heuristic_trend|forecast)$")
+    period: str = "max"
+    start: Optional[date] = None  # overrides period
+    end: Optional[date] = None
+    fill: str = Field("next_open", pattern="^(next_open|close)$")
+    fee_bps: float = Field(5.0, ge=0, le=1000)
+    sizing: str = Field("fixed", pattern="^(fixed|vol_target)$")
+    size: float = Field(1.0, gt=0, le=10)
+    target_vol: float = Field(0.15, gt=0, le=5)
+    max_leverage: float = Field(1.0, gt=0, le=10)
+    allow_short: bool = False
+
+    def sim(self) -> dict:
+        return {"fill": self.fill, "fee_bps": self.fee_bps, "sizing": self.sizing, "size": self.size,
+                "target_vol": self.target_vol, "max_leverage": self.max_leverage, "allow_short": self.allow_short}
+
+    def bounds_ms(self) -> Tuple[Optional[int], Optional[int]]:
+        return (to_epoch_ms(self.start) if self.start else None, to_epoch_ms(self.end) if self.end else None)
+
+class BacktestRequest(BacktestConfig):
+    params: Dict[str, float] = Field(default_factory=dict)
+    curve: bool = True
+    max_points: Optional[int] = Field(500, ge=3, le=100_000)
+
+class SweepRequest(BacktestConfig):
+    symbols: List[str] = Field(default_factory=list, max_length=20_000)  # empty = every symbol
+    grid: Dict[str, List[float]] = Field(..., description='e.g. {"fast": [10, 20], "slow": [50, 100, 200]}')
+    rank_by: str = Field("sharpe", pattern="^(sharpe|total_return|cagr|max_drawdown|hit_rate)$")
+    top: int = Field(20, ge=1, le=SWEEP_MAX_COMBOS)
+
+WINDOW_PARAMS = ("fast", "slow", "window")
+
+def _check_params(strategy: str, grid: Dict[str, List[float]]) -> None:
+    """400 unless every name belongs to the strategy and every window value is usable."""
+    allowed = STRATEGIES[strategy][1]
+    unknown = sorted(set(grid) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown parameter(s) {unknown} for {strategy}; allowed: {sorted(allowed)}")
+    for name in WINDOW_PARAMS:
+        bad = [v for v in grid.get(name, []) if not (float(v).is_integer() and v >= 2)]
+        if bad:
+            raise HTTPException(status_code=400, detail=f"{name} must be an integer >= 2, got {bad}")
+    if strategy == "sma_cross":
+        fast, slow = grid.get("fast", [allowed["fast"]]), grid.get("slow", [allowed["slow"]])
+        if fast and slow and not any(f < s for f in fast for s in slow):
+            raise HTTPException(status_code=400, detail="fast must be smaller than slow")
+
+def _mean(values) -> Optional[float]:
+    vals = [v for v in values if v is not None]
+    return float(np.mean(vals)) if vals else None
+
+def run_backtest(req: BacktestRequest, params: dict) -> dict:
+    start_ms, end_ms = req.bounds_ms()
+    results, errors = [], {}
+    with span("backtest"):
+        for sym in dict.fromkeys(req.symbols):
+            try:
+                s = store.get(sym)
+            except HTTPException as e:
+                errors[sym] = e.detail
+                continue
+            i, j = period_bounds(s, req.period, start_ms, end_ms)
+            results.append(run(s, req.strategy, params, req.sim(), i, j, req.curve, req.max_points))
+    summary = {k: _mean(r["metrics"][k] for r in results)
+               for k in ("total_return", "cagr", "sharpe", "max_drawdown", "hit_rate")}
+    return {"strategy": req.strategy, "params": params, "config": req.sim(),
+            "summary": summary, "results": results, "errors": errors}
+
+@router.post("/backtest")
+async def backtest(request: Request, req: BacktestRequest = Body(...)):
+    grid = {k: [v] for k, v in req.params.items()}
+    _check_params(req.strategy, grid)
+    params = expand_grid(req.strategy, grid)
+    return await run_io(lambda: respond(request, run_backtest(req, params[0])))
+
+@router.post("/backtest/sweep")
+async def backtest_sweep(req: SweepRequest = Body(...)):
+    """Grid search: every parameter combination on every symbol, ranked by the mean metric."""
+    _check_params(req.strategy, req.grid)
+    combos = expand_grid(req.strategy, req.grid)
+    if not combos:
+        raise HTTPException(status_code=400, detail="Empty grid")
+    if len(combos) > SWEEP_MAX_COMBOS:
+        raise HTTPException(status_code=400, detail=f"Grid has {len(combos)} combinations (max {SWEEP_MAX_COMBOS})")
+    symbols = list(dict.fromkeys(req.symbols)) or catalog.symbols()
+    start_ms, end_ms = req.bounds_ms()
+    args = (req.strategy, combos, req.sim(), req.period, start_ms, end_ms)
+    t0 = time.perf_counter()
+    if len(symbols) * len(combos) <= INLINE_MAX_RUNS or CPU_WORKERS == 1:
+        rows = await run_io(sweep_chunk, symbols, *args)
+        workers = 1
+    else:
+        workers = min(CPU_WORKERS, len(symbols))
+        chunks = [symbols[k::workers * 4] for k in range(workers * 4)]  # a few chunks per worker to balance
+        parts = await asyncio.gather(*(run_cpu(sweep_chunk, ch, *args) for ch in chunks if ch))
+        rows = [r for part in parts for r in part]
+
+    by_combo: Dict[int, List[dict]] = {}
+    best: Dict[str, Tuple[int, float]] = {}
+    # higher is better for every metric; max_drawdown is a negative fraction, so the shallowest ranks first
+    for sym, k, m in rows:
+        by_combo.setdefault(k, []).append(m)
+        v = m[req.rank_by]
+        if v is not None and (sym not in best or v > best[sym][1]):
+            best[sym] = (k, v)
+    table = []
+    for k, ms in by_combo.items():
+        row = {"params": combos[k], "symbols": len(ms)}
+        for key in ("sharpe", "total_return", "cagr", "max_drawdown", "hit_rate"):
+            row[f"mean_{key}"] = _mean(m[key] for m in ms)
+        row["median_total_return"] = float(np.median([m["total_return"] for m in ms]))
+        table.append(row)
+    rank = f"mean_{req.rank_by}"
+    table.sort(key=lambda r: -np.inf if r[rank] is None else r[rank], reverse=True)
+    return {
+        "strategy": req.strategy, "config": req.sim(), "combos": len(combos), "symbols": len(symbols),
+        "runs": len(rows), "workers": workers, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "ranking": table[:req.top],
+        "best_by_symbol": {sym: {"params": combos[k], req.rank_by: v} for sym, (k, v) in sorted(best.items())},
+    }
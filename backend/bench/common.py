@@ -0,0 +1,62 @@
+# backend/bench/common.py
+# Shared helpers: run metadata and JSON result files that bench.compare can diff.
+from __future__ import annotations
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))  # so "import main" works from any cwd
+
+
+def git_rev() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentiles(samples_s, ps=(50, 95, 99)) -> Dict[str, float]:
+    if not len(samples_s):
+        return {f"p{p}_ms": None for p in ps}
+    arr = np.asarray(samples_s) * 1000.0
+    return {f"p{p}_ms": round(float(np.percentile(arr, p)), 4) for p in ps}
+
+
+def save(path: Path | None, kind: str, results: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    doc = {
+        "kind": kind,
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": git_rev(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "data_dir": os.getenv("DATA_DIR") or str(BACKEND_DIR / "data"),
+        },
+        "params": params,
+        "results": results,
+    }
+    text = json.dumps(doc, indent=2)
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return doc
@@ -0,0 +1,46 @@
+# backend/bench/compare.py
+# Diff two result files from bench.micro or bench.load and flag regressions.
+#
+#   python -m bench.compare results/before.json results/after.json --threshold 10
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# metric -> True when larger is better
+METRICS = {"best_us": False, "median_us": False, "p50_ms": False, "p95_ms": False,
+           "p99_ms": False, "throughput_rps": True}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare two benchmark result files")
+    ap.add_argument("before", type=Path)
+    ap.add_argument("after", type=Path)
+    ap.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    args = ap.parse_args()
+    a = json.loads(args.before.read_text())
+    b = json.loads(args.after.read_text())
+    if a.get("kind") != b.get("kind"):
+        sys.exit(f"cannot compare {a.get('kind')} with {b.get('kind')}")
+
+    regressions = 0
+    for case, old in a["results"].items():
+        new = b["results"].get(case)
+        if not isinstance(old, dict) or not isinstance(new, dict):
+            continue
+        for metric, higher_better in METRICS.items():
+            x, y = old.get(metric), new.get(metric)
+            if not x or y is None:
+                continue
+            change = (y - x) / x * 100
+            worse = -change if higher_better else change
+            flag = "REGRESSION" if worse > args.threshold else ("improved" if worse < -args.threshold else "")
+            regressions += flag == "REGRESSION"
+            print(f"{case:28s} {metric:15s} {x:>12.3f} -> {y:>12.3f}  {change:+7.1f}%  {flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# backend/bench/ingest.py
+# Throughput test for POST /api/bars: concurrent writers append batches of
+# new bars across the universe while readers poll /api/quote, against one
+# uvicorn worker. Bars go to a temporary BARS_DIR, so backend/bars is
+# untouched.
+#
+#   python -m bench.ingest --writers 4 --symbols 80 --bars 25 --duration 10
+#
+# Reports accepted bars per second, batch latency, and how long a new bar
+# takes to show up in /api/quote.
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from bench.common import peak_rss_mb, percentiles, save
+from bench.load import start_stub
+
+DAY_MS = 86_400_000
+
+
+async def drive(base_url, symbols, last_t, writers, bars, duration):
+    import httpx
+    batch_lat, visible_lat = [], []
+    counts = {"accepted": 0, "rejected": 0, "errors": 0}
+    stop_at = time.perf_counter() + duration
+    next_t = dict(last_t)
+    lock = asyncio.Lock()
+
+    async def writer(client, k):
+        mine = symbols[k::writers]
+        while time.perf_counter() < stop_at:
+            async with lock:
+                body = {}
+                for sym in mine:
+                    t = [next_t[sym] + (i + 1) * DAY_MS for i in range(bars)]
+                    next_t[sym] = t[-1]
+                    px = [100.0 + i * 0.01 for i in range(bars)]
+                    body[sym] = {"t": t, "o": px, "h": px, "l": px, "c": px, "v": [1000.0] * bars}
+            t0 = time.perf_counter()
+            try:
+                r = await client.post("/api/bars", json={"bars": body})
+                out = r.json()
+                counts["accepted"] += out["accepted"]
+                counts["rejected"] += out["rejected"]
+            except Exception:
+                counts["errors"] += 1
+                continue
+            batch_lat.append(time.perf_counter() - t0)
+            # read-after-write: the quote for one of the symbols must already include the batch
+            sym = mine[0]
+            t1 = time.perf_counter()
+            q = await client.get("/api/quote", params={"symbol": sym})
+            if q.status_code == 200:
+                visible_lat.append(time.perf_counter() - t1)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(writer(client, k) for k in range(writers)))
+        elapsed = time.perf_counter() - t0
+        stats = (await client.get("/api/metrics")).json()["counters"].get("ingest", {})
+    return batch_lat, visible_lat, counts, elapsed, stats
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Throughput test for POST /api/bars")
+    ap.add_argument("--writers", type=int, default=4, help="concurrent clients, each owning a slice of the symbols")
+    ap.add_argument("--symbols", type=int, default=80)
+    ap.add_argument("--bars", type=int, default=25, help="bars per symbol per batch")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds")
+    ap.add_argument("--out", type=Path)
+    args = ap.parse_args()
+
+    os.environ["BARS_DIR"] = tempfile.mkdtemp(prefix="bench-bars-")
+    os.environ.setdefault("COMPACT_SECONDS", "2")
+    import main as app_main
+    from price_store import store
+    symbols = app_main.available_symbols()[:max(1, args.symbols)]
+    last_t = {sym: int(store.get(sym).t[-1]) for sym in symbols}
+    port = start_stub("main:app")
+    batch_lat, visible_lat, counts, elapsed, stats = asyncio.run(drive(
+        f"http://127.0.0.1:{port}", symbols, last_t, max(1, min(args.writers, len(symbols))),
+        args.bars, args.duration,
+    ))
+
+    results = {
+        "batch": {"requests": len(batch_lat), **percentiles(batch_lat)},
+        "quote_after_write": {"requests": len(visible_lat), **percentiles(visible_lat)},
+        "bars": {"accepted": counts["accepted"], "rejected": counts["rejected"], "errors": counts["errors"],
+                 "throughput_bars_per_s": round(counts["accepted"] / elapsed, 1)},
+        "compactions": stats.get("compactions"),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    for name in ("batch", "quote_after_write"):
+        r = results[name]
+        print(f"{name:18s} n={r['requests']:<6d} p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms")
+    b = results["bars"]
+    print(f"bars               {b['accepted']} accepted, {b['throughput_bars_per_s']} /s, rejected {b['rejected']}, "
+          f"errors {b['errors']}, compactions {results['compactions']}")
+    save(args.out, "ingest", results, {
+        "writers": args.writers, "symbols": len(symbols), "bars": args.bars, "duration": args.duration,
+    })
+
+
+if __name__ == "__main__":
+    main()
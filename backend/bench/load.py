@@ -0,0 +1,146 @@
+# backend/bench/load.py
+# In-process load driver: the app runs on an httpx ASGI transport (no
+# sockets), while the LLM and RSS dependencies are replaced by the local
+# stubs in stubs/, started on background threads.
+#
+#   python -m bench.load --concurrency 32 --duration 20 --out results/load.json
+#   DATA_DIR=/tmp/synth python -m bench.load ...      # against synthetic data
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from bench.common import peak_rss_mb, percentiles, save
+
+ENDPOINTS = ("history", "quote", "trend_ai", "news_summarize")
+PERIODS = ("1mo", "3mo", "6mo", "1y", "2y", "5y", "max")
+HEADLINE_POOL = [
+    "{s} beats estimates as revenue grows", "{s} shares fall on weak guidance",
+    "Analysts upgrade {s} after strong quarter", "{s} faces regulatory probe",
+    "{s} announces buyback", "{s} trading flat ahead of results",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub(app_path: str) -> int:
+    """Run a stub ASGI app with uvicorn on a daemon thread; returns its port."""
+    import uvicorn
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app_path, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError(f"stub {app_path} did not start")
+        time.sleep(0.05)
+    return port
+
+
+def make_request(endpoint: str, symbols: list[str], rng: random.Random):
+    sym = rng.choice(symbols)
+    if endpoint == "history":
+        return "GET", "/api/history", {"params": {"symbol": sym, "period": rng.choice(PERIODS)}}
+    if endpoint == "quote":
+        return "GET", "/api/quote", {"params": {"symbol": sym}}
+    if endpoint == "trend_ai":
+        return "GET", "/api/trend_ai", {"params": {"symbol": sym, "period": rng.choice(PERIODS)}}
+    items = [{"title": h.format(s=sym)} for h in rng.sample(HEADLINE_POOL, 3)]
+    return "POST", "/api/news_summarize", {"json": {"symbol": sym, "items": items}}
+
+
+async def drive(app, lifespan, endpoints, symbols, concurrency, duration, seed):
+    import httpx
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    stop_at = time.perf_counter() + duration
+
+    async def worker(i: int, client):
+        rng = random.Random(seed + i)
+        while time.perf_counter() < stop_at:
+            ep = rng.choice(endpoints)
+            method, url, kw = make_request(ep, symbols, rng)
+            t0 = time.perf_counter()
+            try:
+                resp = await client.request(method, url, **kw)
+                ok = resp.status_code < 400
+            except Exception:
+                ok = False
+            if ok:
+                latencies[ep].append(time.perf_counter() - t0)
+            else:
+                errors[ep] += 1
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker(i, client) for i in range(concurrency)))
+            elapsed = time.perf_counter() - t0
+    return latencies, errors, elapsed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="In-process load test for the backend API")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds")
+    ap.add_argument("--endpoints", nargs="*", default=list(ENDPOINTS), choices=ENDPOINTS)
+    ap.add_argument("--symbols", type=int, default=0, help="limit to the first N symbols (0 = all)")
+    ap.add_argument("--llm-delay-ms", type=float, default=200.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", type=Path)
+    args = ap.parse_args()
+
+    # stubs must be up and configured before main (and its clients) are imported
+    os.environ["STUB_LLM_DELAY_MS"] = str(args.llm_delay_ms)
+    llm_port = start_stub("stubs.llm_stub:app")
+    rss_port = start_stub("stubs.rss_stub:app")
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{llm_port}"
+    os.environ["GROQ_API_KEY"] = "stub"
+    os.environ["NEWS_FEED_BASE"] = f"http://127.0.0.1:{rss_port}/rss/search"
+
+    import main as app_main
+    symbols = app_main.available_symbols()
+    if args.symbols:
+        symbols = symbols[:args.symbols]
+
+    latencies, errors, elapsed = asyncio.run(drive(
+        app_main.app, app_main.lifespan, args.endpoints, symbols, args.concurrency, args.duration, args.seed,
+    ))
+
+    results = {}
+    total = 0
+    for ep in args.endpoints:
+        lat = latencies.get(ep, [])
+        total += len(lat)
+        results[ep] = {"requests": len(lat), "errors": errors.get(ep, 0),
+                       "throughput_rps": round(len(lat) / elapsed, 2), **percentiles(lat)}
+    every = [x for ep in args.endpoints for x in latencies.get(ep, [])]
+    results["all"] = {"requests": total, "errors": sum(errors.values()),
+                      "throughput_rps": round(total / elapsed, 2), **percentiles(every)}
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+
+    for name, r in results.items():
+        if isinstance(r, dict):
+            print(f"{name:16s} {r['requests']:>7d} req  {r['throughput_rps']:>9.1f} rps  "
+                  f"p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms  errors {r['errors']}")
+    print(f"peak RSS {results['peak_rss_mb']} MB")
+    save(args.out, "load", results, {
+        "concurrency": args.concurrency, "duration": args.duration, "endpoints": args.endpoints,
+        "symbols": len(symbols), "llm_delay_ms": args.llm_delay_ms, "seed": args.seed,
+    })
+
+
+if __name__ == "__main__":
+    main()
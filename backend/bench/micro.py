@@ -0,0 +1,100 @@
+# backend/bench/micro.py
+# Microbenchmarks for the hot paths behind /api/history, /api/quote and
+# /api/trend_ai. Each case runs `repeat` rounds of `number` calls and
+# reports the best and median time per call.
+#
+#   python -m bench.micro --symbol TCS.NS --out results/micro.json
+from __future__ import annotations
+
+import argparse
+import timeit
+from pathlib import Path
+
+from bench.common import save
+
+import numpy as np
+
+
+def cases(symbol: str):
+    import main
+    import chatbot
+    import forecast
+    import indicators
+    import price_store
+    import sentiment
+    from http_cache import compress, encode_json
+
+    store = price_store.store
+    full = store.get(symbol)
+    disp = price_store.slice_period(full, "max")
+    closes = disp.c.tolist()
+    path = price_store.symbol_to_path(symbol, store.data_dir)
+    version = full.version
+    payload = main.build_history(full, symbol, "max")
+    columnar = main.build_history(full, symbol, "max", "columnar")
+    body = encode_json(payload)
+    fresh = indicators.IndicatorEngine()
+
+    def cold_indicators():
+        fresh._entries.clear()
+        fresh.sma(full, 20), fresh.ema(full, 20)
+
+    out = {
+        "parse_csv": lambda: price_store.parse_csv(path, symbol, version),
+        "store_get_warm": lambda: store.get(symbol),
+        "df_to_points": lambda: main.df_to_points(disp),
+        "df_to_columns": lambda: main.df_to_columns(disp),
+        "sma_kernel_20": lambda: indicators.sma(disp.c, 20),
+        "ema_kernel_20": lambda: indicators.ema(disp.c, 20),
+        "compute_indicators_cold": cold_indicators,
+        "compute_indicators_warm": lambda: main.compute_indicators(full, 0, len(full)),
+        "stats_52w_full": lambda: main.stats_52w_full(full),
+        "naive_next_day_forecast": lambda: main.naive_next_day_forecast(disp.c),
+        "forecast_series_cold": lambda: indicators.linear_forecast(full.c, 60),
+        "forecast_eval_60": lambda: forecast.evaluate(full, 60),
+        "heuristic_trend": lambda: chatbot._heuristic_trend(closes),
+        "sentiment_headline": lambda: sentiment.score_text.__wrapped__(
+            "HDFC Bank shares fall after Q2 profit fails to beat estimates; RBI probe weighs"),
+        "build_history_max": lambda: main.build_history(full, symbol, "max"),
+        "encode_history_max": lambda: encode_json(payload),
+        "encode_history_max_columnar": lambda: encode_json(columnar),
+        "gzip_history_max": lambda: compress(body, "gzip"),
+    }
+    if store.cache_dir is not None:
+        compiled = price_store.compiled_path(path, version, store.cache_dir)
+        if compiled.exists():
+            out["open_compiled"] = lambda: price_store.open_compiled(compiled, symbol, version)
+    return out
+
+
+def run(symbol: str, number: int, repeat: int, only: list[str] | None = None) -> dict:
+    results = {}
+    for name, fn in cases(symbol).items():
+        if only and name not in only:
+            continue
+        fn()  # warm-up
+        runs = np.array(timeit.repeat(fn, number=number, repeat=repeat)) / number
+        results[name] = {
+            "best_us": round(float(runs.min()) * 1e6, 3),
+            "median_us": round(float(np.median(runs)) * 1e6, 3),
+            "number": number,
+            "repeat": repeat,
+        }
+        print(f"{name:28s} best {results[name]['best_us']:>12.1f} us   median {results[name]['median_us']:>12.1f} us")
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Microbenchmarks for backend hot functions")
+    ap.add_argument("--symbol", default="TCS.NS")
+    ap.add_argument("--number", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", nargs="*", help="run only these cases")
+    ap.add_argument("--out", type=Path)
+    args = ap.parse_args()
+    results = run(args.symbol, args.number, args.repeat, args.only)
+    save(args.out, "micro", results, {"symbol": args.symbol, "number": args.number, "repeat": args.repeat})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# backend/bench/stream.py
+# Fan-out load test for GET /api/stream: many SSE subscribers replaying the
+# same few symbols against one uvicorn worker (real sockets; the ASGI
+# transport used by bench.load buffers whole responses).
+#
+#   python -m bench.stream --subscribers 500 --symbols 5 --speed 100 --duration 15
+#
+# Reports time to first snapshot, delivery lag (receive time minus the
+# producer's timestamp) and events delivered per second across subscribers.
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from bench.common import peak_rss_mb, percentiles, save
+from bench.load import start_stub
+
+
+async def subscriber(client, params, stop_at, snap, lags, counts):
+    t0 = time.perf_counter()
+    event = None
+    try:
+        async with client.stream("GET", "/api/stream", params=params) as resp:
+            async for line in resp.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[7:]
+                elif line.startswith("data:"):
+                    if event == "snapshot":
+                        snap.append(time.perf_counter() - t0)
+                    elif event == "bars":
+                        lags.append(time.time() - json.loads(line[6:])["ts"])
+                        counts["events"] += 1
+                    elif event == "end":
+                        return
+                if time.perf_counter() > stop_at:
+                    return
+    except Exception:
+        counts["errors"] += 1
+
+
+async def drive(base_url, symbols, subscribers, speed, period, duration):
+    import httpx
+    snap, lags = [], []
+    counts = {"events": 0, "errors": 0}
+    stop_at = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=subscribers + 8)
+    async with httpx.AsyncClient(base_url=base_url, timeout=duration + 30, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(
+            subscriber(client, {"symbol": symbols[i % len(symbols)], "mode": "replay", "speed": speed,
+                                "period": period}, stop_at, snap, lags, counts)
+            for i in range(subscribers)
+        ))
+        elapsed = time.perf_counter() - t0
+        stats = (await client.get("/api/metrics")).json()["counters"].get("stream", {})
+    return snap, lags, counts, elapsed, stats
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="SSE fan-out load test for /api/stream")
+    ap.add_argument("--subscribers", type=int, default=200)
+    ap.add_argument("--symbols", type=int, default=5, help="distinct symbols (one producer each)")
+    ap.add_argument("--speed", type=float, default=50.0, help="replay speed, bars per second")
+    ap.add_argument("--period", default="2y", help="replay starts at the beginning of this period")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds")
+    ap.add_argument("--out", type=Path)
+    args = ap.parse_args()
+
+    import main as app_main
+    symbols = app_main.available_symbols()[:max(1, args.symbols)]
+    port = start_stub("main:app")
+    snap, lags, counts, elapsed, stats = asyncio.run(drive(
+        f"http://127.0.0.1:{port}", symbols, args.subscribers, args.speed, args.period, args.duration,
+    ))
+
+    results = {
+        "snapshot": {"requests": len(snap), **percentiles(snap)},
+        "lag": {"requests": len(lags), **percentiles(lags)},
+        "events": {"requests": counts["events"], "errors": counts["errors"],
+                   "throughput_rps": round(counts["events"] / elapsed, 2)},
+        "dropped_subscribers": stats.get("dropped"),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    for name in ("snapshot", "lag"):
+        r = results[name]
+        print(f"{name:10s} n={r['requests']:<7d} p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms")
+    ev = results["events"]
+    print(f"events     {ev['requests']} delivered, {ev['throughput_rps']} /s, errors {ev['errors']}, "
+          f"dropped {results['dropped_subscribers']}")
+    print(f"peak RSS {results['peak_rss_mb']} MB (client and server share the process)")
+    save(args.out, "stream", results, {
+        "subscribers": args.subscribers, "symbols": len(symbols), "speed": args.speed,
+        "period": args.period, "duration": args.duration,
+    })
+
+
+if __name__ == "__main__":
+    main()
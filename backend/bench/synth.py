@@ -0,0 +1,74 @@
+# backend/bench/synth.py
+# Synthetic OHLCV generator in the same CSV layout as backend/data, for
+# scaling benchmarks beyond the ~85 bundled symbols.
+#
+#   python -m bench.synth --out /tmp/synth --symbols 10000 --years 20
+#
+# Symbols alternate between US-style (SYN00001) and .NS-style names so both
+# calendars are represented; prices follow a seeded geometric random walk.
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+HEADER = "Date,Open,High,Low,Close,Volume\n"
+
+
+def business_days(years: int, end: str = "2025-08-15") -> np.ndarray:
+    end_d = np.datetime64(end, "D")
+    start_d = end_d - np.timedelta64(int(years * 365.25), "D")
+    days = np.arange(start_d, end_d + 1, dtype="datetime64[D]")
+    return days[np.is_busday(days)]
+
+
+def make_bars(rng: np.random.Generator, n: int) -> np.ndarray:
+    """(n, 5) float array of Open, High, Low, Close, Volume."""
+    start = rng.uniform(20, 2000)
+    drift, vol = rng.normal(0.0003, 0.0002), rng.uniform(0.008, 0.03)
+    close = start * np.exp(np.cumsum(rng.normal(drift, vol, n)))
+    open_ = np.concatenate(([start], close[:-1])) * (1 + rng.normal(0, vol / 4, n))
+    spread = np.abs(rng.normal(0, vol / 2, n))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.lognormal(np.log(rng.uniform(1e5, 5e7)), 0.35, n).round()
+    return np.column_stack([open_, high, low, close, volume])
+
+
+def write_csv(path: Path, dates: np.ndarray, bars: np.ndarray) -> None:
+    date_str = np.datetime_as_string(dates, unit="D")
+    lines = [
+        f"{d},{o:.2f},{h:.2f},{l:.2f},{c:.2f},{int(v)}"
+        for d, (o, h, l, c, v) in zip(date_str.tolist(), bars.tolist())
+    ]
+    path.write_text(HEADER + "\n".join(lines) + "\n")
+
+
+def generate(out: Path, symbols: int, years: int, seed: int = 7) -> int:
+    out.mkdir(parents=True, exist_ok=True)
+    dates = business_days(years)
+    rng = np.random.default_rng(seed)
+    for i in range(symbols):
+        name = f"SYN{i:05d}" + (".NS" if i % 2 else "")
+        # vary history length a little, like the real files
+        n = int(len(dates) * rng.uniform(0.6, 1.0)) if i % 5 == 0 else len(dates)
+        write_csv(out / f"{name}.csv", dates[-n:], make_bars(rng, n))
+    return len(dates)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Generate synthetic OHLCV CSVs")
+    ap.add_argument("--out", type=Path, required=True)
+    ap.add_argument("--symbols", type=int, default=1000)
+    ap.add_argument("--years", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    bars = generate(args.out, args.symbols, args.years, args.seed)
+    print(f"wrote {args.symbols} symbols x up to {bars} bars to {args.out} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
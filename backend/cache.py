@@ -0,0 +1,228 @@
+# backend/cache.py
+# Size-bounded LRU+TTL caches for LLM results (trend_ai, news summaries).
+#   tier 1: in-process dict (per worker, fastest)
+#   tier 2: SQLite file shared by every uvicorn worker on the host and kept
+#           across restarts (CACHE_DB, default backend/.cache/cache.sqlite3)
+# Set CACHE_DB="" to run with the in-process tier only.
+# Async handlers use aget()/aset(): the SQLite tier (busy timeout, write
+# locks shared with other workers) then runs in the IO pool, never on the
+# event loop.
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from executor import run_io
+
+BASE_DIR = Path(__file__).resolve().parent
+_db_env = os.getenv("CACHE_DB")
+CACHE_DB: Optional[Path] = BASE_DIR / ".cache" / "cache.sqlite3" if _db_env is None else (Path(_db_env) if _db_env else None)
+MEMORY_MAX_BYTES = int(os.getenv("CACHE_MEMORY_MAX_BYTES", str(8 * 1024 * 1024)))
+SHARED_MAX_BYTES = int(os.getenv("CACHE_SHARED_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable hash of JSON-serializable parts (features dict, prompt, model, ...)."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class MemoryCache:
+    """In-process LRU with per-entry expiry, bounded by entries and encoded bytes."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = MEMORY_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[Optional[Any], float]:
+        """(value, expires_at) or (None, 0) on miss/expiry."""
+        with self._lock:
+            row = self._data.get(key)
+            if row is None:
+                return None, 0.0
+            exp, size, value = row
+            if time.time() > exp:
+                del self._data[key]
+                self._bytes -= size
+                return None, 0.0
+            self._data.move_to_end(key)
+            return value, exp
+
+    def set(self, key: str, value: Any, expires_at: float, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self._bytes -= evicted
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SqliteCache:
+    """Shared tier: one table, LRU by last access, total payload capped at max_bytes."""
+
+    def __init__(self, path: Path, max_bytes: int = SHARED_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires REAL NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS kv_accessed ON kv(accessed)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():  # never reuse a connection across fork()
+            # autocommit + WAL: readers in other workers never block on a writer
+            conn = sqlite3.connect(str(self.path), timeout=2.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Tuple[Optional[Any], float]:
+        db = self._conn()
+        row = db.execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, 0.0
+        value, exp = row
+        now = time.time()
+        if now > exp:
+            db.execute("DELETE FROM kv WHERE key = ?", (key,))
+            return None, 0.0
+        db.execute("UPDATE kv SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(value), exp
+
+    def set(self, key: str, encoded: str, expires_at: float) -> None:
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        db = self._conn()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO kv(key, value, expires, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, expires_at, size, now),
+            )
+            db.execute("DELETE FROM kv WHERE expires < ?", (now,))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM kv").fetchone()[0]
+            if total > self.max_bytes:
+                # drop least-recently-used rows until we are back under the cap
+                excess = total - self.max_bytes
+                for k, sz in db.execute("SELECT key, size FROM kv ORDER BY accessed").fetchall():
+                    if excess <= 0:
+                        break
+                    db.execute("DELETE FROM kv WHERE key = ?", (k,))
+                    excess -= sz
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+_shared: Optional[SqliteCache] = None
+_shared_failed = False
+_shared_lock = threading.Lock()
+
+def _shared_tier() -> Optional[SqliteCache]:
+    global _shared, _shared_failed
+    if CACHE_DB is None or _shared_failed:
+        return None
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None and not _shared_failed:
+                try:
+                    _shared = SqliteCache(CACHE_DB)
+                except (OSError, sqlite3.Error):
+                    _shared_failed = True  # read-only fs etc.: run memory-only
+    return _shared
+
+
+_writes: Set[asyncio.Future] = set()
+
+
+class TieredCache:
+    """Namespaced cache: memory tier in front of the shared SQLite tier."""
+
+    def __init__(self, namespace: str, ttl: float, max_entries: int = 1024):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.memory = MemoryCache(max_entries=max_entries)
+        self.hits = self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value, _ = self.memory.get(key)
+        if value is None:
+            shared = _shared_tier()
+            if shared is not None:
+                try:
+                    value, exp = shared.get(f"{self.namespace}:{key}")
+                except sqlite3.Error:
+                    value = None
+                if value is not None:
+                    self.memory.set(key, value, exp, len(json.dumps(value)))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _remember(self, key: str, value: Dict[str, Any], ttl: Optional[float]) -> Tuple[str, float]:
+        exp = time.time() + (self.ttl if ttl is None else ttl)
+        encoded = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        self.memory.set(key, value, exp, len(encoded))
+        return encoded, exp
+
+    def _write_shared(self, key: str, encoded: str, exp: float) -> None:
+        shared = _shared_tier()
+        if shared is not None:
+            try:
+                shared.set(f"{self.namespace}:{key}", encoded, exp)
+            except sqlite3.Error:
+                pass  # busy/locked: the memory tier still has it
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        self._write_shared(key, *self._remember(key, value, ttl))
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """get() for async handlers: a memory hit stays on the loop, a miss reads SQLite in the IO pool."""
+        value, _ = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        return await run_io(self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """set() for async handlers: memory tier now, the SQLite write in the IO pool without waiting for it."""
+        encoded, exp = self._remember(key, value, ttl)
+        if CACHE_DB is None or _shared_failed:
+            return
+        task = asyncio.ensure_future(run_io(self._write_shared, key, encoded, exp))
+        _writes.add(task)  # keep a reference until the write finishes
+        task.add_done_callback(_writes.discard)
+
+    def stats(self) -> dict:
+        return {"entries": len(self.memory), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,127 @@
+# backend/catalog.py
+# Symbol catalog: one entry per CSV in data/ with its first/last date, row
+# count, region/currency and data version, built once at startup and then
+# maintained by mtime polling instead of globbing data/ per request.
+#
+# refresh() lists data/ with one scandir and stat()s each symbol (CSV plus
+# ingested segments); only entries whose version changed are rebuilt. The
+# request path re-checks the directory mtime (one stat), so added or removed
+# files show up immediately; in-place rewrites and ingested bars are picked
+# up by the background poller every CATALOG_POLL_SECONDS.
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from executor import run_io
+from http_cache import combined_version
+from metrics import register_stats, span
+from price_store import Version, store
+
+POLL_SECONDS = float(os.getenv("CATALOG_POLL_SECONDS", "2"))
+
+# suffix -> (region, currency); anything else is listed as US/USD
+REGIONS = {".NS": ("IN", "INR"), ".BO": ("IN", "INR")}
+INDEX_REGIONS = {"^NSEI": ("IN", "INR"), "^BSESN": ("IN", "INR")}
+
+
+def _iso(ms: int) -> str:
+    return str(np.datetime64(int(ms), "ms").astype("datetime64[D]"))
+
+def region_of(symbol: str) -> Tuple[str, str]:
+    up = symbol.upper()
+    if up in INDEX_REGIONS:
+        return INDEX_REGIONS[up]
+    for suffix, region in REGIONS.items():
+        if up.endswith(suffix):
+            return region
+    return "US", "USD"
+
+
+def describe(symbol: str, version: Version) -> dict:
+    region, currency = region_of(symbol)
+    entry = {"symbol": symbol, "region": region, "currency": currency,
+             "first": None, "last": None, "rows": 0, "version": f"{version[0]:x}-{version[1]:x}"}
+    try:
+        s = store.get(symbol)
+    except HTTPException as e:
+        entry["error"] = e.detail  # listed anyway, like the old directory glob
+        return entry
+    if len(s):
+        entry.update(first=_iso(s.t[0]), last=_iso(s.t[-1]), rows=len(s))
+    return entry
+
+
+class Catalog:
+    def __init__(self):
+        self._entries: Dict[str, dict] = {}
+        self._versions: Dict[str, Version] = {}
+        self._dir_version: Optional[Version] = None
+        self.version: Version = (0, 0)  # (newest file/dir mtime, crc of every entry version), for ETags
+        self._lock = threading.Lock()
+        self.refreshes = self.rebuilt = 0
+
+    def refresh(self) -> None:
+        """Re-list data/ and rebuild the entries whose files changed."""
+        with self._lock, span("catalog_refresh"):
+            dir_version = store.dir_version()
+            try:
+                names = [e.name for e in os.scandir(store.data_dir) if e.name[-4:].lower() == ".csv"]
+            except OSError:
+                names = []
+            entries, versions = {}, {}
+            for symbol in sorted({name[:-4].replace("_", "^") for name in names}):
+                try:
+                    version = store.version(symbol)
+                except HTTPException:
+                    version = (0, 0)  # e.g. FOO.CSV on a case-sensitive filesystem
+                if self._versions.get(symbol) == version:
+                    entries[symbol] = self._entries[symbol]
+                else:
+                    entries[symbol] = describe(symbol, version)
+                    self.rebuilt += 1
+                versions[symbol] = version
+            self._entries, self._versions, self._dir_version = entries, versions, dir_version
+            self.version = combined_version(sorted(versions.items()), dir_version[0])
+            self.refreshes += 1
+
+    def _current(self) -> None:
+        if self._dir_version != store.dir_version():
+            self.refresh()
+
+    def symbols(self) -> List[str]:
+        self._current()
+        return list(self._entries)
+
+    def entries(self) -> List[dict]:
+        self._current()
+        return list(self._entries.values())
+
+    def get(self, symbol: str) -> Optional[dict]:
+        self._current()
+        return self._entries.get(symbol) or self._entries.get(symbol.upper())
+
+    def stats(self) -> dict:
+        return {"symbols": len(self._entries), "refreshes": self.refreshes, "rebuilt": self.rebuilt}
+
+
+catalog = Catalog()
+register_stats("catalog", catalog.stats)
+
+
+async def poll_forever() -> None:
+    while True:
+        await asyncio.sleep(POLL_SECONDS)
+        try:
+            await run_io(catalog.refresh)
+        except Exception as e:  # a bad file must not stop the poller
+            print(f"catalog refresh failed: {e}", file=sys.stderr)
+
+def start_poller() -> Optional[asyncio.Task]:
+    return asyncio.create_task(poll_forever()) if POLL_SECONDS > 0 else None
@@ -1,68 +1,54 @@
 # backend/chatbot.py
 from __future__ import annotations
 import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Tuple
 from dotenv import load_dotenv
 from pathlib import Path
 
 import numpy as np
-import pandas as pd
 from pydantic import BaseModel
 from fastapi import APIRouter, Body, HTTPException
-from groq import Groq  # pip install groq
+from fastapi.responses import StreamingResponse
+from price_store import Version, get_series, normalize_period, slice_period, store
+from indicators import engine, linear_slope, sma as sma_arr
+from llm import gateway, LLMError
+from executor import run_io
+from cache import TieredCache, cache_key
+from metrics import register_stats, span
+from stream import sse
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / ".env")  # loads backend/.env
 
 router = APIRouter(prefix="/api", tags=["chat"])
 
-# Resolve paths relative to this file (same folder as main.py)
-BASE_DIR = Path(__file__).resolve().parent
-DATA_DIR = BASE_DIR / "data"
-
-PERIOD_TO_DAYS = {
-    "1mo": 21, "3mo": 63, "6mo": 126,
-    "1y": 252, "2y": 504, "5y": 1260, "max": 10000
-}
-
 class ChatRequest(BaseModel):
     symbol: str
     period: str = "6mo"
     messages: List[Dict[str, Any]] = []
 
-# --- local helpers (kept here to avoid circular imports) ---
-def load_csv(symbol: str) -> pd.DataFrame:
-    path = DATA_DIR / f"{symbol.replace('^','_')}.csv"
-    if not path.exists():
-        raise HTTPException(status_code=404, detail=f"No mock dataset for {symbol}")
-    df = pd.read_csv(path, parse_dates=["Date"]).sort_values("Date")
-    return df
-
-def slice_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
-    n = PERIOD_TO_DAYS.get(period, 126)
-    return df.tail(n)
-
+# --- local helpers (series come from the shared price store) ---
 def calc_chat_summary(symbol: str, period: str) -> str:
-    df = load_csv(symbol)
-    disp = slice_period(df, period)
-    if disp.empty:
+    full = get_series(symbol)
+    disp = slice_period(full, period)
+    if len(disp) == 0:
         raise HTTPException(status_code=404, detail=f"No data for {symbol} in period {period}")
 
-    last = disp.iloc[-1]
-    prev = disp.iloc[-2] if len(disp) > 1 else None
-
-    last_close = float(last["Close"])
-    prev_close = float(prev["Close"]) if prev is not None else None
+    closes = disp.c
+    last_close = float(closes[-1])
+    prev_close = float(closes[-2]) if len(closes) > 1 else None
     change = (last_close - prev_close) if prev_close is not None else None
     change_pct = (change / prev_close * 100) if (change is not None and prev_close) else None
 
-    year = df.tail(252) if len(df) >= 252 else df
-    hi_52 = float(year["High"].max()) if len(year) else None
-    lo_52 = float(year["Low"].min()) if len(year) else None
-    avg_vol = float(year["Volume"].mean()) if len(year) else None
+    year = full.tail(252)
+    hi_52 = float(year.h.max()) if len(year) else None
+    lo_52 = float(year.l.min()) if len(year) else None
+    avg_vol = float(year.v.mean()) if len(year) else None
 
-    s20 = float(disp["Close"].rolling(20).mean().iloc[-1]) if len(disp) >= 20 else None
-    s50 = float(disp["Close"].rolling(50).mean().iloc[-1]) if len(disp) >= 50 else None
+    s20 = engine.last_sma(full, 20, bars=len(disp))
+    s50 = engine.last_sma(full, 50, bars=len(disp))
 
     lines = [
         f"Symbol: {symbol.upper()}  Period: {period}",
@@ -74,11 +60,63 @@ def calc_chat_summary(symbol: str, period: str) -> str:
     ]
     return "\n".join(lines)
 
-# --- Chat endpoint using Groq (free-tier friendly) ---
-@router.post("/chat")
-async def chat(req: ChatRequest = Body(...)):
-    summary = calc_chat_summary(req.symbol, req.period)
-
+# The summary only changes with the data, so keep the latest one per
+# (symbol, period) with the data version it was built from. A hit costs the
+# stat() calls behind store.version() and runs on the event loop; only a miss
+# goes to the IO pool. Unknown periods share the DEFAULT_PERIOD entry and the
+# least recently used entries beyond MAX_SUMMARIES are dropped.
+MAX_SUMMARIES = int(os.getenv("CHAT_SUMMARY_CACHE_SIZE", "4096"))
+_SUMMARIES: "OrderedDict[Tuple[str, str], Tuple[Version, str]]" = OrderedDict()
+_summary_lock = threading.Lock()
+_summary_counters = {"hits": 0, "misses": 0}
+register_stats("chat_summary", lambda: {**_summary_counters, "entries": len(_SUMMARIES)})
+
+def _summary_key(symbol: str, period: str) -> Tuple[Tuple[str, str], Version]:
+    return (symbol.upper(), normalize_period(period)), store.version(symbol)
+
+def _cached_summary(key: Tuple[str, str], version: Version) -> str | None:
+    with _summary_lock:
+        hit = _SUMMARIES.get(key)
+        if hit is None or hit[0] != version:
+            return None
+        _SUMMARIES.move_to_end(key)
+        return hit[1]
+
+def _build_summary(symbol: str, period: str) -> str:
+    key, version = _summary_key(symbol, period)
+    summary = calc_chat_summary(symbol, key[1])
+    with _summary_lock:
+        _SUMMARIES[key] = (version, summary)
+        _SUMMARIES.move_to_end(key)
+        while len(_SUMMARIES) > MAX_SUMMARIES:
+            _SUMMARIES.popitem(last=False)
+    return summary
+
+async def chat_summary(symbol: str, period: str) -> str:
+    """calc_chat_summary, rebuilt only when the symbol's data version changes."""
+    key, version = _summary_key(symbol, period)
+    hit = _cached_summary(key, version)
+    if hit is not None:
+        _summary_counters["hits"] += 1
+        return hit
+    _summary_counters["misses"] += 1
+    with span("summary"):
+        return await run_io(_build_summary, symbol, period)
+
+def warm_summaries(symbols: Iterable[str], period: str = "6mo") -> int:
+    """Build the summaries ahead of the first chat message; returns how many were built."""
+    built = 0
+    for symbol in symbols:
+        try:
+            if _cached_summary(*_summary_key(symbol, period)) is not None:
+                continue  # e.g. built by the serve.py parent before forking
+            _build_summary(symbol, period)
+            built += 1
+        except HTTPException:
+            continue
+    return built
+
+def chat_messages(req: ChatRequest, summary: str) -> List[dict]:
     system_prompt = (
         "You are a helpful stock dashboard assistant. "
         "Use ONLY the provided summary as factual context from local CSVs. "
@@ -87,9 +125,7 @@ async def chat(req: ChatRequest = Body(...)):
         f"### Data Summary\n{summary}\n"
     )
 
-    from groq.types.chat import ChatCompletionMessageParam
-
-    msgs: list[ChatCompletionMessageParam] = [
+    msgs: list[dict] = [
         {"role": "system", "content": system_prompt}
     ]
     for m in (req.messages or [])[-12:]:
@@ -97,18 +133,59 @@ async def chat(req: ChatRequest = Body(...)):
             msgs.append({"role": m["role"], "content": str(m["content"])})
     if not any(m["role"] == "user" for m in msgs[1:]):
         msgs.append({"role": "user", "content": f"Tell me about {req.symbol}."})
+    return msgs
 
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        return {
-            "answer": "GROQ_API_KEY is not set. Here’s a data-driven summary:\n\n" + summary
-        }
+def _no_key_answer(summary: str) -> str:
+    return "GROQ_API_KEY is not set. Here’s a data-driven summary:\n\n" + summary
+
+# --- Chat endpoint using Groq (free-tier friendly) ---
+@router.post("/chat")
+async def chat(req: ChatRequest = Body(...)):
+    summary = await chat_summary(req.symbol, req.period)
+    msgs = chat_messages(req, summary)
 
-    client = Groq(api_key=api_key)
-    model = os.getenv("GROQ_MODEL", "llama3-8b-8192")
-    resp = client.chat.completions.create(model=model, messages=msgs, temperature=0.2)
-    answer = resp.choices[0].message.content
+    if not gateway.available():
+        return {"answer": _no_key_answer(summary)}
+
+    try:
+        answer = await gateway.complete(msgs, temperature=0.2)
+    except LLMError as e:
+        raise HTTPException(status_code=502, detail=f"LLM request failed: {e}")
     return {"answer": answer}
+
+# Same request and answer as /api/chat, sent as Server-Sent Events while the
+# model generates:
+#   event: meta   {"symbol", "period", "origin": "llm" | "heuristic"}
+#   event: token  {"text"}            one per chunk from the model
+#   event: done   {"answer"}          the full text
+#   event: error  {"detail"}          the LLM failed after the stream started
+# Unknown symbols and empty periods still fail with a plain 404 before any event.
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest = Body(...)):
+    summary = await chat_summary(req.symbol, req.period)
+    msgs = chat_messages(req, summary)
+    live = gateway.available()
+
+    async def events():
+        yield sse("meta", {"symbol": req.symbol.upper(), "period": req.period,
+                           "origin": "llm" if live else "heuristic"})
+        if not live:
+            answer = _no_key_answer(summary)
+            yield sse("token", {"text": answer})
+            yield sse("done", {"answer": answer})
+            return
+        parts: List[str] = []
+        try:
+            async for text in gateway.stream(msgs, temperature=0.2):
+                parts.append(text)
+                yield sse("token", {"text": text})
+        except LLMError as e:
+            yield sse("error", {"detail": f"LLM request failed: {e}"})
+            return
+        yield sse("done", {"answer": "".join(parts)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 # --- AI Trend endpoint -------------------------------------------------------
 from typing import Optional
 from pydantic import BaseModel
@@ -120,34 +197,23 @@ class TrendAIOut(BaseModel):
     reasoning: str       # short sentence
     origin: str = "llm"  # 'llm' | 'heuristic'
 
-def _sma(arr, n):
-    if len(arr) < n: return None
-    s = 0; out = [None]*len(arr)
-    for i, v in enumerate(arr):
-        s += v
-        if i >= n: s -= arr[i-n]
-        if i >= n-1: out[i] = s/n
-    return out
-
 def _slope(arr, n):
-    if len(arr) < n: return None
-    start = len(arr)-n
-    sx=sy=sxx=sxy=0.0
-    for i in range(n):
-        x=i; y=arr[start+i]
-        sx+=x; sy+=y; sxx+=x*x; sxy+=x*y
-    denom = n*sxx - sx*sx
-    if denom == 0: return None
-    return (n*sxy - sx*sy)/denom
-
-def _heuristic_trend(closes: list[float]) -> TrendAIOut:
-    # Same spirit as your TrendCard rules; produces a deterministic fallback
+    """Least-squares slope of the last n values (None if too short), via the shared indicator kernel."""
+    if n < 2 or len(arr) < n:
+        return None
+    return float(linear_slope(arr[-n:], n)[-1])
+
+def _last_sma(closes: list[float], n: int) -> Optional[float]:
+    return float(sma_arr(closes[-n:], n)[-1]) if len(closes) >= n else None
+
+def _heuristic_trend(closes: list[float], smas: Optional[Dict[int, Optional[float]]] = None) -> TrendAIOut:
+    # Same spirit as your TrendCard rules; produces a deterministic fallback.
+    # `smas` maps window -> latest SMA (from the indicator engine); computed here if omitted.
     if not closes or len(closes) < 20:
         return TrendAIOut(label="Neutral", confidence=0, reasoning="Not enough data", origin="heuristic")
     last = closes[-1]
-    sma20 = (_sma(closes,20) or [None])[-1]
-    sma50 = (_sma(closes,50) or [None])[-1]
-    sma200 = (_sma(closes,200) or [None])[-1]
+    smas = smas or {n: _last_sma(closes, n) for n in (20, 50, 200)}
+    sma20, sma50, sma200 = smas[20], smas[50], smas[200]
     slope20 = _slope(closes, min(20, len(closes))) or 0
     slope50 = _slope(closes, 50) or 0 if len(closes) >= 50 else 0
 
@@ -183,24 +249,33 @@ def _extract_json(text: str) -> Optional[dict]:
             return None
     return None
 
-@router.get("/trend_ai")
-async def trend_ai(symbol: str, period: str = "6mo") -> dict:
-    df = load_csv(symbol)
-    disp = slice_period(df, period)
-    if disp.empty:
+# LLM verdicts are a pure function of the features dict, so cache them by its hash
+_TREND_CACHE = TieredCache("trend", ttl=float(os.getenv("TREND_CACHE_TTL", "86400")))
+register_stats("trend_cache", _TREND_CACHE.stats)
+
+def _trend_inputs(symbol: str, period: str):
+    full = get_series(symbol)
+    disp = slice_period(full, period)
+    if len(disp) == 0:
         raise HTTPException(status_code=404, detail=f"No data for {symbol} in period {period}")
-    closes = [float(x) for x in disp["Close"].tolist()]
+    closes = disp.c.tolist()
+    smas = {n: engine.last_sma(full, n, bars=len(disp)) for n in (20, 50, 200)}
 
     # Heuristic as a safety net or if no key
-    fallback = _heuristic_trend(closes)
+    with span("heuristic"):
+        fallback = _heuristic_trend(closes, smas)
+    return closes, smas, fallback
+
+@router.get("/trend_ai")
+async def trend_ai(symbol: str, period: str = "6mo") -> dict:
+    closes, smas, fallback = await run_io(_trend_inputs, symbol, period)
 
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
+    if not gateway.available():
         return fallback.model_dump()
 
     # Build a compact feature summary for the LLM (no raw time series needed)
-    def last_or(arr, n): 
-        a = _sma(closes, n); return (a[-1] if a else None)
+    def last_or(arr, n):
+        return smas[n]
     features = {
         "last_close": closes[-1],
         "sma20": last_or(closes,20),
@@ -223,18 +298,19 @@ async def trend_ai(symbol: str, period: str = "6mo") -> dict:
         f"Features: {json.dumps(features, separators=(',',':'))}"
     )
 
+    key = cache_key(features, gateway.model())
+    cached = await _TREND_CACHE.aget(key)
+    if cached:
+        return cached
+
     try:
-        client = Groq(api_key=api_key)
-        model = os.getenv("GROQ_MODEL", "llama3-8b-8192")
-        resp = client.chat.completions.create(
-            model=model,
-            temperature=0.2,
-            messages=[
+        content = await gateway.complete(
+            [
                 {"role":"system","content":"You are a precise classifier. Output only valid JSON."},
                 {"role":"user","content": prompt}
-            ]
+            ],
+            temperature=0.2,
         )
-        content = resp.choices[0].message.content
         data = _extract_json(content or "") or {}
         label = str(data.get("label","")).strip().title()
         conf  = int(data.get("confidence", 0))
@@ -242,7 +318,9 @@ async def trend_ai(symbol: str, period: str = "6mo") -> dict:
         if label not in ("Bullish","Bearish","Neutral"):
             raise ValueError("bad label")
         conf = max(0, min(100, conf))
-        return TrendAIOut(label=label, confidence=conf, reasoning=reason or "LLM analysis.", origin="llm").model_dump()
+        out = TrendAIOut(label=label, confidence=conf, reasoning=reason or "LLM analysis.", origin="llm").model_dump()
+        await _TREND_CACHE.aset(key, out)
+        return out
     except Exception:
         # Fall back gracefully
         return fallback.model_dump()
@@ -0,0 +1,227 @@
+# backend/executor.py
+# Where blocking work runs, and how much of it each route may queue.
+#
+# Handlers are `async def`, so anything that parses a CSV, loops in Python or
+# serializes a large body is handed to a pool instead of running on the event
+# loop, where it would stall every other request on the worker:
+#   run_io()   bounded thread pool (IO_THREADS): file reads, numpy kernels,
+#              JSON encoding. Keeps in-process caches (indicator engine,
+#              analytics matrices) warm.
+#   run_cpu()  spawn process pool (CPU_WORKERS): long pure-Python analytics
+#              that would otherwise hold the GIL (backtest sweeps, all-symbol
+#              forecast scoring). Arguments and results must pickle.
+#
+# AdmissionMiddleware caps in-flight requests per expensive route. Requests
+# past the cap wait in a bounded FIFO; once that is full, or the thread pool
+# already has IO_MAX_BACKLOG jobs pending, the route answers 503 with
+# Retry-After straight away rather than adding latency for everyone.
+# Routes without a gate (/api/quote, /api/companies, /api/metrics, the SSE
+# stream) are the fast lane: a stat() and a cache lookup on the loop itself.
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from metrics import ENABLED as METRICS_ENABLED, observe, register_stats
+
+IO_THREADS = int(os.getenv("IO_THREADS", "16"))
+IO_MAX_BACKLOG = int(os.getenv("IO_MAX_BACKLOG", str(IO_THREADS * 8)))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", os.getenv("BACKTEST_WORKERS", "0"))) or (os.cpu_count() or 1)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1").lower() in ("1", "true", "yes")
+RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# path -> (max in flight, max queued); override with e.g.
+# ROUTE_LIMITS="/api/history=16:128,/api/backtest/sweep=2:4"
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "/api/history": (8, 64),
+    "/api/batch": (4, 16),
+    "/api/chat": (4, 32),
+    "/api/chat/stream": (8, 32),  # in flight until the last token is sent
+    "/api/trend_ai": (4, 32),
+    "/api/news_summarize": (4, 32),
+    "/api/news_summarize_live": (4, 32),
+    "/api/sentiment_batch": (2, 8),
+    "/api/bars": (4, 64),
+    "/api/screen": (4, 16),
+    "/api/backtest": (2, 8),
+    "/api/backtest/sweep": (1, 2),
+    "/api/forecast/eval": (2, 8),
+    "/api/analytics/correlation": (4, 16),
+    "/api/analytics/correlated": (4, 16),
+    "/api/analytics/risk": (4, 16),
+}
+
+
+def _parse_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    limits = dict(DEFAULT_LIMITS)
+    for item in filter(None, (p.strip() for p in spec.split(","))):
+        path, _, value = item.partition("=")
+        active, _, queued = value.partition(":")
+        limits[path.strip()] = (max(1, int(active)), max(0, int(queued or 0)))
+    return limits
+
+
+# --- Pools ---
+_io = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="io")
+_io_pending = 0
+_io_lock = threading.Lock()
+
+def _io_done(_fut) -> None:
+    global _io_pending
+    with _io_lock:
+        _io_pending -= 1
+
+async def run_io(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run fn in the I/O thread pool; contextvars (request spans) carry over."""
+    global _io_pending
+    ctx = contextvars.copy_context()
+    with _io_lock:
+        _io_pending += 1
+    fut = _io.submit(ctx.run, functools.partial(fn, *args, **kwargs))
+    fut.add_done_callback(_io_done)
+    return await asyncio.wrap_future(fut)
+
+def _reset_pools_in_child() -> None:
+    # a forked worker (serve.py) inherits the parent's pool objects but not
+    # their threads or process handles; start over with empty ones
+    global _io, _io_pending, _io_lock, _cpu, _cpu_lock
+    _io = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="io")
+    _io_pending = 0
+    _io_lock = threading.Lock()
+    _cpu, _cpu_lock = None, threading.Lock()
+
+def io_backlog() -> int:
+    """Jobs submitted to the thread pool that have not finished yet."""
+    return _io_pending
+
+
+_cpu: Optional[ProcessPoolExecutor] = None
+_cpu_lock = threading.Lock()
+
+def get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu
+    if _cpu is None:
+        with _cpu_lock:
+            if _cpu is None:
+                # spawn: workers start clean instead of inheriting the server's threads and sockets
+                _cpu = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=get_context("spawn"))
+    return _cpu
+
+async def run_cpu(fn: Callable[..., Any], *args) -> Any:
+    """Run a module-level function in the process pool."""
+    return await asyncio.wrap_future(get_cpu_pool().submit(fn, *args))
+
+os.register_at_fork(after_in_child=_reset_pools_in_child)
+
+def shutdown() -> None:
+    global _cpu
+    pool, _cpu = _cpu, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+    _io.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Admission control ---
+class Gate:
+    """At most `limit` requests in flight and `queue` waiting; the rest are shed.
+
+    Waiters are woken in arrival order and a released slot is handed straight
+    to the next one, so a burst cannot starve requests that queued first.
+    Event-loop only (no locks): each uvicorn worker has its own gates.
+    """
+
+    def __init__(self, path: str, limit: int, queue: int):
+        self.path, self.limit, self.queue = path, limit, queue
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = self.queued = self.shed = 0
+
+    async def acquire(self) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue:
+            self.shed += 1
+            return False
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self.queued += 1
+        t0 = time.perf_counter()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.cancelled():
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+            else:
+                self.release()  # the slot was handed over just before the client went away
+            raise
+        if METRICS_ENABLED:
+            observe(f"queue:{self.path}", (time.perf_counter() - t0) * 1000.0)
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # active count carries over to the waiter
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {"active": self.active, "waiting": len(self._waiters), "limit": self.limit,
+                "queue": self.queue, "admitted": self.admitted, "queued": self.queued, "shed": self.shed}
+
+
+gates: Dict[str, Gate] = {
+    path: Gate(path, active, queued)
+    for path, (active, queued) in _parse_limits(os.getenv("ROUTE_LIMITS", "")).items()
+}
+_shed_backlog = 0
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware: gate expensive routes, answer 503 when saturated."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _shed_backlog
+        gate = gates.get(scope["path"]) if scope["type"] == "http" else None
+        if gate is None:
+            return await self.app(scope, receive, send)
+        if io_backlog() >= IO_MAX_BACKLOG:
+            _shed_backlog += 1
+            return await _busy("Server busy")(scope, receive, send)
+        if not await gate.acquire():
+            return await _busy(f"Too many concurrent {scope['path']} requests")(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+def _busy(detail: str) -> JSONResponse:
+    return JSONResponse({"detail": f"{detail}; retry shortly"}, status_code=503,
+                        headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+register_stats("executor", lambda: {
+    "io_threads": IO_THREADS, "io_pending": _io_pending, "io_max_backlog": IO_MAX_BACKLOG,
+    "cpu_workers": CPU_WORKERS, "cpu_pool_started": _cpu is not None,
+    "shed_backlog": _shed_backlog,
+})
+register_stats("admission", lambda: {path: g.stats() for path, g in gates.items() if g.admitted or g.shed})
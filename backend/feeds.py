@@ -0,0 +1,141 @@
+# backend/feeds.py
+# Async RSS fetcher for the live news endpoints.
+# - one pooled httpx.AsyncClient per worker
+# - raw-feed cache per (query, region, lang): any `n` is served from one fetch
+# - conditional GETs (If-None-Match / If-Modified-Since) once an entry is stale
+# - concurrent identical fetches share one request
+# NEWS_FEED_BASE points the fetcher at another server (e.g. stubs/rss_stub.py).
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+from executor import run_io
+from metrics import register_stats, span
+
+FEED_BASE = os.getenv("NEWS_FEED_BASE", "https://news.google.com/rss/search")
+FEED_TTL = float(os.getenv("NEWS_FEED_TTL", "300"))
+FEED_TIMEOUT = float(os.getenv("NEWS_FEED_TIMEOUT", "8"))
+FEED_MAX_ENTRIES = int(os.getenv("NEWS_FEED_MAX_ENTRIES", "512"))
+MAX_ITEMS = 20  # the summarizer never uses more than this many headlines
+
+FeedKey = Tuple[str, str, str]  # (query, region, lang)
+
+
+def google_news_url(q: str, region: str = "IN", lang: str = "en") -> str:
+    # Example: IN:en for India English; US:en for US English
+    return f"{FEED_BASE}?q={quote_plus(q)}&hl={lang}-{region}&gl={region}&ceid={region}:{lang}"
+
+
+def parse_feed(content: bytes) -> List[Dict[str, str]]:
+    import feedparser  # imported on first fetch, not at startup
+    feed = feedparser.parse(content)
+    items = []
+    for e in (feed.entries or [])[:MAX_ITEMS]:
+        title = (getattr(e, "title", None) or "").strip()
+        snippet = (getattr(e, "summary", None) or getattr(e, "description", None) or "").strip()
+        if title:
+            items.append({"title": title, "snippet": snippet})
+    return items
+
+
+@dataclass
+class FeedEntry:
+    items: List[Dict[str, str]] = field(default_factory=list)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+
+class FeedFetcher:
+    def __init__(self, ttl: float = FEED_TTL, timeout: float = FEED_TIMEOUT, max_entries: int = FEED_MAX_ENTRIES):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._client = None
+        self._entries: "OrderedDict[FeedKey, FeedEntry]" = OrderedDict()
+        self._inflight: Dict[FeedKey, asyncio.Future] = {}
+        # counters (read by the metrics endpoint)
+        self.hits = self.fetches = self.not_modified = self.errors = 0
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                headers={"User-Agent": "stock-dashboard/1.0 (+rss)"},
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    async def get(self, query: str, region: str = "IN", lang: str = "en") -> List[Dict[str, str]]:
+        """Up to MAX_ITEMS parsed headlines for the query; [] if the feed is unreachable."""
+        key = (query, region, lang)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.fetched_at < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.items
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._refresh(key, entry))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _f, k=key: self._inflight.pop(k, None))
+        return await asyncio.shield(fut)
+
+    async def _refresh(self, key: FeedKey, entry: Optional[FeedEntry]) -> List[Dict[str, str]]:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        self.fetches += 1
+        try:
+            with span("feed_fetch"):
+                resp = await self._get_client().get(google_news_url(*key), headers=headers)
+            if resp.status_code == 304 and entry is not None:
+                self.not_modified += 1
+                entry.fetched_at = time.monotonic()
+                return entry.items
+            resp.raise_for_status()
+            items = await run_io(parse_feed, resp.content)
+        except Exception:
+            self.errors += 1
+            # serve stale headlines rather than nothing
+            return entry.items if entry is not None else []
+        self._entries[key] = FeedEntry(items, resp.headers.get("etag"), resp.headers.get("last-modified"),
+                                       time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return items
+
+    async def prefetch(self, queries: Iterable[FeedKey], concurrency: int = 8) -> List[List[Dict[str, str]]]:
+        """Fetch many feeds concurrently, at most `concurrency` requests at a time."""
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(key: FeedKey):
+            async with sem:
+                return await self.get(*key)
+
+        return await asyncio.gather(*(one(k) for k in queries))
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "fetches": self.fetches,
+                "not_modified": self.not_modified, "errors": self.errors}
+
+
+fetcher = FeedFetcher()
+register_stats("feeds", fetcher.stats)
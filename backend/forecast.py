@@ -0,0 +1,105 @@
+# backend/forecast.py
+# Walk-forward accuracy of the linear-trend next-day forecast shown on the
+# dashboard (main.naive_next_day_forecast). Every bar's forecast comes from
+# the indicator engine's cached O(n) series, so evaluating all symbols and
+# several window lengths costs a few array passes instead of one polyfit
+# per bar.
+from __future__ import annotations
+
+from functools import partial
+from typing import List, Optional
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from catalog import catalog
+from executor import CPU_WORKERS
+from http_cache import cached_json_offload, combined_version
+from indicators import engine
+from metrics import span
+from price_store import PriceSeries, period_bounds, store
+
+router = APIRouter(prefix="/api", tags=["forecast"])
+
+MAX_WINDOWS = 8
+
+
+def evaluate(s: PriceSeries, window: int, start: int = 0, end: Optional[int] = None) -> dict:
+    """Score forecasts made at bars start..end-2 against the next bar's close.
+
+    Returns MAE, MAPE (%), directional accuracy (did the forecast call the
+    sign of the next move; flat moves are skipped) and the MAE of the
+    "tomorrow = today" baseline for scale.
+    """
+    end = len(s) if end is None else end
+    f = engine.forecast(s, window)[start:end - 1]
+    c = s.c[start:end - 1]
+    nxt = s.c[start + 1:end]
+    ok = ~np.isnan(f)
+    f, c, nxt = f[ok], c[ok], nxt[ok]
+    n = int(f.shape[0])
+    if n == 0:
+        return {"n": 0, "mae": None, "mape": None, "direction_accuracy": None, "mae_last_close": None}
+    err = np.abs(f - nxt)
+    moved = nxt != c
+    hits = np.sign(f - c)[moved] == np.sign(nxt - c)[moved]
+    return {
+        "n": n,
+        "mae": float(err.mean()),
+        "mape": float((err / np.abs(nxt)).mean() * 100.0),
+        "direction_accuracy": float(hits.mean()) if hits.shape[0] else None,
+        "mae_last_close": float(np.abs(nxt - c).mean()),
+    }
+
+
+def _median(values) -> Optional[float]:
+    vals = [v for v in values if v is not None]
+    return float(np.median(vals)) if vals else None
+
+
+def build_eval(symbols: List[str], windows: List[int], period: str) -> dict:
+    results, errors = {}, {}
+    with span("forecast_eval"):
+        for sym in symbols:
+            try:
+                s = store.get(sym)
+            except HTTPException as e:
+                errors[sym] = e.detail
+                continue
+            i, j = period_bounds(s, period)
+            results[s.symbol.upper()] = {str(w): evaluate(s, w, i, j) for w in windows}
+    # MAE is in price units, so only scale-free metrics are summarized across symbols
+    summary = {
+        str(w): {
+            "symbols": sum(1 for r in results.values() if r[str(w)]["n"]),
+            "median_mape": _median(r[str(w)]["mape"] for r in results.values()),
+            "median_direction_accuracy": _median(r[str(w)]["direction_accuracy"] for r in results.values()),
+            "beats_last_close": sum(1 for r in results.values()
+                                    if r[str(w)]["n"] and r[str(w)]["mae"] < r[str(w)]["mae_last_close"]),
+        }
+        for w in windows
+    }
+    return {"period": period, "windows": windows, "summary": summary, "results": results, "errors": errors}
+
+
+@router.get("/forecast/eval")
+async def forecast_eval(
+    request: Request,
+    symbols: List[str] = Query([], description="Symbols to score (default: every symbol)"),
+    windows: List[int] = Query([60], description="Regression window lengths, e.g. windows=20&windows=60"),
+    period: str = Query("max", description="Evaluation span ending at the last bar"),
+):
+    windows = sorted(set(windows))
+    if not windows or len(windows) > MAX_WINDOWS or windows[0] < 5 or windows[-1] > 1000:
+        raise HTTPException(status_code=400, detail=f"Give 1-{MAX_WINDOWS} windows between 5 and 1000")
+    symbols = list(dict.fromkeys(symbols)) or catalog.symbols()
+    # the response only changes when one of the files behind it does
+    versions = []
+    for sym in symbols:
+        try:
+            versions.append(store.version(sym))
+        except HTTPException:
+            versions.append(None)
+    # scoring every symbol is the heaviest read-only request; give it a process when there are spare cores
+    return await cached_json_offload(request, combined_version(zip(symbols, versions), store.dir_version()[0]),
+                                     partial(build_eval, symbols, windows, period), cpu=CPU_WORKERS > 1)
@@ -0,0 +1,313 @@
+# backend/http_cache.py
+# Conditional GET support (ETag / Last-Modified / 304) plus an LRU of
+# serialized bodies for endpoints whose output depends only on the query
+# string and the version of the CSV files behind it.
+#
+# Response encoding: orjson when installed (NumPy arrays are written
+# natively, NaN becomes null), MessagePack when the client's Accept header
+# prefers it and msgpack is installed, and gzip/brotli for bodies of at least
+# COMPRESS_MIN_BYTES. Encoded and compressed bodies are cached separately, so
+# a hit pays for neither step. Every encoder falls back to the stdlib.
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+from executor import run_cpu, run_io
+from indicators import to_json_list
+from metrics import register_stats, span
+
+try:
+    import orjson
+except ImportError:  # stdlib json below
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # JSON only
+    msgpack = None
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))  # seconds clients may reuse without revalidating
+CACHE_CONTROL = f"public, max-age={MAX_AGE}, must-revalidate"
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+_MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+VARY = "Accept, Accept-Encoding"
+
+
+class ResponseCache:
+    """LRU of etag -> JSON bytes, bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._data.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._data[key] = body
+            self._bytes += len(body)
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+
+register_stats("response_cache", response_cache.stats)
+
+
+# --- Encoders ---
+def _builtin(obj: Any) -> Any:
+    """json/msgpack `default` hook: NumPy values -> Python, NaN -> None."""
+    if isinstance(obj, np.ndarray):
+        return to_json_list(obj) if obj.dtype.kind == "f" else obj.tolist()
+    if isinstance(obj, np.generic):
+        v = obj.item()
+        return None if isinstance(v, float) and v != v else v
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _orjson_default(obj: Any) -> Any:
+    # orjson only takes C-contiguous plain ndarrays; memmaps and strided views land here
+    if isinstance(obj, np.ndarray) and obj.dtype != object:
+        return np.ascontiguousarray(obj)
+    return _builtin(obj)
+
+
+_ORJSON_OPTS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def encode_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_orjson_default, option=_ORJSON_OPTS)
+    # same settings as FastAPI's JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_builtin).encode("utf-8")
+
+
+def encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, default=_builtin, use_bin_type=True)
+
+
+def encode(content: Any, media_type: str) -> bytes:
+    with span("encode"):
+        return encode_msgpack(content) if media_type == MSGPACK else encode_json(content)
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    with span("compress"):
+        if coding == "br":
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: encode_json instead of json.dumps."""
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+# --- Negotiation ---
+def _qvalues(header: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in header.split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        out[name.lower()] = max(q, out.get(name.lower(), 0.0))
+    return out
+
+
+def negotiate(request: Request) -> str:
+    """MessagePack if the client rates it at least as high as JSON, else JSON."""
+    accept = request.headers.get("accept", "")
+    if msgpack is None or "msgpack" not in accept:
+        return JSON
+    q = _qvalues(accept)
+    q_msgpack = max(q.get(t, 0.0) for t in _MSGPACK_ALIASES)
+    q_json = max(q.get(JSON, 0.0), q.get("application/*", 0.0), q.get("*/*", 0.0))
+    return MSGPACK if q_msgpack > 0 and q_msgpack >= q_json else JSON
+
+
+def accepted_coding(request: Request) -> Optional[str]:
+    ae = request.headers.get("accept-encoding")
+    if not ae:
+        return None
+    q = _qvalues(ae)
+    if brotli is not None and q.get("br", 0.0) > 0:
+        return "br"
+    if q.get("gzip", q.get("*", 0.0)) > 0:
+        return "gzip"
+    return None
+
+
+def _response(body: bytes, media_type: str, headers: dict, coding: Optional[str]) -> Response:
+    if coding:
+        headers = {**headers, "Content-Encoding": coding}
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def respond(request: Request, content: Any) -> Response:
+    """Negotiated, compressed response for payloads that are not cached (call off the loop)."""
+    media = negotiate(request)
+    body = encode(content, media)
+    coding = accepted_coding(request) if len(body) >= COMPRESS_MIN_BYTES else None
+    if coding:
+        body = compress(body, coding)
+    return _response(body, media, {"Vary": VARY}, coding)
+
+
+# --- Conditional GET + server cache ---
+def combined_version(entries: Iterable[Tuple[Any, Optional[Tuple[int, int]]]],
+                     mtime_ns: int = 0) -> Tuple[int, int]:
+    """Version of a response built from many files: (newest mtime_ns, crc of every entry).
+
+    `entries` are (name, (mtime_ns, size) or None) pairs. The first element
+    feeds Last-Modified / If-Modified-Since, so it is the newest mtime behind
+    the body and moves forward when any one file is rewritten; pass the
+    directory's own mtime as `mtime_ns` to cover files being removed. crc32,
+    not hash(), so every worker computes the same ETag.
+    """
+    entries = list(entries)
+    newest = max([mtime_ns, *(v[0] for _, v in entries if v)])
+    return newest, zlib.crc32(repr(entries).encode())
+
+
+def make_etag(request: Request, version: Any) -> str:
+    query = sorted(request.query_params.multi_items())
+    digest = hashlib.sha1(repr((request.url.path, query, version)).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def _not_modified(request: Request, etag: str, mtime_ns: Optional[int]) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+        return inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]
+    ims = request.headers.get("if-modified-since")
+    if ims and mtime_ns is not None:
+        try:
+            return int(mtime_ns // 1_000_000_000) <= int(parsedate_to_datetime(ims).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class _Variant(NamedTuple):
+    etag: str                # one per media type; content codings share it (weak validator)
+    media_type: str
+    coding: Optional[str]    # what the client accepts; used only above COMPRESS_MIN_BYTES
+    headers: dict
+    body: Optional[bytes]    # uncompressed body already in the cache
+
+
+def _conditional(request: Request, version: Tuple[int, int]) -> Tuple[_Variant, Optional[Response]]:
+    media = negotiate(request)
+    etag = make_etag(request, version if media == JSON else (version, media))
+    mtime_ns = version[0] if version else None
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": VARY}
+    if mtime_ns:
+        headers["Last-Modified"] = formatdate(mtime_ns / 1e9, usegmt=True)
+    coding = accepted_coding(request)
+    variant = _Variant(etag, media, coding, headers, None)
+    if _not_modified(request, etag, mtime_ns):
+        return variant, Response(status_code=304, headers=headers)
+    if coding:
+        packed = response_cache.get(f"{etag}:{coding}")
+        if packed is not None:
+            return variant, _response(packed, media, headers, coding)
+    body = response_cache.get(etag)
+    if body is not None and (coding is None or len(body) < COMPRESS_MIN_BYTES):
+        return variant, _response(body, media, headers, None)
+    return variant._replace(body=body), None
+
+
+def _render(variant: _Variant, build: Callable[[], Any]) -> Response:
+    body = variant.body
+    if body is None:
+        body = encode(build(), variant.media_type)
+        response_cache.set(variant.etag, body)
+    coding = variant.coding if len(body) >= COMPRESS_MIN_BYTES else None
+    if coding:
+        body = compress(body, coding)
+        response_cache.set(f"{variant.etag}:{coding}", body)
+    return _response(body, variant.media_type, variant.headers, coding)
+
+
+def cached_json(request: Request, version: Tuple[int, int], build: Callable[[], Any]) -> Response:
+    """Answer from the client's cache (304), the server cache, or by calling build().
+
+    `version` is the (mtime_ns, size) of the data behind the response; it is
+    read with a stat() only, so 304s and cache hits never load or compute.
+    """
+    variant, early = _conditional(request, version)
+    return early if early is not None else _render(variant, build)
+
+
+async def cached_json_offload(request: Request, version: Tuple[int, int], build: Callable[[], Any],
+                              cpu: bool = False) -> Response:
+    """cached_json() for expensive builds: 304s and cache hits are answered on
+    the event loop, a miss is built, encoded and compressed in the I/O thread pool.
+
+    With cpu=True, build() runs in the process pool instead, so it must be a
+    picklable module-level function (or functools.partial of one).
+    """
+    variant, early = _conditional(request, version)
+    if early is not None:
+        return early
+    if cpu and variant.body is None:
+        payload = await run_cpu(build)
+        return await run_io(_render, variant, lambda: payload)
+    return await run_io(_render, variant, build)
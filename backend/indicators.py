@@ -0,0 +1,234 @@
+# backend/indicators.py
+# Whole-array moving averages and linear-trend forecasts shared by the
+# history, chat, trend, backtest and forecast routes.
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import register_stats
+
+
+def sma(values, window: int) -> np.ndarray:
+    """Simple moving average via a cumulative sum; the first window-1 slots are NaN."""
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(x.shape[0], np.nan)
+    if window <= 0 or x.shape[0] < window:
+        return out
+    cs = np.concatenate(([0.0], np.cumsum(x)))
+    out[window - 1:] = (cs[window:] - cs[:-window]) / window
+    return out
+
+
+def ema(values, window: int) -> np.ndarray:
+    """Exponential moving average seeded with the first value (k = 2 / (window + 1)).
+
+    The recurrence e[i] = k*x[i] + a*e[i-1] is unrolled in blocks as
+    e[s+j] = a^(j+1)*e[s-1] + k*a^j*cumsum(x[s+i]*a^-i), with blocks short
+    enough that a^-i stays well inside float64 range.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = x.shape[0]
+    out = np.empty(n)
+    if n == 0:
+        return out
+    k = 2.0 / (window + 1)
+    a = 1.0 - k
+    if a <= 0.0:
+        out[:] = x
+        return out
+    block = max(1, min(256, int(100.0 / -np.log10(a))))
+    powers = a ** np.arange(block + 1)   # a^0 .. a^block
+    inv = 1.0 / powers[:-1]              # a^0 .. a^-(block-1)
+    out[0] = x[0]
+    prev = x[0]
+    for s in range(1, n, block):
+        m = min(block, n - s)
+        acc = np.cumsum(x[s:s + m] * inv[:m])
+        out[s:s + m] = powers[1:m + 1] * prev + k * powers[:m] * acc
+        prev = out[s + m - 1]
+    return out
+
+
+def linear_slope(values, window: int) -> np.ndarray:
+    """Least-squares slope of the trailing `window` values at every bar (NaN before).
+
+    Closed form from two running sums, sum(y) and sum(i*y), so the whole
+    series costs O(n) instead of one polyfit per bar.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = y.shape[0]
+    out = np.full(n, np.nan)
+    if window < 2 or n < window:
+        return out
+    idx = np.arange(n, dtype=np.float64)
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    ciy = np.concatenate(([0.0], np.cumsum(idx * y)))
+    sy = cy[window:] - cy[:-window]
+    # x counted from each window's first bar: sum(x*y) = sum(i*y) - first*sum(y)
+    sxy = (ciy[window:] - ciy[:-window]) - idx[:n - window + 1] * sy
+    sx = window * (window - 1) / 2.0
+    sxx = (window - 1) * window * (2 * window - 1) / 6.0
+    out[window - 1:] = (window * sxy - sx * sy) / (window * sxx - sx * sx)
+    return out
+
+
+def linear_forecast(values, window: int) -> np.ndarray:
+    """Next-bar value of the least-squares line through the trailing `window` values.
+
+    out[i] is what a polyfit over values[i-window+1 : i+1] predicts for bar i+1.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    out = np.full(y.shape[0], np.nan)
+    if window < 2 or y.shape[0] < window:
+        return out
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    mean_y = (cy[window:] - cy[:-window]) / window
+    # intercept + slope*window, with intercept = mean_y - slope*(window-1)/2
+    out[window - 1:] = mean_y + linear_slope(y, window)[window - 1:] * (window + 1) / 2.0
+    return out
+
+
+def to_json_list(values: np.ndarray) -> list:
+    """Float array -> list with NaN mapped to None (JSON null)."""
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+_KERNELS = {"sma": sma, "ema": ema, "forecast": linear_forecast}
+
+
+# --- Cached engine ---
+# One entry per (symbol, indicator, window) holding the full-history series
+# plus its running state. An entry is valid for exactly one data version;
+# when a new version only appends bars to the old one (same base_version,
+# i.e. the CSV under ingested bars was not rewritten), the entry is extended
+# from its state (O(1) per new bar) instead of being recomputed; forecast
+# entries recompute just the last `window` bars.
+class _Entry:
+    __slots__ = ("version", "base", "n", "last_t", "last_c", "buf", "state")
+
+    def __init__(self, version, base, n, last_t, last_c, buf, state):
+        self.version = version
+        self.base = base        # base_version of the series it was built from
+        self.n = n
+        self.last_t = last_t
+        self.last_c = last_c
+        self.buf = buf          # capacity-doubling buffer; values are buf[:n]
+        self.state = state      # SMA: rolling sum of the last `window` closes; EMA: last value
+
+
+class IndicatorEngine:
+    """Bounded LRU of full-history SMA/EMA/forecast series keyed by (symbol, kind, window)."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.extends = 0
+
+    def _build(self, kind: str, closes: np.ndarray, window: int, version, base, t: np.ndarray) -> _Entry:
+        values = _KERNELS[kind](closes, window)
+        n = values.shape[0]
+        buf = np.empty(max(16, n * 2))
+        buf[:n] = values
+        if kind == "sma":
+            state = float(closes[-window:].sum()) if n >= window else float(closes.sum())
+        else:
+            state = float(values[-1]) if n else None
+        return _Entry(version, base, n, int(t[-1]) if n else None, float(closes[-1]) if n else None, buf, state)
+
+    def _extend(self, e: _Entry, kind: str, closes: np.ndarray, window: int, version, t: np.ndarray) -> None:
+        n_new = closes.shape[0]
+        if n_new > e.buf.shape[0]:
+            buf = np.empty(n_new * 2)
+            buf[:e.n] = e.buf[:e.n]
+            e.buf = buf
+        if kind == "forecast":
+            # only the last window-1 old closes feed the new values: recompute that tail
+            lo = max(0, e.n - window + 1)
+            e.buf[e.n:n_new] = linear_forecast(closes[lo:n_new], window)[e.n - lo:]
+            e.n, e.version = n_new, version
+            e.last_t, e.last_c = int(t[-1]), float(closes[-1])
+            return
+        k = 2.0 / (window + 1)
+        state = e.state
+        for i in range(e.n, n_new):
+            x = float(closes[i])
+            if kind == "sma":
+                state += x
+                if i >= window:
+                    state -= float(closes[i - window])
+                e.buf[i] = state / window if i >= window - 1 else np.nan
+            else:
+                state = x if state is None else x * k + state * (1 - k)
+                e.buf[i] = state
+        e.state, e.n, e.version = state, n_new, version
+        e.last_t, e.last_c = int(t[-1]), float(closes[-1])
+
+    def _series(self, s, kind: str, window: int) -> np.ndarray:
+        key = (s.symbol.upper(), kind, window)
+        closes, n = s.c, len(s)
+        base = s.base_version or s.version
+        with self._lock:
+            e = self._entries.get(key)
+            if e is not None and e.version == s.version and e.n == n:
+                self.hits += 1
+            elif (e is not None and e.base == base and 0 < e.n < n
+                  and int(s.t[e.n - 1]) == e.last_t and float(closes[e.n - 1]) == e.last_c):
+                self.extends += 1
+                self._extend(e, kind, closes, window, s.version, s.t)
+            else:
+                self.misses += 1
+                e = self._build(kind, closes, window, s.version, base, s.t)
+                self._entries[key] = e
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            out = e.buf[:e.n]
+        out = out.view()
+        out.flags.writeable = False
+        return out
+
+    def sma(self, s, window: int) -> np.ndarray:
+        """SMA over the full history of series `s` (NaN for the first window-1 bars)."""
+        return self._series(s, "sma", window)
+
+    def ema(self, s, window: int) -> np.ndarray:
+        """EMA over the full history of series `s`, seeded with the first close."""
+        return self._series(s, "ema", window)
+
+    def forecast(self, s, window: int = 60) -> np.ndarray:
+        """Linear-trend next-bar forecast made at every bar (NaN for the first window-1)."""
+        return self._series(s, "forecast", window)
+
+    def last_sma(self, s, window: int, bars: int | None = None):
+        """Latest SMA value, or None when fewer than `window` bars (of the last `bars`) exist."""
+        if min(len(s), bars if bars is not None else len(s)) < window:
+            return None
+        return float(self.sma(s, window)[-1])
+
+    # The history endpoint reports indicators computed over the displayed
+    # window only; both are derived from the cached full-history series.
+    def window_sma(self, s, start: int, window: int) -> np.ndarray:
+        out = self.sma(s, window)[start:].copy()
+        out[:window - 1] = np.nan
+        return out
+
+    def window_ema(self, s, start: int, window: int) -> np.ndarray:
+        # An EMA seeded at bar `start` differs from the full-history EMA by a
+        # term that decays geometrically: (c[start] - e[start]) * a^j.
+        full = self.ema(s, window)[start:]
+        if full.shape[0] == 0:
+            return full.copy()
+        a = 1.0 - 2.0 / (window + 1)
+        return full + (float(s.c[start]) - full[0]) * a ** np.arange(full.shape[0])
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "extends": self.extends}
+
+
+engine = IndicatorEngine(int(os.getenv("INDICATOR_CACHE_SIZE", "1024")))
+register_stats("indicator_cache", engine.stats)
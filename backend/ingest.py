@@ -0,0 +1,134 @@
+# backend/ingest.py
+# POST /api/bars: append batches of new OHLCV bars for many symbols.
+#
+# Bars go to each symbol's write-ahead log under BARS_DIR (segments.py), one
+# write() per symbol per batch; the price store picks them up on the next
+# request by reading only the new WAL records, so /api/history, /api/quote,
+# the screener and live SSE streams see them without a reload. A background
+# task folds WALs of at least COMPACT_MIN_BYTES into the compacted segment
+# every COMPACT_SECONDS.
+#
+# Only symbols that have a CSV in data/ are accepted, and only bars dated
+# after a symbol's current last bar; older or duplicate dates are counted
+# as rejected.
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from fastapi import APIRouter, Body, HTTPException
+from pydantic import BaseModel, Field, model_validator
+
+import segments
+from executor import run_io
+from metrics import register_stats, span
+from price_store import store, symbol_to_path
+
+router = APIRouter(prefix="/api", tags=["ingest"])
+
+MAX_BARS = int(os.getenv("INGEST_MAX_BARS", "200000"))  # per request, across symbols
+COMPACT_SECONDS = float(os.getenv("COMPACT_SECONDS", "30"))
+COMPACT_MIN_BYTES = int(os.getenv("COMPACT_MIN_BYTES", str(64 * 1024)))
+
+_counters = {"batches": 0, "accepted": 0, "rejected": 0, "compactions": 0, "compacted_bars": 0}
+register_stats("ingest", lambda: dict(_counters))
+
+
+class BarColumns(BaseModel):
+    """Parallel arrays, like the columnar history format. `t` is epoch ms or ISO dates."""
+    t: List[Union[int, str]] = Field(..., min_length=1)
+    o: List[float]
+    h: List[float]
+    l: List[float]
+    c: List[float]
+    v: Optional[List[float]] = None
+
+    @model_validator(mode="after")
+    def _same_length(self):
+        n = len(self.t)
+        if any(len(col) != n for col in (self.o, self.h, self.l, self.c)) or (self.v is not None and len(self.v) != n):
+            raise ValueError("t, o, h, l, c (and v) must have the same length")
+        return self
+
+    def arrays(self):
+        t = np.asarray(self.t)
+        if t.dtype.kind not in "iu":
+            t = np.asarray(self.t, dtype="datetime64[ms]")  # ValueError on a bad date
+        t = t.astype(np.int64)
+        v = self.v if self.v is not None else np.zeros(len(self.t))
+        ohlcv = np.array([self.o, self.h, self.l, self.c, v], dtype=np.float64)
+        ok = np.isfinite(ohlcv).all(axis=0)
+        order = np.argsort(t[ok], kind="stable")
+        return t[ok][order], ohlcv[:, ok][:, order], int((~ok).sum())
+
+class BarsIn(BaseModel):
+    bars: Dict[str, BarColumns] = Field(..., min_length=1, description="symbol -> columns")
+
+
+def ingest(req: BarsIn) -> dict:
+    results, errors = {}, {}
+    with span("ingest"):
+        for symbol, cols in req.bars.items():
+            try:
+                current = store.get(symbol)
+                t, ohlcv, bad = cols.arrays()
+            except HTTPException as e:
+                errors[symbol] = e.detail
+                continue
+            except ValueError as e:
+                errors[symbol] = f"Bad date in t: {e}"
+                continue
+            stem = symbol_to_path(symbol, store.data_dir).stem
+            floor = int(current.t[-1]) if len(current) else None
+            accepted, rejected = segments.append(store.bars_dir, stem, t, ohlcv, floor)
+            results[symbol] = {"accepted": accepted, "rejected": rejected + bad}
+    _counters["batches"] += 1
+    _counters["accepted"] += sum(r["accepted"] for r in results.values())
+    _counters["rejected"] += sum(r["rejected"] for r in results.values())
+    return {"accepted": sum(r["accepted"] for r in results.values()),
+            "rejected": sum(r["rejected"] for r in results.values()),
+            "results": results, "errors": errors}
+
+@router.post("/bars")
+async def post_bars(req: BarsIn = Body(...)):
+    if store.bars_dir is None:
+        raise HTTPException(status_code=503, detail="Ingestion disabled (BARS_DIR is empty)")
+    total = sum(len(cols.t) for cols in req.bars.values())
+    if total > MAX_BARS:
+        raise HTTPException(status_code=413, detail=f"{total} bars in one request (max {MAX_BARS})")
+    return await run_io(ingest, req)
+
+
+# --- Background compaction ---
+def compact_all(min_bytes: int = COMPACT_MIN_BYTES) -> int:
+    """Compact every WAL of at least min_bytes; returns the number of bars moved."""
+    moved = 0
+    for wal in sorted(store.bars_dir.glob("*.wal")):
+        try:
+            if wal.stat().st_size < max(min_bytes, segments.RECORD.itemsize):
+                continue
+        except OSError:
+            continue
+        with span("compact"):
+            n = segments.compact(store.bars_dir, wal.stem)
+        if n:
+            _counters["compactions"] += 1
+            _counters["compacted_bars"] += n
+            moved += n
+    return moved
+
+async def compact_forever() -> None:
+    while True:
+        await asyncio.sleep(COMPACT_SECONDS)
+        try:
+            await run_io(compact_all)
+        except Exception as e:  # keep compacting the other symbols next round
+            print(f"compaction failed: {e}", file=sys.stderr)
+
+def start_compactor() -> Optional[asyncio.Task]:
+    if store.bars_dir is None or COMPACT_SECONDS <= 0:
+        return None
+    return asyncio.create_task(compact_forever())
@@ -0,0 +1,174 @@
+# backend/llm.py
+# Shared async LLM gateway used by chat, trend_ai and the news summarizer.
+# One pooled AsyncGroq client per worker, bounded concurrency, a hard
+# timeout, and in-flight de-duplication: identical requests made while one
+# is pending await the same result instead of issuing a second completion.
+# stream() yields the text as the model produces it (chat's SSE route); it
+# is never coalesced, and the timeout applies to each wait for a chunk.
+#
+# Point GROQ_BASE_URL at a local server (see stubs/llm_stub.py) to run
+# everything without network access.
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from metrics import register_stats, span
+
+
+class LLMError(RuntimeError):
+    """The completion failed or timed out; callers fall back to heuristics."""
+
+
+class LLMUnavailable(LLMError):
+    """No API key configured (or the groq package is missing)."""
+
+
+@functools.lru_cache(maxsize=1)  # a failed import is retried on every call otherwise
+def _groq_installed() -> bool:
+    try:
+        import groq  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency: int = 4, timeout: float = 20.0, max_retries: int = 1):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # counters (read by the metrics endpoint)
+        self.calls = self.errors = self.coalesced = self.streams = 0
+        self.total_seconds = self.first_token_seconds = 0.0
+
+    @staticmethod
+    def available() -> bool:
+        return bool(os.getenv("GROQ_API_KEY")) and _groq_installed()
+
+    @staticmethod
+    def model() -> str:
+        return os.getenv("GROQ_MODEL", "llama3-8b-8192")
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+            from groq import AsyncGroq
+            limits = httpx.Limits(max_connections=self.max_concurrency * 2,
+                                  max_keepalive_connections=self.max_concurrency)
+            self._client = AsyncGroq(
+                api_key=os.getenv("GROQ_API_KEY"),
+                max_retries=self.max_retries,
+                timeout=self.timeout,
+                http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout),
+            )
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.close()
+
+    async def complete(self, messages: List[Dict[str, Any]], *, temperature: float = 0.2,
+                       model: Optional[str] = None) -> str:
+        """Return the completion text for `messages`, sharing any identical pending call."""
+        if not self.available():
+            raise LLMUnavailable("GROQ_API_KEY is not set")
+        model = model or self.model()
+        key = hashlib.sha256(
+            json.dumps([model, temperature, messages], sort_keys=True, ensure_ascii=False).encode()
+        ).hexdigest()
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._call(model, messages, temperature))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _f, k=key: self._inflight.pop(k, None))
+        else:
+            self.coalesced += 1
+        # shield: one caller disconnecting must not cancel the others' result
+        return await asyncio.shield(fut)
+
+    async def _call(self, model: str, messages: List[Dict[str, Any]], temperature: float) -> str:
+        client = self._get_client()
+        async with self._sem:
+            self.calls += 1
+            t0 = time.perf_counter()
+            try:
+                with span("llm"):
+                    resp = await asyncio.wait_for(
+                        client.chat.completions.create(model=model, messages=messages, temperature=temperature),
+                        timeout=self.timeout,
+                    )
+            except asyncio.TimeoutError as e:
+                self.errors += 1
+                raise LLMError(f"LLM request timed out after {self.timeout:.0f}s") from e
+            except Exception as e:
+                self.errors += 1
+                raise LLMError(str(e)) from e
+            finally:
+                self.total_seconds += time.perf_counter() - t0
+        return resp.choices[0].message.content or ""
+
+    async def stream(self, messages: List[Dict[str, Any]], *, temperature: float = 0.2,
+                     model: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the completion text piece by piece as it arrives."""
+        if not self.available():
+            raise LLMUnavailable("GROQ_API_KEY is not set")
+        client = self._get_client()
+        async with self._sem:
+            self.calls += 1
+            self.streams += 1
+            t0 = time.perf_counter()
+            first = True
+            resp = None
+            try:
+                resp = await asyncio.wait_for(
+                    client.chat.completions.create(model=model or self.model(), messages=messages,
+                                                   temperature=temperature, stream=True),
+                    timeout=self.timeout,
+                )
+                chunks = resp.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+                    except StopAsyncIteration:
+                        break
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if not text:
+                        continue
+                    if first:
+                        self.first_token_seconds += time.perf_counter() - t0
+                        first = False
+                    yield text
+            except asyncio.TimeoutError as e:
+                self.errors += 1
+                raise LLMError(f"LLM stream stalled for {self.timeout:.0f}s") from e
+            except Exception as e:
+                self.errors += 1
+                raise LLMError(str(e)) from e
+            finally:
+                self.total_seconds += time.perf_counter() - t0
+                if resp is not None:
+                    await resp.close()  # also when the client went away mid-stream
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "errors": self.errors, "coalesced": self.coalesced,
+                "streams": self.streams, "inflight": len(self._inflight),
+                "total_seconds": round(self.total_seconds, 6),
+                "first_token_seconds": round(self.first_token_seconds, 6)}
+
+
+gateway = LLMGateway(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+    timeout=float(os.getenv("LLM_TIMEOUT", "20")),
+)
+register_stats("llm", gateway.stats)
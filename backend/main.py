@@ -1,23 +1,67 @@
 # backend/main.py
 from fastapi import FastAPI, Query, HTTPException, Request
+import asyncio
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from contextlib import asynccontextmanager
+from datetime import date
 from pathlib import Path
-from typing import List
-import pandas as pd
+from typing import List, Optional, Union
 import numpy as np
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from fastapi import Body
-from groq import Groq
-from chatbot import router as chatbot_router  # Import the chatbot router
+from chatbot import router as chatbot_router, warm_summaries  # Import the chatbot router
 from news_summarizer import router as news_router
+from screener import router as screener_router
+from stream import router as stream_router
+from forecast import router as forecast_router
+from analytics import router as analytics_router
+from sentiment import router as sentiment_router
+from ingest import router as ingest_router, start_compactor
+from catalog import catalog, start_poller as start_catalog_poller
+from backtest import router as backtest_router
+from price_store import (PriceSeries, store, get_series, DATA_DIR as PRICE_DATA_DIR,
+                         PERIOD_MONTHS, period_bounds, to_epoch_ms)
+from indicators import engine, linear_forecast
+from http_cache import cached_json, cached_json_offload, respond, FastJSONResponse
+from resample import resampled, lttb
+from llm import gateway
+from feeds import fetcher
+from metrics import router as metrics_router, span, TimingMiddleware, ENABLED as METRICS_ENABLED
+from executor import AdmissionMiddleware, ADMISSION_ENABLED, run_io, shutdown as shutdown_executor
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    catalog.refresh()  # loads every CSV once and builds the symbol catalog; later requests only stat
+    tasks = [t for t in (start_compactor(), start_catalog_poller()) if t is not None]
+    # chat context for the default period, so the first message only waits for the model
+    tasks.append(asyncio.create_task(run_io(warm_summaries, catalog.symbols())))
+    yield
+    for task in tasks:
+        task.cancel()
+    await gateway.aclose()
+    await fetcher.aclose()
+    shutdown_executor()
 
 # --- FastAPI setup ---
-app = FastAPI(title="Stock Dashboard (Mock Only)")
+app = FastAPI(title="Stock Dashboard (Mock Only)", lifespan=lifespan,
+              default_response_class=FastJSONResponse)  # orjson when installed
 app.include_router(chatbot_router)  # Include the chatbot API router
 app.include_router(news_router)
+app.include_router(screener_router)
+app.include_router(stream_router)
+app.include_router(backtest_router)
+app.include_router(forecast_router)
+app.include_router(analytics_router)
+app.include_router(sentiment_router)
+app.include_router(ingest_router)
+app.include_router(metrics_router)
+if METRICS_ENABLED:
+    app.add_middleware(TimingMiddleware)  # Server-Timing header + per-route latency histograms
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)  # per-route concurrency caps, 503 when saturated
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,7 +75,7 @@ app.add_middleware(
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
 TEMPLATES_DIR = BASE_DIR / "templates"
-DATA_DIR = BASE_DIR / "data"
+DATA_DIR = PRICE_DATA_DIR
 
 # Ensure folders exist
 STATIC_DIR.mkdir(exist_ok=True)
@@ -47,89 +91,55 @@ FALLBACK_TICKERS = [
     "IBM","ORCL","ADBE","SAP","AVGO"
 ]
 
-PERIOD_TO_DAYS = {
-    "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260, "max": 10_000
-}
-
 # --- Utilities ---
 def available_symbols() -> list[str]:
-    """Return tickers based on CSV files present in /data (case-insensitive)."""
-    files = list(DATA_DIR.glob("*.csv")) + list(DATA_DIR.glob("*.CSV"))
-    syms = [p.stem.replace('_','^') for p in files]  # map "_" back to "^" if you used that convention
-    syms = sorted(set(syms))
-    return syms or FALLBACK_TICKERS  # fallback only when folder is empty
-
-def load_csv(symbol: str) -> pd.DataFrame:
-    path = DATA_DIR / f"{symbol.replace('^','_')}.csv"
-    if not path.exists():
-        raise HTTPException(status_code=404, detail=f"No mock dataset for {symbol}")
-    try:
-        df = pd.read_csv(path, parse_dates=["Date"]).sort_values("Date")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read {path.name}: {e}")
-    # basic header validation
-    need = {"Open","High","Low","Close","Volume"}
-    if not need.issubset(df.columns):
-        raise HTTPException(status_code=400, detail=f"Bad columns in {path.name}. Need {sorted(need)}")
-    return df
-
-def slice_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
-    n = PERIOD_TO_DAYS.get(period, 126)
-    return df.tail(n)
-
-def df_to_points(df: pd.DataFrame):
-    return [
-        {
-            "t": int(pd.Timestamp(row["Date"]).timestamp() * 1000),
-            "o": float(row["Open"]),
-            "h": float(row["High"]),
-            "l": float(row["Low"]),
-            "c": float(row["Close"]),
-            "v": float(row["Volume"]),
-        }
-        for _, row in df.iterrows()
-    ]
-
-def compute_indicators(points, sma_window=20, ema_window=20):
-    closes = [p["c"] for p in points]
-    # SMA
-    sma = []
-    for i in range(len(closes)):
-        if i + 1 < sma_window:
-            sma.append(None)
-        else:
-            sma.append(float(np.mean(closes[i + 1 - sma_window:i + 1])))
-    # EMA
-    ema = []
-    k = 2 / (ema_window + 1)
-    prev = None
-    for c in closes:
-        if prev is None:
-            prev = c
-        else:
-            prev = c * k + prev * (1 - k)
-        ema.append(float(prev))
-    return sma, ema
+    """Tickers from the symbol catalog (CSV files in /data, "_" mapped back to "^")."""
+    return catalog.symbols() or FALLBACK_TICKERS  # fallback only when folder is empty
+
+POINT_KEYS = ("t", "o", "h", "l", "c", "v")
+
+def df_to_points(series: PriceSeries):
+    # dates are already int64 epoch-ms; one tolist() per column, no per-row conversion
+    cols = [series.t.tolist(), *series.ohlcv.tolist()]
+    return [dict(zip(POINT_KEYS, row)) for row in zip(*cols)]
+
+def df_to_columns(series: PriceSeries):
+    # arrays as-is: the response encoder writes them without a Python list in between
+    return dict(zip(POINT_KEYS, [series.t, *series.ohlcv]))
 
-def stats_52w_full(df_full: pd.DataFrame):
+def compute_indicators(full: PriceSeries, start: int, end: int, sma_window=20, ema_window=20):
+    """SMA/EMA over full[start:end], served from the cached full-history series."""
+    n = end - start
+    return engine.window_sma(full, start, sma_window)[:n], engine.window_ema(full, start, ema_window)[:n]
+
+def stats_52w_full(full: PriceSeries):
     """Compute 52-week stats from the full dataset (last 252 rows)."""
-    last = df_full.tail(252)
-    if last.empty:
+    last = full.tail(252)
+    if len(last) == 0:
         return None, None, None
     return (
-        float(last["High"].max()),
-        float(last["Low"].min()),
-        float(last["Volume"].mean())
+        float(last.h.max()),
+        float(last.l.min()),
+        float(last.v.mean())
     )
 
-def naive_next_day_forecast(points):
-    N = min(60, len(points))
+FORECAST_WINDOW = 60
+
+def naive_next_day_forecast(closes: np.ndarray):
+    """Linear trend through the last (up to) 60 closes, extended one bar."""
+    N = min(FORECAST_WINDOW, len(closes))
     if N < 5:
         return None
-    closes = np.array([p["c"] for p in points][-N:])
-    x = np.arange(N)
-    slope, intercept = np.polyfit(x, closes, 1)
-    return float(intercept + slope * N)
+    return float(linear_forecast(closes[-N:], N)[-1])
+
+def forecast_at(full: PriceSeries, end: int, bars: int):
+    """naive_next_day_forecast for a window of `bars` bars ending at full[end-1].
+
+    Full 60-bar windows read the engine's cached every-bar forecast series.
+    """
+    if bars >= FORECAST_WINDOW:
+        return float(engine.forecast(full, FORECAST_WINDOW)[end - 1])
+    return naive_next_day_forecast(full.c[end - bars:end])
 
 # --- Routes ---
 @app.get("/")
@@ -137,41 +147,87 @@ async def home(request: Request):
     tickers = available_symbols()
     return templates.TemplateResponse("index.html", {"request": request, "tickers": tickers})
 
-@app.get("/api/companies")
-async def companies() -> List[str]:
-    # Dynamic: list whatever CSVs are present (fallback if none)
-    return available_symbols()
+def build_companies(region: Optional[str] = None, q: Optional[str] = None, min_rows: int = 0,
+                    details: bool = False):
+    entries = catalog.entries()
+    if not entries:  # fallback list when /data is empty
+        entries = [{"symbol": s, "region": "US", "currency": "USD", "rows": 0} for s in FALLBACK_TICKERS]
+    if region:
+        entries = [e for e in entries if e["region"] == region]
+    if q:
+        entries = [e for e in entries if q.upper() in e["symbol"].upper()]
+    if min_rows:
+        entries = [e for e in entries if e["rows"] >= min_rows]
+    return entries if details else [e["symbol"] for e in entries]
 
-# --- API: history & quote (mock-only) ---
-@app.get("/api/history")
-async def history(symbol: str = Query(...), period: str = Query("6mo")):
-    df_full = load_csv(symbol)
-    df = slice_period(df_full, period)
-    if df.empty:
+@app.get("/api/companies", response_model=Union[List[str], List[dict]])
+async def companies(
+    request: Request,
+    region: Optional[str] = Query(None, pattern="^(US|IN)$", description="US listings or Indian (.NS/.BO) ones"),
+    q: Optional[str] = Query(None, max_length=32, description="Case-insensitive substring of the symbol"),
+    min_rows: int = Query(0, ge=0, description="Only symbols with at least this many bars"),
+    details: bool = Query(False, description="Return catalog entries (dates, rows, currency, version) instead of names"),
+):
+    # served from the symbol catalog; the ETag changes when any file behind it does
+    catalog.symbols()  # picks up added/removed files before the version is read
+    return cached_json(request, catalog.version, lambda: build_companies(region, q, min_rows, details))
+
+# --- Payload builders (shared by the single-symbol routes and /api/batch) ---
+def build_history(full: PriceSeries, symbol: str, period: str, format: str = "points", stats52=None,
+                  interval: str = "1d", max_points: Optional[int] = None,
+                  start: Optional[date] = None, end: Optional[date] = None):
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    i, j = period_bounds(full, period,
+                         to_epoch_ms(start) if start else None, to_epoch_ms(end) if end else None)
+    if i >= j:
         raise HTTPException(status_code=404, detail=f"No data for {symbol} in mock CSV")
-    points = df_to_points(df)
-    sma, ema = compute_indicators(points)
-    high52, low52, avg_vol = stats_52w_full(df_full)  # ← compute from full data
-    forecast = naive_next_day_forecast(points)
-    return {
+    daily = full.window(i, j)
+    daily_end = j
+    if interval == "1d":
+        bars = full
+    else:
+        with span("resample"):
+            bars = resampled.get(full, interval)
+        # aggregated bars whose buckets contain the window's first and last day
+        i = max(0, int(np.searchsorted(bars.t, daily.t[0], side="right")) - 1)
+        j = int(np.searchsorted(bars.t, daily.t[-1], side="right"))
+    disp = bars.window(i, j)
+    with span("indicators"):
+        sma, ema = compute_indicators(bars, i, j)
+    high52, low52, avg_vol = stats52 or stats_52w_full(full)  # ← compute from full data
+    with span("forecast"):
+        forecast = forecast_at(full, daily_end, len(daily))  # always a next-trading-day forecast
+    out = {
         "symbol": symbol.upper(),
         "period": period,
-        "interval": "1d",
-        "points": points,
-        "indicators": {"sma20": sma, "ema20": ema},
-        "stats": {"high_52w": high52, "low_52w": low52, "avg_volume_1y": avg_vol},
-        "prediction": {"next_day_close_forecast": forecast}
+        "interval": interval,
     }
+    if start or end:
+        out["start"], out["end"] = (start.isoformat() if start else None), (end.isoformat() if end else None)
+    if max_points and len(disp) > max_points:
+        with span("downsample"):
+            idx = lttb(disp.t, disp.c, max_points)
+            out["downsampled"] = {"method": "lttb", "from": len(disp), "to": int(idx.shape[0])}
+            disp, sma, ema = disp.take(idx), sma[idx], ema[idx]
+    with span("points"):
+        if format == "columnar":
+            # parallel arrays instead of one dict per bar (much smaller JSON)
+            out["format"] = "columnar"
+            out["columns"] = {**df_to_columns(disp), "sma20": sma, "ema20": ema}
+        else:
+            out["points"] = df_to_points(disp)
+            out["indicators"] = {"sma20": sma, "ema20": ema}
+    out["stats"] = {"high_52w": high52, "low_52w": low52, "avg_volume_1y": avg_vol}
+    out["prediction"] = {"next_day_close_forecast": forecast}
+    return out
 
-@app.get("/api/quote")
-async def quote(symbol: str = Query(...)):
-    df = load_csv(symbol)
-    if len(df) == 0:
+def build_quote(series: PriceSeries, symbol: str):
+    if len(series) == 0:
         raise HTTPException(status_code=404, detail=f"No data for {symbol}")
-    last = df.iloc[-1]
-    prev = df.iloc[-2] if len(df) > 1 else None
-    last_close = float(last["Close"])
-    previous_close = float(prev["Close"]) if prev is not None else None
+    closes = series.c
+    last_close = float(closes[-1])
+    previous_close = float(closes[-2]) if len(closes) > 1 else None
     change = (last_close - previous_close) if previous_close is not None else None
     change_pct = (change / previous_close * 100) if (change is not None and previous_close) else None
     return {
@@ -184,3 +240,64 @@ async def quote(symbol: str = Query(...)):
         "exchange": None,
         "market_cap": None
     }
+
+# --- API: history & quote (mock-only) ---
+# ETag/304 and the serialized-response cache only need a stat() of the CSV.
+# History builds run in the I/O thread pool; quote and companies are the
+# fast lane and answer on the event loop (see executor.py).
+@app.get("/api/history")
+async def history(
+    request: Request,
+    symbol: str = Query(...),
+    period: str = Query("6mo", description="Calendar span ending at `end` (or the last bar)"),
+    format: str = Query("points", pattern="^(points|columnar)$"),
+    interval: str = Query("1d", pattern="^(1d|1wk|1mo)$"),
+    max_points: Optional[int] = Query(None, ge=3, le=100_000, description="LTTB-downsample to at most this many bars"),
+    start: Optional[date] = Query(None, description="First date (inclusive); overrides period"),
+    end: Optional[date] = Query(None, description="Last date (inclusive)"),
+):
+    return await cached_json_offload(request, store.version(symbol),
+                                     lambda: build_history(get_series(symbol), symbol, period, format,
+                                                           interval=interval, max_points=max_points,
+                                                           start=start, end=end))
+
+@app.get("/api/quote")
+async def quote(request: Request, symbol: str = Query(...)):
+    return cached_json(request, store.version(symbol), lambda: build_quote(get_series(symbol), symbol))
+
+class BatchRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, max_length=50)
+    periods: List[str] = Field(default_factory=lambda: ["6mo"], max_length=len(PERIOD_MONTHS))
+    include_quote: bool = True
+    format: str = Field("points", pattern="^(points|columnar)$")
+    interval: str = Field("1d", pattern="^(1d|1wk|1mo)$")
+    max_points: Optional[int] = Field(None, ge=3, le=100_000)
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+def build_batch(req: BatchRequest) -> dict:
+    results, errors = {}, {}
+    for symbol in dict.fromkeys(req.symbols):  # de-duplicate, keep order
+        try:
+            full = get_series(symbol)
+            stats52 = stats_52w_full(full)
+            entry = {"history": {
+                p: build_history(full, symbol, p, req.format, stats52, req.interval, req.max_points,
+                                 req.start, req.end)
+                for p in dict.fromkeys(req.periods)
+            }}
+            if req.include_quote:
+                entry["quote"] = build_quote(full, symbol)
+            results[symbol] = entry
+        except HTTPException as e:
+            errors[symbol] = e.detail
+    return {"results": results, "errors": errors}
+
+@app.post("/api/batch")
+async def batch(request: Request, req: BatchRequest = Body(...)):
+    """Quote + several history periods for several symbols in one round trip.
+
+    Each symbol is loaded once and its 52-week stats are shared by all periods.
+    A missing symbol is reported under "errors" instead of failing the batch.
+    """
+    return await run_io(lambda: respond(request, build_batch(req)))
@@ -0,0 +1,176 @@
+# backend/metrics.py
+# Hot-path instrumentation: timing spans, per-stage latency histograms, a
+# Server-Timing response header and GET /api/metrics.
+#
+# Off by default; set METRICS_ENABLED=1. When disabled, span() returns a
+# shared no-op context manager and the middleware is not installed, so the
+# cost is one function call per span. Cache/LLM counters registered via
+# register_stats() are always reported by /api/metrics.
+from __future__ import annotations
+
+import bisect
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter
+
+ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+
+router = APIRouter(prefix="/api", tags=["metrics"])
+
+# upper bounds in milliseconds; the last bucket catches everything above
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        i = bisect.bisect_left(BUCKETS_MS, ms)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing the q-quantile."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, c in zip(BUCKETS_MS, self.counts):
+            seen += c
+            if seen >= target:
+                return self.max_ms if bound == float("inf") else bound
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in zip(BUCKETS_MS, self.counts) if c},
+        }
+
+
+_histograms: Dict[str, Histogram] = {}
+_hist_lock = threading.Lock()
+
+MAX_SERIES = 512  # cap on distinct histogram names (e.g. junk request paths)
+
+def observe(name: str, ms: float) -> None:
+    h = _histograms.get(name)
+    if h is None:
+        with _hist_lock:
+            if len(_histograms) >= MAX_SERIES and name not in _histograms:
+                return
+            h = _histograms.setdefault(name, Histogram())
+    h.observe(ms)
+
+
+def reset() -> None:
+    """Drop all histograms (serve.py: so warmup requests are not reported by the workers)."""
+    with _hist_lock:
+        _histograms.clear()
+
+
+# spans recorded during the current request, for the Server-Timing header
+_request_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_spans", default=None
+)
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.t0) * 1000.0
+        observe(f"stage:{self.name}", ms)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((self.name, ms))
+        return False
+
+
+_NOOP = contextlib.nullcontext()
+
+def span(name: str):
+    """Time a block: `with span("indicators"): ...`."""
+    return _Span(name) if ENABLED else _NOOP
+
+
+# --- Counters owned by other modules (caches, LLM gateway, feed fetcher) ---
+_stats: Dict[str, Callable[[], dict]] = {}
+
+def register_stats(name: str, fn: Callable[[], dict]) -> None:
+    _stats[name] = fn
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware: request latency histogram per route + Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        spans: List[Tuple[str, float]] = []
+        token = _request_spans.set(spans)
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                total = (time.perf_counter() - t0) * 1000.0
+                parts = [f"{name};dur={ms:.3f}" for name, ms in spans]
+                parts.append(f"app;dur={total:.3f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(parts).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_spans.reset(token)
+            observe(f"http:{scope.get('method', '')} {scope.get('path', '')}",
+                    (time.perf_counter() - t0) * 1000.0)
+
+
+@router.get("/metrics")
+async def metrics():
+    counters = {}
+    for name, fn in _stats.items():
+        try:
+            counters[name] = fn()
+        except Exception as e:  # a broken provider must not take the endpoint down
+            counters[name] = {"error": str(e)}
+    return {
+        "enabled": ENABLED,
+        "pid": os.getpid(),  # which worker answered, under serve.py
+        "histograms": {name: h.snapshot() for name, h in sorted(_histograms.items())},
+        "counters": counters,
+    }
@@ -4,12 +4,13 @@ from __future__ import annotations
 from fastapi import APIRouter
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Tuple, Any, Annotated
-import os, time, json, re, hashlib
+import json, re, hashlib
 
-try:
-    from groq import Groq
-except Exception:
-    Groq = None  # optional dependency
+from llm import gateway
+from feeds import fetcher
+from cache import TieredCache
+from metrics import register_stats
+from sentiment import label_text
 
 router = APIRouter(prefix="/api", tags=["news"])
 
@@ -30,45 +31,21 @@ class NewsSummarizeOut(BaseModel):
     risk: str
     origin: str     # "llm" | "heuristic"
 
-# --------- Small TTL cache (5 min) ----------
-_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+# --------- TTL cache (5 min): LRU, size-bounded, shared across workers ----------
 TTL = 300.0
+_CACHE = TieredCache("news", ttl=TTL)
+register_stats("news_cache", _CACHE.stats)
 
-def _cache_get(key: str) -> Optional[Dict[str, Any]]:
-    row = _CACHE.get(key)
-    if not row:
-        return None
-    exp, data = row
-    if time.time() > exp:
-        _CACHE.pop(key, None)
-        return None
-    return data
+async def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    return await _CACHE.aget(key)
 
-def _cache_set(key: str, data: Dict[str, Any]) -> None:
-    _CACHE[key] = (time.time() + TTL, data)
+async def _cache_set(key: str, data: Dict[str, Any]) -> None:
+    await _CACHE.aset(key, data)
 
 # --------- Heuristic fallback ----------
-_POS = {
-    "beat","beats","growth","surge","up","rises","record","strong","profit",
-    "upgrade","positive","gain","outperform"
-}
-_NEG = {
-    "miss","misses","fall","falls","down","drop","weak","loss","downgrade",
-    "negative","decline","probe","investigation","fraud","scam","ban"
-}
-
-def _simple_sentiment(text: str) -> str:
-    t = text.lower()
-    score = sum(w in t for w in _POS) - sum(w in t for w in _NEG)
-    if score > 1:
-        return "positive"
-    if score < -1:
-        return "negative"
-    return "neutral"
-
 def _heuristic_summary(payload: NewsSummarizeIn) -> Dict[str, Any]:
     joined = " ".join([(i.title or "") + " " + (i.snippet or "") for i in payload.items])
-    sentiment = _simple_sentiment(joined)
+    sentiment = label_text(joined)  # tokenized lexicon, see sentiment.py
     # Pick up to 3 concise bullets from titles/snippets
     bullets: List[str] = []
     for i in payload.items[:5]:
@@ -96,20 +73,38 @@ def _extract_json(text: str) -> Optional[Dict[str, Any]]:
             return None
     return None
 
+async def _llm_summary(prompt: str) -> Dict[str, Any]:
+    """Run the summary prompt through the shared gateway and validate the JSON."""
+    content = await gateway.complete(
+        [
+            {"role": "system", "content": "Output only valid JSON. Avoid advice; keep it concise."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.2,
+    )
+    data = _extract_json(content) or {}
+    bullets = [str(b).strip() for b in (data.get("bullets") or [])][:5] or ["No clear summary."]
+    sentiment = (data.get("sentiment") or "neutral").lower()
+    if sentiment not in ("positive", "neutral", "negative"):
+        sentiment = "neutral"
+    risk = data.get("risk") or "Consider data quality and recency."
+    return NewsSummarizeOut(
+        bullets=bullets, sentiment=sentiment, risk=risk, origin="llm"
+    ).model_dump()
+
 # --------- Main endpoint ----------
 @router.post("/news_summarize", response_model=NewsSummarizeOut)
-def news_summarize(payload: NewsSummarizeIn):
+async def news_summarize(payload: NewsSummarizeIn):
     # Cache key on content
     key_src = "|".join([(i.title or "") + "::" + (i.snippet or "") for i in payload.items]) + (payload.symbol or "")
     key = hashlib.md5(key_src.encode()).hexdigest()
-    cached = _cache_get(key)
+    cached = await _cache_get(key)
     if cached:
         return cached
 
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key or Groq is None:
+    if not gateway.available():
         out = _heuristic_summary(payload)
-        _cache_set(key, out)
+        await _cache_set(key, out)
         return out
 
     # Build compact prompt
@@ -128,35 +123,14 @@ def news_summarize(payload: NewsSummarizeIn):
     )
 
     try:
-        client = Groq(api_key=api_key)
-        model = os.getenv("GROQ_MODEL", "llama3-8b-8192")
-        resp = client.chat.completions.create(
-            model=model,
-            temperature=0.2,
-            messages=[
-                {"role": "system", "content": "Output only valid JSON. Avoid advice; keep it concise."},
-                {"role": "user", "content": prompt},
-            ],
-        )
-        content = resp.choices[0].message.content or ""
-        data = _extract_json(content) or {}
-        bullets = [str(b).strip() for b in (data.get("bullets") or [])][:5] or ["No clear summary."]
-        sentiment = (data.get("sentiment") or "neutral").lower()
-        if sentiment not in ("positive", "neutral", "negative"):
-            sentiment = "neutral"
-        risk = data.get("risk") or "Consider data quality and recency."
-        out = NewsSummarizeOut(
-            bullets=bullets, sentiment=sentiment, risk=risk, origin="llm"
-        ).model_dump()
-        _cache_set(key, out)
+        out = await _llm_summary(prompt)
+        await _cache_set(key, out)
         return out
     except Exception:
         out = _heuristic_summary(payload)
-        _cache_set(key, out)
+        await _cache_set(key, out)
         return out
 # ---------- LIVE FETCH (Google News RSS) ----------
-import feedparser
-from urllib.parse import quote_plus
 
 def _guess_company(symbol: str) -> str:
     # Lightweight mapping for common tickers; extend as you like.
@@ -173,35 +147,26 @@ def _guess_company(symbol: str) -> str:
     base = symbol.replace(".NS","").replace(".BSE","").replace("^","")
     return base
 
-def _google_news_url(q: str, region: str = "IN", lang: str = "en") -> str:
-    # Example: IN:en for India English; US:en for US English
-    return f"https://news.google.com/rss/search?q={quote_plus(q)}&hl={lang}-{region}&gl={region}&ceid={region}:{lang}"
-
-def _fetch_news_items(symbol: str, n: int = 10, region: str = "IN", lang: str = "en"):
+def _news_query(symbol: str) -> str:
     company = _guess_company(symbol)
     # Broaden query to pick finance-relevant results
-    query = f"{company} ({symbol}) stock OR shares OR results"
-    url = _google_news_url(query, region=region, lang=lang)
-    feed = feedparser.parse(url)
-    items = []
-    for e in (feed.entries or [])[:max(1, min(n, 20))]:
-        title = (getattr(e, "title", None) or "").strip()
-        snippet = (getattr(e, "summary", None) or getattr(e, "description", None) or "").strip()
-        if not title: 
-            continue
-        items.append(NewsItem(title=title, snippet=snippet))
-    return items
+    return f"{company} ({symbol}) stock OR shares OR results"
+
+async def _fetch_news_items(symbol: str, n: int = 10, region: str = "IN", lang: str = "en"):
+    # the raw feed is cached per (query, region, lang); n only slices it
+    raw = await fetcher.get(_news_query(symbol), region=region, lang=lang)
+    return [NewsItem(**it) for it in raw[:max(1, min(n, 20))]]
 
 @router.get("/news_summarize_live", response_model=NewsSummarizeOut)
-def news_summarize_live(symbol: str, n: int = 10, region: str = "IN", lang: str = "en"):
+async def news_summarize_live(symbol: str, n: int = 10, region: str = "IN", lang: str = "en"):
     # Cache key separate from POST body cache
     key_src = f"live::{symbol}::{n}::{region}::{lang}"
     key = hashlib.md5(key_src.encode()).hexdigest()
-    cached = _cache_get(key)
+    cached = await _cache_get(key)
     if cached:
         return cached
 
-    items = _fetch_news_items(symbol=symbol, n=n, region=region, lang=lang)
+    items = await _fetch_news_items(symbol=symbol, n=n, region=region, lang=lang)
     if not items:
         # graceful fallback
         out = NewsSummarizeOut(
@@ -210,15 +175,14 @@ def news_summarize_live(symbol: str, n: int = 10, region: str = "IN", lang: str
             risk="Headlines unavailable or blocked; try again later.",
             origin="heuristic"
         ).model_dump()
-        _cache_set(key, out)
+        await _cache_set(key, out)
         return out
 
     payload = NewsSummarizeIn(symbol=symbol, items=items)
     # Reuse your existing logic: try LLM else heuristic
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key or Groq is None:
+    if not gateway.available():
         out = _heuristic_summary(payload)
-        _cache_set(key, out); return out
+        await _cache_set(key, out); return out
 
     # LLM path mirrors /news_summarize
     features = {
@@ -235,27 +199,27 @@ def news_summarize_live(symbol: str, n: int = 10, region: str = "IN", lang: str
         f"Data: {json.dumps(features, separators=(',',':'))}"
     )
     try:
-        client = Groq(api_key=api_key)
-        model = os.getenv("GROQ_MODEL", "llama3-8b-8192")
-        resp = client.chat.completions.create(
-            model=model,
-            temperature=0.2,
-            messages=[
-                {"role":"system","content":"Output only valid JSON. Avoid advice; keep it concise."},
-                {"role":"user","content": prompt}
-            ],
-        )
-        content = resp.choices[0].message.content or ""
-        data = _extract_json(content) or {}
-        bullets = [str(b).strip() for b in (data.get("bullets") or [])][:5] or ["No clear summary."]
-        sentiment = (data.get("sentiment") or "neutral").lower()
-        if sentiment not in ("positive","neutral","negative"):
-            sentiment = "neutral"
-        risk = data.get("risk") or "Consider data quality and recency."
-        out = NewsSummarizeOut(bullets=bullets, sentiment=sentiment, risk=risk, origin="llm").model_dump()
-        _cache_set(key, out)
+        out = await _llm_summary(prompt)
+        await _cache_set(key, out)
         return out
     except Exception:
         out = _heuristic_summary(payload)
-        _cache_set(key, out)
+        await _cache_set(key, out)
         return out
+
+# ---------- Bulk headline prefetch ----------
+class NewsPrefetchIn(BaseModel):
+    symbols: Annotated[List[str], Field(min_length=1, max_length=500)]
+    region: str = "IN"
+    lang: str = "en"
+    concurrency: int = Field(8, ge=1, le=32)
+
+@router.post("/news_prefetch")
+async def news_prefetch(payload: NewsPrefetchIn):
+    """Warm the raw-feed cache for many symbols at once (bounded concurrency)."""
+    symbols = list(dict.fromkeys(payload.symbols))
+    results = await fetcher.prefetch(
+        [(_news_query(s), payload.region, payload.lang) for s in symbols],
+        concurrency=payload.concurrency,
+    )
+    return {"headlines": {s: len(items) for s, items in zip(symbols, results)}}
@@ -0,0 +1,393 @@
+# backend/price_store.py
+# Shared in-memory price store: every CSV in data/ is parsed once into
+# contiguous NumPy arrays and reloaded only when the file's mtime changes.
+# Parsed arrays are also compiled to .npy files under PRICE_CACHE_DIR and
+# opened with np.memmap, so uvicorn workers share the OS page cache.
+# Bars ingested through POST /api/bars (segments.py) are merged on top of the
+# CSV; when only the WAL has grown, just the new records are read and
+# appended to a capacity-doubling copy of the series.
+# Under the pre-fork server (serve.py) the CSV bars come from one shared
+# memory segment filled by the parent (shared_store.py) instead.
+#
+#   python price_store.py compile     # pre-build the binary cache
+from __future__ import annotations
+
+import glob
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+import segments
+from metrics import span
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = Path(os.getenv("DATA_DIR") or BASE_DIR / "data")  # overridable for benchmarks / synthetic data
+# data/ is mounted read-only in docker-compose, so compiled files live elsewhere.
+# Set PRICE_CACHE_DIR="" to disable the binary cache and always parse CSVs.
+_cache_env = os.getenv("PRICE_CACHE_DIR")
+CACHE_DIR: Path | None = (
+    BASE_DIR / ".cache" / "prices" if _cache_env is None else (Path(_cache_env) if _cache_env else None)
+)
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# (st_mtime_ns, st_size) of the source file; changes whenever the CSV is rewritten
+Version = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class PriceSeries:
+    """One symbol's bars: int64 epoch-ms dates plus a (5, n) float64 OHLCV block."""
+    symbol: str
+    version: Version
+    t: np.ndarray       # int64 epoch milliseconds, ascending
+    ohlcv: np.ndarray   # float64, rows = Open, High, Low, Close, Volume
+    # CSV version under ingested bars: unchanged while versions only append
+    # bars, so caches may extend instead of rebuilding. None = same as version.
+    base_version: Optional[Version] = None
+
+    @property
+    def o(self) -> np.ndarray: return self.ohlcv[0]
+    @property
+    def h(self) -> np.ndarray: return self.ohlcv[1]
+    @property
+    def l(self) -> np.ndarray: return self.ohlcv[2]
+    @property
+    def c(self) -> np.ndarray: return self.ohlcv[3]
+    @property
+    def v(self) -> np.ndarray: return self.ohlcv[4]
+
+    def __len__(self) -> int:
+        return int(self.t.shape[0])
+
+    def tail(self, n: int) -> "PriceSeries":
+        """Last n bars as views (no copy), like DataFrame.tail."""
+        start = max(0, len(self) - max(0, n))
+        return PriceSeries(self.symbol, self.version, self.t[start:], self.ohlcv[:, start:], self.base_version)
+
+    def window(self, i: int, j: int) -> "PriceSeries":
+        """Bars i..j-1 as views (no copy)."""
+        return PriceSeries(self.symbol, self.version, self.t[i:j], self.ohlcv[:, i:j], self.base_version)
+
+    def take(self, idx: np.ndarray) -> "PriceSeries":
+        """Bars at the given indices (copies)."""
+        return PriceSeries(self.symbol, self.version, self.t[idx], self.ohlcv[:, idx], self.base_version)
+
+
+# --- Date-range selection ---
+# `period` is a calendar span ending at the window's last bar (like yfinance),
+# so "1y" covers the same dates whatever the exchange calendar or gaps in the
+# file. Windows are located by binary search on the sorted date column.
+PERIOD_MONTHS: Dict[str, Optional[int]] = {
+    "1mo": 1, "3mo": 3, "6mo": 6, "1y": 12, "2y": 24, "5y": 60, "max": None
+}
+DEFAULT_PERIOD = "6mo"  # used for unknown period strings
+
+def normalize_period(period: str) -> str:
+    """`period` if it is a PERIOD_MONTHS key, else DEFAULT_PERIOD (what slicing falls back to)."""
+    return period if period in PERIOD_MONTHS else DEFAULT_PERIOD
+
+def to_epoch_ms(d: date) -> int:
+    return int(np.datetime64(d, "ms").astype(np.int64))
+
+def period_cutoff(end_ms, period: str):
+    """Date (epoch ms) `period` before end_ms; bars strictly after it belong to the period.
+
+    Works elementwise on arrays. Month arithmetic clamps to month end
+    (e.g. 6mo before 2025-08-31 is 2025-02-28).
+    """
+    months = PERIOD_MONTHS.get(period, PERIOD_MONTHS[DEFAULT_PERIOD])
+    end_ms = np.asarray(end_ms, dtype=np.int64)
+    if months is None:
+        return np.full_like(end_ms, np.iinfo(np.int64).min)[()]
+    day = end_ms.astype("datetime64[ms]").astype("datetime64[D]")
+    month = day.astype("datetime64[M]")
+    target = month - months
+    cut = np.minimum(target.astype("datetime64[D]") + (day - month.astype("datetime64[D]")),
+                     (target + 1).astype("datetime64[D]") - 1)
+    return cut.astype("datetime64[ms]").astype(np.int64)[()]
+
+def period_bounds(series: PriceSeries, period: str = DEFAULT_PERIOD,
+                  start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Tuple[int, int]:
+    """Row range [i, j) for a request: bars in [start_ms, end_ms], or `period` back from end_ms.
+
+    end_ms defaults to the last bar; O(log n) via searchsorted.
+    """
+    j = len(series) if end_ms is None else int(np.searchsorted(series.t, end_ms, side="right"))
+    if start_ms is not None:
+        return min(int(np.searchsorted(series.t, start_ms, side="left")), j), j
+    if j == 0:
+        return 0, 0
+    cut = period_cutoff(series.t[j - 1], period)
+    return int(np.searchsorted(series.t[:j], cut, side="right")), j
+
+def slice_period(series: PriceSeries, period: str = DEFAULT_PERIOD,
+                 start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> PriceSeries:
+    """The requested window as views into the stored arrays."""
+    return series.window(*period_bounds(series, period, start_ms, end_ms))
+
+
+def symbol_to_path(symbol: str, data_dir: Path = DATA_DIR) -> Path:
+    return data_dir / f"{symbol.replace('^','_')}.csv"
+
+
+def _file_version(path: Path) -> Version | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def parse_csv(path: Path, symbol: str, version: Version) -> PriceSeries:
+    import pandas as pd  # only needed when the binary cache misses; keeps worker startup light
+    try:
+        df = pd.read_csv(path, parse_dates=["Date"])
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to read {path.name}: {e}")
+    # basic header validation
+    if not set(COLUMNS).issubset(df.columns):
+        raise HTTPException(status_code=400, detail=f"Bad columns in {path.name}. Need {sorted(COLUMNS)}")
+    t = df["Date"].to_numpy(dtype="datetime64[ms]").astype(np.int64)
+    order = np.argsort(t, kind="stable")
+    ohlcv = np.ascontiguousarray(df[list(COLUMNS)].to_numpy(dtype=np.float64).T[:, order])
+    return PriceSeries(symbol, version, np.ascontiguousarray(t[order]), ohlcv)
+
+
+# --- Binary cache ---
+# Layout: one .npy per symbol holding a float64 (6, n) array. Row 0 is the
+# int64 epoch-ms date column stored bit-for-bit (read back with .view), rows
+# 1-5 are OHLCV. The source (mtime_ns, size) is part of the file name, so a
+# rewritten CSV never matches a stale compiled file.
+def compiled_path(csv_path: Path, version: Version, cache_dir: Path) -> Path:
+    return cache_dir / f"{csv_path.stem}@{version[0]:x}-{version[1]:x}.npy"
+
+def compile_csv(csv_path: Path, symbol: str, version: Version, cache_dir: Path) -> Path:
+    series = parse_csv(csv_path, symbol, version)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    target = compiled_path(csv_path, version, cache_dir)
+    block = np.empty((6, len(series)), dtype=np.float64)
+    block[0] = series.t.view(np.float64)
+    block[1:] = series.ohlcv
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        np.save(fh, block)
+    os.replace(tmp, target)  # atomic: concurrent workers see the old file or the new one
+    for stale in glob.glob(str(cache_dir / f"{glob.escape(csv_path.stem)}@*.npy")):
+        if Path(stale) != target:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return target
+
+def open_compiled(path: Path, symbol: str, version: Version) -> PriceSeries:
+    block = np.load(path, mmap_mode="r")
+    if block.dtype != np.float64 or block.ndim != 2 or block.shape[0] != 6:
+        raise ValueError(f"Unexpected layout in {path.name}")
+    return PriceSeries(symbol, version, block[0].view(np.int64), block[1:])
+
+
+class _Growable:
+    """Capacity-doubling copy of a series, so appending k bars costs O(k).
+
+    Series handed out earlier are views of the first n slots, which later
+    appends never overwrite.
+    """
+    __slots__ = ("t", "ohlcv", "n")
+
+    def __init__(self, t: np.ndarray, ohlcv: np.ndarray):
+        n = t.shape[0]
+        self.t = np.empty(max(16, n * 2), dtype=np.int64)
+        self.ohlcv = np.empty((5, self.t.shape[0]), dtype=np.float64)
+        self.t[:n], self.ohlcv[:, :n], self.n = t, ohlcv, n
+
+    def last_t(self) -> Optional[int]:
+        return int(self.t[self.n - 1]) if self.n else None
+
+    def append(self, bars: segments.Bars) -> None:
+        t, ohlcv = segments.after(bars, self.last_t())
+        k = t.shape[0]
+        if self.n + k > self.t.shape[0]:
+            cap = (self.n + k) * 2
+            grown_t, grown = np.empty(cap, dtype=np.int64), np.empty((5, cap), dtype=np.float64)
+            grown_t[:self.n], grown[:, :self.n] = self.t[:self.n], self.ohlcv[:, :self.n]
+            self.t, self.ohlcv = grown_t, grown
+        self.t[self.n:self.n + k], self.ohlcv[:, self.n:self.n + k] = t, ohlcv
+        self.n += k
+
+    def series(self, symbol: str, version: Version, base_version: Version) -> PriceSeries:
+        return PriceSeries(symbol, version, self.t[:self.n], self.ohlcv[:, :self.n], base_version)
+
+
+class _Merged:
+    """CSV series plus ingested segments, and the file versions it was built from."""
+    __slots__ = ("base_version", "npy_version", "wal_offset", "bars")
+
+    def __init__(self, base_version, npy_version, wal_offset, bars: _Growable):
+        self.base_version, self.npy_version = base_version, npy_version
+        self.wal_offset, self.bars = wal_offset, bars
+
+
+def _combined(base: Version, npy: Optional[Version], wal: Optional[Version]) -> Version:
+    """One version for CSV + segments; equals the CSV's own when nothing was ingested."""
+    parts = [v for v in (base, npy, wal) if v is not None]
+    return (max(v[0] for v in parts), sum(v[1] for v in parts))
+
+
+class PriceStore:
+    """Symbol index over parsed series; a file is re-parsed only when its version changes."""
+
+    def __init__(self, data_dir: Path = DATA_DIR, cache_dir: Path | None = CACHE_DIR,
+                 bars_dir: Path | None = segments.BARS_DIR):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.bars_dir = bars_dir
+        self._series: Dict[str, PriceSeries] = {}
+        self._merged: Dict[str, _Merged] = {}
+        self._lock = threading.Lock()
+        self.shared = None  # shared_store.SharedUniverse, set by share()
+
+    def _load(self, path: Path, symbol: str, version: Version) -> PriceSeries:
+        if self.shared is not None:
+            hit = self.shared.get(path.stem, symbol, version)
+            if hit is not None:
+                return hit
+        if self.cache_dir is not None:
+            target = compiled_path(path, version, self.cache_dir)
+            try:
+                if not target.exists():
+                    compile_csv(path, symbol, version, self.cache_dir)
+                return open_compiled(target, symbol, version)
+            except (OSError, ValueError):
+                pass  # unwritable/corrupt cache: fall back to parsing the CSV
+        return parse_csv(path, symbol, version)
+
+    def _versions(self, symbol: str):
+        """(combined, csv, compacted segment, wal) versions; stat() calls only."""
+        path = symbol_to_path(symbol, self.data_dir)
+        base = _file_version(path)
+        if base is None:
+            raise HTTPException(status_code=404, detail=f"No mock dataset for {symbol}")
+        if self.bars_dir is None:
+            return base, base, None, None
+        npy, wal = segments.versions(self.bars_dir, path.stem)
+        return _combined(base, npy, wal), base, npy, wal
+
+    def _load_merged(self, symbol: str, stem: str, version: Version, base_v: Version,
+                     npy_v: Optional[Version], wal_v: Optional[Version]) -> PriceSeries:
+        m = self._merged.get(stem)
+        if m is not None and m.base_version == base_v and m.npy_version == npy_v \
+                and wal_v is not None and wal_v[1] >= m.wal_offset:
+            with span("segment_tail"):
+                bars, m.wal_offset = segments.read_wal(self.bars_dir, stem, m.wal_offset)
+                m.bars.append(bars)
+            return m.bars.series(symbol, version, base_v)
+        base = self._load(symbol_to_path(symbol, self.data_dir), symbol, base_v)
+        with span("segment_load"):
+            grown = _Growable(base.t, base.ohlcv)
+            grown.append(segments.read_compacted(self.bars_dir, stem))
+            bars, offset = segments.read_wal(self.bars_dir, stem)
+            grown.append(bars)
+        self._merged[stem] = _Merged(base_v, npy_v, offset, grown)
+        return grown.series(symbol, version, base_v)
+
+    def version(self, symbol: str) -> Version:
+        """Current version of the symbol's CSV (and ingested bars) without loading it."""
+        return self._versions(symbol)[0]
+
+    def dir_version(self) -> Version:
+        """Changes whenever a CSV is added to or removed from data_dir."""
+        return _file_version(self.data_dir) or (0, 0)
+
+    def get(self, symbol: str) -> PriceSeries:
+        version, base_v, npy_v, wal_v = self._versions(symbol)
+        key = symbol_to_path(symbol, self.data_dir).stem
+        cur = self._series.get(key)
+        if cur is not None and cur.version == version:
+            return cur
+        with self._lock:
+            cur = self._series.get(key)
+            if cur is None or cur.version != version:
+                with span("csv_load"):
+                    if npy_v is None and wal_v is None:
+                        cur = self._load(symbol_to_path(symbol, self.data_dir), symbol, base_v)
+                        self._merged.pop(key, None)
+                    else:
+                        cur = self._load_merged(symbol, key, version, base_v, npy_v, wal_v)
+                self._series[key] = cur
+            return cur
+
+    def all_series(self) -> List[PriceSeries]:
+        """Current series for every CSV in data_dir (re-parsing only changed files)."""
+        out = []
+        for path in sorted(self.data_dir.glob("*.csv")):
+            try:
+                out.append(self.get(path.stem.replace('_', '^')))
+            except HTTPException:
+                continue  # bad file: surface the error on request, not here
+        return out
+
+    def load_all(self) -> List[str]:
+        """Parse every CSV in data_dir up front (called on startup); returns the loaded symbols."""
+        return [s.symbol for s in self.all_series()]
+
+    def symbols(self) -> List[str]:
+        return sorted(s.symbol for s in self._series.values())
+
+    def csv_series(self) -> Iterator[Tuple[str, PriceSeries]]:
+        """(file stem, series) for every CSV in data_dir, without ingested bars."""
+        for path in sorted(self.data_dir.glob("*.csv")):
+            version = _file_version(path)
+            if version is None:
+                continue
+            try:
+                yield path.stem, self._load(path, path.stem.replace('_', '^'), version)
+            except HTTPException as e:
+                print(f"skip {path.name}: {e.detail}", file=sys.stderr)
+
+    def share(self, universe) -> None:
+        """Serve CSV bars from `universe` while their versions match; drops loaded series."""
+        with self._lock:
+            self.shared = universe
+            self._series.clear()
+            self._merged.clear()
+
+    def compile_all(self) -> int:
+        """Build the binary cache for every CSV; returns the number of files written."""
+        if self.cache_dir is None:
+            return 0
+        count = 0
+        for path in sorted(self.data_dir.glob("*.csv")):
+            version = _file_version(path)
+            if version is None or compiled_path(path, version, self.cache_dir).exists():
+                continue
+            try:
+                compile_csv(path, path.stem.replace('_', '^'), version, self.cache_dir)
+                count += 1
+            except HTTPException as e:
+                print(f"skip {path.name}: {e.detail}", file=sys.stderr)
+        return count
+
+
+store = PriceStore()
+
+
+def get_series(symbol: str) -> PriceSeries:
+    return store.get(symbol)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["compile"]:
+        sys.exit("usage: python price_store.py compile")
+    if store.cache_dir is None:
+        sys.exit("PRICE_CACHE_DIR is empty; binary cache disabled")
+    n = store.compile_all()
+    print(f"compiled {n} file(s) into {store.cache_dir}")
@@ -0,0 +1,104 @@
+# backend/resample.py
+# Server-side bar aggregation (1d -> 1wk / 1mo) and shape-preserving
+# downsampling (LTTB) for long history requests.
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+
+from price_store import PriceSeries, Version
+
+INTERVALS = ("1d", "1wk", "1mo")
+MS_PER_DAY = 86_400_000
+
+
+def bucket_ids(t: np.ndarray, interval: str) -> np.ndarray:
+    if interval == "1wk":
+        # 1970-01-01 was a Thursday; +3 days makes weeks start on Monday
+        return (t // MS_PER_DAY + 3) // 7
+    if interval == "1mo":
+        return t.astype("datetime64[ms]").astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Unsupported interval {interval!r}")
+
+
+def aggregate(series: PriceSeries, interval: str) -> PriceSeries:
+    """OHLCV per calendar bucket: open=first, high=max, low=min, close=last, volume=sum.
+
+    Each aggregated bar is stamped with its first daily bar's date. The
+    result's symbol is tagged with the interval so cached indicators for
+    daily and aggregated bars never collide.
+    """
+    n = len(series)
+    tagged = f"{series.symbol}@{interval}"
+    if n == 0:
+        return PriceSeries(tagged, series.version, series.t[:0], series.ohlcv[:, :0])
+    ids = bucket_ids(series.t, interval)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+    ends = np.concatenate((starts[1:] - 1, [n - 1]))
+    o, h, l, c, v = series.ohlcv
+    block = np.empty((5, starts.shape[0]))
+    block[0] = o[starts]
+    block[1] = np.maximum.reduceat(h, starts)
+    block[2] = np.minimum.reduceat(l, starts)
+    block[3] = c[ends]
+    block[4] = np.add.reduceat(v, starts)
+    return PriceSeries(tagged, series.version, np.ascontiguousarray(series.t[starts]), block)
+
+
+class ResampleCache:
+    """Aggregated series per (symbol, interval), valid for one data version."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Tuple[str, str], Tuple[Version, int, PriceSeries]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, series: PriceSeries, interval: str) -> PriceSeries:
+        if interval == "1d":
+            return series
+        key = (series.symbol.upper(), interval)
+        with self._lock:
+            row = self._data.get(key)
+            if row is not None and row[0] == series.version and row[1] == len(series):
+                self._data.move_to_end(key)
+                return row[2]
+        out = aggregate(series, interval)
+        with self._lock:
+            self._data[key] = (series.version, len(series), out)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return out
+
+
+resampled = ResampleCache()
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the line's shape.
+
+    First and last points are always kept; from every bucket in between the
+    point forming the largest triangle with the previously kept point and the
+    next bucket's centroid is chosen.
+    """
+    n = x.shape[0]
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    out = np.empty(threshold, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (ys - y[a]) - (x[a] - xs) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
@@ -0,0 +1,257 @@
+# backend/screener.py
+# Cross-sectional screener: every metric is a column operation over a
+# (symbols x bars) matrix, so one request scans the whole universe at once.
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+
+from price_store import PriceSeries, normalize_period, store, period_cutoff
+from indicators import to_json_list
+from executor import run_io
+
+router = APIRouter(prefix="/api", tags=["screen"])
+
+LOOKBACK = 260            # bars kept per symbol: 52 weeks + room for SMA200 crossovers
+CROSS_WINDOW = 5          # a crossover counts if it happened within the last N bars
+REFRESH_SECONDS = float(os.getenv("SCREEN_REFRESH_SECONDS", "5"))
+
+TREND_LABELS = np.array(["Bearish", "Neutral", "Bullish"])
+
+
+# --- Matrix helpers (NaN = no bar; series are right-aligned on their last bar) ---
+def _rolling_mean(M: np.ndarray, w: int) -> np.ndarray:
+    """Row-wise trailing mean; NaN unless all w bars in the window exist."""
+    out = np.full(M.shape, np.nan)
+    if M.shape[1] < w:
+        return out
+    valid = ~np.isnan(M)
+    zeros = np.zeros((M.shape[0], 1))
+    cs = np.concatenate([zeros, np.cumsum(np.where(valid, M, 0.0), axis=1)], axis=1)
+    cn = np.concatenate([zeros, np.cumsum(valid, axis=1)], axis=1)
+    sums = cs[:, w:] - cs[:, :-w]
+    counts = cn[:, w:] - cn[:, :-w]
+    out[:, w - 1:] = np.where(counts == w, sums / w, np.nan)
+    return out
+
+def _last_slope(M: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Least-squares slope over the last n[i] bars of each row (closed form)."""
+    S, L = M.shape
+    n = np.minimum(n, L)
+    # x = 0..n-1 counted from the first bar of each row's window
+    pos = np.arange(L)[None, :] - (L - n)[:, None]
+    mask = (pos >= 0) & ~np.isnan(M)
+    x = np.where(mask, pos, 0.0)
+    y = np.where(mask, M, 0.0)
+    sx, sy = x.sum(1), y.sum(1)
+    sxx, sxy = (x * x).sum(1), (x * y).sum(1)
+    denom = n * sxx - sx * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denom != 0, (n * sxy - sx * sy) / denom, np.nan)
+
+def _recent_cross(fast: np.ndarray, slow: np.ndarray, window: int) -> np.ndarray:
+    """+1 if fast crossed above slow within `window` bars, -1 if below, else 0."""
+    d = fast[:, -(window + 1):] - slow[:, -(window + 1):]
+    with np.errstate(invalid="ignore"):
+        up = ((d[:, :-1] <= 0) & (d[:, 1:] > 0)).any(1) & (d[:, -1] > 0)
+        down = ((d[:, :-1] >= 0) & (d[:, 1:] < 0)).any(1) & (d[:, -1] < 0)
+    return up.astype(np.int64) - down.astype(np.int64)
+
+
+class Universe:
+    """Right-aligned (symbols x LOOKBACK) matrices of close/high/low/volume."""
+
+    def __init__(self, series: List[PriceSeries]):
+        self.key = tuple((s.symbol, s.version) for s in series)
+        self.symbols = np.array([s.symbol.upper() for s in series], dtype=object)
+        S = len(series)
+        self.close = np.full((S, LOOKBACK), np.nan)
+        self.high = np.full((S, LOOKBACK), np.nan)
+        self.low = np.full((S, LOOKBACK), np.nan)
+        self.volume = np.full((S, LOOKBACK), np.nan)
+        self.t = np.full((S, LOOKBACK), np.iinfo(np.int64).min)  # padding sorts before any date
+        self.bars = np.zeros(S, dtype=np.int64)
+        self.last_t = np.zeros(S, dtype=np.int64)
+        for i, s in enumerate(series):
+            tail = s.tail(LOOKBACK)
+            n = len(tail)
+            if n == 0:
+                continue
+            self.t[i, -n:] = tail.t
+            self.close[i, -n:] = tail.c
+            self.high[i, -n:] = tail.h
+            self.low[i, -n:] = tail.l
+            self.volume[i, -n:] = tail.v
+            self.bars[i] = len(s)
+            self.last_t[i] = tail.t[-1]
+        self.sma = {w: _rolling_mean(self.close, w) for w in (20, 50, 200)}
+        self._tables: Dict[str, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def _trend(self, period: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized chatbot._heuristic_trend over the last `period` bars of every symbol."""
+        # bars inside the calendar period (capped at LOOKBACK, which exceeds every threshold below)
+        n = (self.t > period_cutoff(self.last_t, period)[:, None]).sum(1)
+        last = self.close[:, -1]
+        s20, s50, s200 = (self.sma[w][:, -1] for w in (20, 50, 200))
+        has50, has200 = n >= 50, n >= 200
+        slope20 = np.nan_to_num(_last_slope(self.close, np.minimum(20, n)))
+        slope50 = np.where(has50, np.nan_to_num(_last_slope(self.close, np.full_like(n, 50))), 0.0)
+        # each check scores +1/-1 and only counts when its inputs exist
+        checks = [
+            (last > s20, n >= 20),
+            (s20 > s50, has50),
+            (s50 > s200, has200),
+            (slope20 > 0, np.ones_like(has50)),
+            (slope50 >= 0, has50),
+        ]
+        score = sum(np.where(used, np.where(ok, 1, -1), 0) for ok, used in checks)
+        maxs = sum(used.astype(np.int64) for _, used in checks)
+        need = np.ceil(maxs * 0.6)
+        label = np.where(score >= need, 2, np.where(score <= -need, 0, 1))
+        conf = np.rint(np.abs(score) / maxs * 100).astype(np.int64)
+        enough = n >= 20
+        return np.where(enough, label, 1), np.where(enough, conf, 0)
+
+    def table(self, period: str) -> Dict[str, np.ndarray]:
+        """All screenable columns for one trend period (memoized per universe).
+
+        Unknown periods use DEFAULT_PERIOD, as /api/trend_ai does, so the memo
+        holds at most one table per PERIOD_MONTHS key.
+        """
+        period = normalize_period(period)
+        cached = self._tables.get(period)
+        if cached is not None:
+            return cached
+        C, V = self.close, self.volume
+        close = C[:, -1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            high52 = np.nanmax(self.high[:, -252:], axis=1)
+            low52 = np.nanmin(self.low[:, -252:], axis=1)
+            cols = {
+                "close": close,
+                "volume": V[:, -1],
+                "avg_vol20": _rolling_mean(V[:, -20:], 20)[:, -1],
+                "sma20": self.sma[20][:, -1],
+                "sma50": self.sma[50][:, -1],
+                "sma200": self.sma[200][:, -1],
+                "roc5": (close / C[:, -6] - 1) * 100,
+                "roc20": (close / C[:, -21] - 1) * 100,
+                "roc60": (close / C[:, -61] - 1) * 100,
+                "high_52w": high52,
+                "low_52w": low52,
+                "pct_from_high_52w": (close / high52 - 1) * 100,
+                "pct_from_low_52w": (close / low52 - 1) * 100,
+                "slope20": _last_slope(C, np.full(len(close), 20)),
+                "slope50": _last_slope(C, np.full(len(close), 50)),
+                "cross_20_50": _recent_cross(self.sma[20], self.sma[50], CROSS_WINDOW),
+                "cross_50_200": _recent_cross(self.sma[50], self.sma[200], CROSS_WINDOW),
+            }
+        label, conf = self._trend(period)
+        cols["trend"] = TREND_LABELS[label]
+        cols["trend_confidence"] = conf
+        cols["bars"] = self.bars
+        cols["last_t"] = self.last_t
+        with self._lock:
+            self._tables[period] = cols
+        return cols
+
+
+_universe: Optional[Universe] = None
+_checked_at = 0.0
+_build_lock = threading.Lock()
+
+def get_universe() -> Universe:
+    """Current universe; files are re-checked at most every REFRESH_SECONDS."""
+    global _universe, _checked_at
+    now = time.monotonic()
+    if _universe is not None and now - _checked_at < REFRESH_SECONDS:
+        return _universe
+    with _build_lock:
+        if _universe is None or time.monotonic() - _checked_at >= REFRESH_SECONDS:
+            series = store.all_series()
+            key = tuple((s.symbol, s.version) for s in series)
+            if _universe is None or _universe.key != key:
+                _universe = Universe(series)
+            _checked_at = time.monotonic()
+        return _universe
+
+
+# --- Filter expressions: "<field> <op> <field|number|label>", e.g. close>sma50, roc20>=5, trend=Bullish ---
+_FILTER_RE = re.compile(r"^\s*([a-z0-9_]+)\s*(>=|<=|==|!=|=|>|<)\s*([A-Za-z0-9_.+\-]+)\s*$")
+_OPS = {
+    ">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal,
+    "=": np.equal, "==": np.equal, "!=": np.not_equal,
+}
+
+def _apply_filter(expr: str, cols: Dict[str, np.ndarray]) -> np.ndarray:
+    m = _FILTER_RE.match(expr)
+    if not m:
+        raise HTTPException(status_code=400, detail=f"Bad filter {expr!r}; use e.g. close>sma50 or roc20>=5")
+    field, op, rhs = m.groups()
+    if field not in cols:
+        raise HTTPException(status_code=400, detail=f"Unknown field {field!r}. Fields: {sorted(cols)}")
+    lhs = cols[field]
+    if rhs in cols:
+        right = cols[rhs]
+    elif field == "trend":
+        if op not in ("=", "==", "!="):
+            raise HTTPException(status_code=400, detail="trend only supports = and !=")
+        right = rhs.title()
+    else:
+        try:
+            right = float(rhs)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Bad value {rhs!r} in filter {expr!r}")
+    with np.errstate(invalid="ignore"):
+        return np.asarray(_OPS[op](lhs, right), dtype=bool)
+
+
+def build_screen(where: List[str], sort: Optional[str], limit: int, period: str) -> dict:
+    period = normalize_period(period)
+    uni = get_universe()
+    cols = uni.table(period)
+    mask = np.ones(len(uni.symbols), dtype=bool)
+    for expr in where:
+        mask &= _apply_filter(expr, cols)
+    idx = np.flatnonzero(mask)
+
+    if sort:
+        field = sort.lstrip("+-")
+        if field not in cols or field == "trend":
+            raise HTTPException(status_code=400, detail=f"Cannot sort by {field!r}")
+        keys = cols[field][idx].astype(np.float64)
+        if sort.startswith("-"):
+            keys = -keys
+        # NaN (not enough history) sorts last in either direction
+        idx = idx[np.argsort(np.where(np.isnan(keys), np.inf, keys), kind="stable")]
+    idx = idx[:limit]
+
+    rows: List[dict] = [{"symbol": s} for s in uni.symbols[idx].tolist()]
+    for name, col in cols.items():
+        sel = col[idx]
+        values = to_json_list(sel) if sel.dtype == np.float64 else sel.tolist()
+        for row, v in zip(rows, values):
+            row[name] = v
+    return {
+        "universe": len(uni.symbols),
+        "matched": int(mask.sum()),
+        "period": period,
+        "results": rows,
+    }
+
+
+@router.get("/screen")
+async def screen(
+    where: List[str] = Query([], description="Filters, e.g. close>sma50, roc20>5, trend=Bullish"),
+    sort: Optional[str] = Query(None, description="Field to rank by; prefix with '-' for descending"),
+    limit: int = Query(50, ge=1, le=1000),
+    period: str = Query("6mo", description="Window used for the trend label (same as /api/trend_ai)"),
+):
+    return await run_io(build_screen, where, sort, limit, period)
@@ -0,0 +1,174 @@
+# backend/segments.py
+# Append-only storage for bars ingested through POST /api/bars. data/ stays
+# read-only; new bars live next to it under BARS_DIR, per symbol:
+#
+#   <stem>.wal   write-ahead log: raw 48-byte records (int64 epoch-ms date
+#                bits + OHLCV float64), appended with one write() per batch
+#   <stem>.npy   compacted segment: (6, n) float64 in the same layout as the
+#                price_store binary cache, memory-mapped on read
+#
+# compact() folds the WAL into the .npy (atomic replace) and truncates the
+# WAL; a crash in between only leaves records that readers already skip,
+# because every reader keeps bars strictly after the last one it has.
+# Appends and compaction hold an flock on the WAL, so several uvicorn
+# workers can share one BARS_DIR.
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock still serializes writers of this worker
+    fcntl = None
+
+BASE_DIR = Path(__file__).resolve().parent
+# Set BARS_DIR="" to disable ingestion; the store then reads CSVs only.
+_bars_env = os.getenv("BARS_DIR")
+BARS_DIR: Path | None = BASE_DIR / "bars" if _bars_env is None else (Path(_bars_env) if _bars_env else None)
+FSYNC = os.getenv("BARS_FSYNC", "0").lower() in ("1", "true", "yes")
+
+RECORD = np.dtype([("t", "<i8"), ("ohlcv", "<f8", (5,))])  # 48 bytes
+
+Version = Tuple[int, int]
+Bars = Tuple[np.ndarray, np.ndarray]  # (int64 t, (5, n) float64 OHLCV)
+
+_EMPTY: Bars = (np.empty(0, np.int64), np.empty((5, 0)))
+
+
+def wal_path(bars_dir: Path, stem: str) -> Path:
+    return bars_dir / f"{stem}.wal"
+
+def compacted_path(bars_dir: Path, stem: str) -> Path:
+    return bars_dir / f"{stem}.npy"
+
+
+def _stat(path: Path) -> Optional[Version]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def versions(bars_dir: Path, stem: str) -> Tuple[Optional[Version], Optional[Version]]:
+    """(compacted, wal) file versions; None where the file does not exist or is empty."""
+    npy, wal = _stat(compacted_path(bars_dir, stem)), _stat(wal_path(bars_dir, stem))
+    return npy, (wal if wal and wal[1] >= RECORD.itemsize else None)
+
+
+# --- Reading ---
+def read_compacted(bars_dir: Path, stem: str) -> Bars:
+    try:
+        block = np.load(compacted_path(bars_dir, stem), mmap_mode="r")
+    except (OSError, ValueError):
+        return _EMPTY
+    return block[0].view(np.int64), block[1:]
+
+def read_wal(bars_dir: Path, stem: str, offset: int = 0) -> Tuple[Bars, int]:
+    """Whole records from byte `offset` on, and the offset just past them.
+
+    A torn trailing record (writer crashed mid-write) is left for the next
+    append to truncate.
+    """
+    try:
+        with open(wal_path(bars_dir, stem), "rb") as fh:
+            fh.seek(offset)
+            raw = fh.read()
+    except OSError:
+        return _EMPTY, offset
+    n = len(raw) // RECORD.itemsize
+    rec = np.frombuffer(raw, dtype=RECORD, count=n)
+    return (rec["t"].copy(), np.ascontiguousarray(rec["ohlcv"].T)), offset + n * RECORD.itemsize
+
+def after(bars: Bars, last_t: Optional[int]) -> Bars:
+    """Bars strictly after last_t, keeping only the strictly increasing run of dates."""
+    t, ohlcv = bars
+    if t.shape[0] == 0:
+        return bars
+    floor = np.maximum.accumulate(np.concatenate(([np.iinfo(np.int64).min if last_t is None else last_t], t[:-1])))
+    keep = t > floor
+    return (t, ohlcv) if keep.all() else (t[keep], ohlcv[:, keep])
+
+
+# --- Writing ---
+_locks: dict = {}
+_locks_guard = threading.Lock()
+
+class _Locked:
+    """Thread lock + flock on the symbol's WAL, held for an append or a compaction."""
+
+    def __init__(self, bars_dir: Path, stem: str):
+        self.path = wal_path(bars_dir, stem)
+        with _locks_guard:
+            self.lock = _locks.setdefault(self.path, threading.Lock())
+
+    def __enter__(self) -> int:
+        self.lock.acquire()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.fd
+
+    def __exit__(self, *exc):
+        os.close(self.fd)  # also drops the flock
+        self.lock.release()
+        return False
+
+
+def _last_t(bars_dir: Path, stem: str, fd: int) -> Optional[int]:
+    size = os.fstat(fd).st_size
+    whole = size - size % RECORD.itemsize
+    if whole != size:
+        os.ftruncate(fd, whole)  # drop a torn record left by a crashed writer
+    if whole:
+        return int(np.frombuffer(os.pread(fd, 8, whole - RECORD.itemsize), dtype="<i8")[0])
+    t, _ = read_compacted(bars_dir, stem)
+    return int(t[-1]) if t.shape[0] else None
+
+def append(bars_dir: Path, stem: str, t: np.ndarray, ohlcv: np.ndarray, floor_t: Optional[int]) -> Tuple[int, int]:
+    """Append the bars dated after both floor_t (the CSV's last bar) and the stored
+    segments; returns (accepted, rejected). `t` must be sorted ascending."""
+    with _Locked(bars_dir, stem) as fd:
+        last = _last_t(bars_dir, stem, fd)
+        if floor_t is not None and (last is None or floor_t > last):
+            last = floor_t
+        t_new, block = after((t, ohlcv), last)
+        k = int(t_new.shape[0])
+        if k:
+            rec = np.empty(k, dtype=RECORD)
+            rec["t"], rec["ohlcv"] = t_new, block.T
+            os.write(fd, rec.tobytes())
+            if FSYNC:
+                os.fsync(fd)
+    return k, int(t.shape[0]) - k
+
+def compact(bars_dir: Path, stem: str) -> int:
+    """Fold the WAL into the compacted segment; returns the number of bars moved."""
+    with _Locked(bars_dir, stem) as fd:
+        (t_wal, o_wal), _ = read_wal(bars_dir, stem)
+        if t_wal.shape[0] == 0:
+            return 0
+        t_old, o_old = read_compacted(bars_dir, stem)
+        t_wal, o_wal = after((t_wal, o_wal), int(t_old[-1]) if t_old.shape[0] else None)
+        block = np.empty((6, t_old.shape[0] + t_wal.shape[0]), dtype=np.float64)
+        block[0] = np.concatenate((t_old, t_wal)).view(np.float64)
+        block[1:] = np.concatenate((o_old, o_wal), axis=1)
+        target = compacted_path(bars_dir, stem)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            np.save(fh, block)
+            if FSYNC:
+                fh.flush()
+                os.fsync(fh.fileno())
+        os.replace(tmp, target)
+        os.ftruncate(fd, 0)
+        return int(t_wal.shape[0])
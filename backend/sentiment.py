@@ -0,0 +1,138 @@
+# backend/sentiment.py
+# Lexicon sentiment for headlines: the heuristic fallback of the news
+# summarizer and POST /api/sentiment_batch for bulk backfills without the LLM.
+#
+# Text is tokenized once (so "up" no longer matches "support" and "ban" no
+# longer matches "bank") and each token is one dict lookup into a weighted
+# lexicon. A negator ("not", "fails", "didn't", ...) flips and damps the next
+# sentiment term within NEGATION_SCOPE tokens; punctuation ends the scope.
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Body, Request
+from pydantic import BaseModel, Field
+
+from executor import run_io
+from http_cache import respond
+from metrics import span
+
+router = APIRouter(prefix="/api", tags=["sentiment"])
+
+MAX_ITEMS = 10_000
+NEGATION_SCOPE = 3       # tokens after a negator that it can still reach
+NEGATION_FACTOR = -0.75  # "not strong" is weaker than "weak"
+THRESHOLD = 1.0          # |score| above this is positive/negative, for news and the batch API alike
+
+_POSITIVE = {
+    1.5: "surge surges surged soar soars soared upgrade upgrades upgraded outperform outperforms "
+         "outperformed bullish",
+    1.0: "beat beats tops growth grows grew jump jumps jumped rally rallies rallied rise rises rose "
+         "gain gains gained record strong stronger robust profit profits profitable positive "
+         "buyback approval approved wins",
+    0.5: "up higher rising dividend recovers rebound rebounds",
+}
+_NEGATIVE = {
+    2.0: "fraud scam default defaults",
+    1.5: "plunge plunges plunged slump slumps slumped tumble tumbles tumbled downgrade downgrades "
+         "downgraded probe investigation lawsuit penalty ban bans banned bearish underperform "
+         "underperforms",
+    1.0: "miss misses missed fall falls fell drop drops dropped weak weaker loss losses negative "
+         "decline declines declined warning warns layoffs",
+    0.5: "down lower falling cut cuts",
+}
+WEIGHTS: Dict[str, float] = {
+    **{w: weight for weight, words in _POSITIVE.items() for w in words.split()},
+    **{w: -weight for weight, words in _NEGATIVE.items() for w in words.split()},
+}
+NEGATORS = frozenset(
+    "not no never without nor hardly fail fails failed "
+    "don't doesn't didn't isn't wasn't aren't weren't won't can't cannot".split()
+)
+
+# words (keeping contractions whole) and the punctuation that ends a negation scope
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[.,;:!?]")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower().replace("’", "'"))
+
+
+@lru_cache(maxsize=65536)  # backfills repeat the same headline across symbols and sources
+def score_text(text: str) -> Tuple[float, int, int]:
+    """(weighted score, positive terms, negative terms) in one pass over the tokens."""
+    score, pos, neg, reach = 0.0, 0, 0, 0
+    for tok in tokenize(text):
+        w = WEIGHTS.get(tok)
+        if w is not None:
+            if reach:
+                w *= NEGATION_FACTOR
+                reach = 0
+            score += w
+            pos += w > 0
+            neg += w < 0
+        elif tok in NEGATORS:
+            reach = NEGATION_SCOPE
+        elif reach:
+            reach = 0 if tok in ".,;:!?" else reach - 1
+    return score, pos, neg
+
+
+def label(score: float, threshold: float = THRESHOLD) -> str:
+    if score > threshold:
+        return "positive"
+    if score < -threshold:
+        return "negative"
+    return "neutral"
+
+
+def label_text(text: str, threshold: float = THRESHOLD) -> str:
+    return label(score_text(text)[0], threshold)
+
+
+# --- API ---
+class SentimentItem(BaseModel):
+    title: str
+    snippet: Optional[str] = None
+    symbol: Optional[str] = None  # groups the aggregate per symbol
+
+class SentimentBatchIn(BaseModel):
+    items: List[SentimentItem] = Field(..., min_length=1, max_length=MAX_ITEMS)
+    threshold: float = Field(THRESHOLD, ge=0, le=10, description="|score| above this is positive/negative")
+    details: bool = Field(True, description="Include the per-item results")
+
+def _aggregate(scores: List[float], labels: List[str], threshold: float) -> dict:
+    mean = sum(scores) / len(scores)
+    return {
+        "count": len(scores),
+        "mean_score": round(mean, 4),
+        "label": label(mean, threshold),
+        **{name: labels.count(name) for name in ("positive", "neutral", "negative")},
+    }
+
+def score_batch(req: SentimentBatchIn) -> dict:
+    with span("sentiment"):
+        rows = []
+        for item in req.items:
+            text = f"{item.title} {item.snippet}" if item.snippet else item.title
+            score, pos, neg = score_text(text)
+            rows.append({"score": round(score, 4), "label": label(score, req.threshold),
+                         "positive_terms": pos, "negative_terms": neg})
+        out = {"aggregate": _aggregate([r["score"] for r in rows], [r["label"] for r in rows], req.threshold)}
+        groups: Dict[str, List[dict]] = {}
+        for item, row in zip(req.items, rows):
+            if item.symbol:
+                groups.setdefault(item.symbol.upper(), []).append(row)
+        if groups:
+            out["by_symbol"] = {sym: _aggregate([r["score"] for r in g], [r["label"] for r in g], req.threshold)
+                                for sym, g in groups.items()}
+        if req.details:
+            out["results"] = rows
+    return out
+
+@router.post("/sentiment_batch")
+async def sentiment_batch(request: Request, req: SentimentBatchIn = Body(...)):
+    """Score up to MAX_ITEMS headlines with the lexicon: per item, overall and per symbol."""
+    return await run_io(lambda: respond(request, score_batch(req)))
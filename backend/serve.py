@@ -0,0 +1,181 @@
+# backend/serve.py
+# Pre-fork production server: one parent loads the whole universe into
+# shared memory (shared_store.py), warms the per-symbol caches by sending
+# itself the dashboard's first requests, then forks WEB_CONCURRENCY uvicorn
+# workers that accept on one inherited listening socket.
+#
+#   python serve.py --host 0.0.0.0 --port 8000 --workers 4
+#
+# Workers inherit the warmed state copy-on-write: the shared bars, parsed
+# catalog, indicator engine series, chat summaries and encoded /api/quote and
+# /api/history responses (WARM_PERIODS, default the frontend's 6mo). The
+# parent only supervises: a worker that dies is re-forked from the same warm
+# image, and SIGTERM/SIGINT stop every worker gracefully before the segment
+# is unlinked.
+#
+# The CPU process pool and IO thread pool are per worker, so unless
+# CPU_WORKERS / IO_THREADS are set, each worker gets cores / workers
+# processes and 32 / workers (at least 4) threads.
+#
+# Plain `uvicorn main:app` (and --reload) still works; it just skips all of
+# this and loads data per process on demand.
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List
+
+WARM_PERIODS = [p for p in os.getenv("WARM_PERIODS", "6mo").split(",") if p]
+IO_THREADS_TOTAL = 32  # thread-pool budget for the whole server when IO_THREADS is not set
+RESPAWN_DELAY = 1.0  # seconds before re-forking a worker that died right after starting
+
+
+def bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+async def warm(app, symbols: List[str], periods: List[str]) -> int:
+    """Request each symbol's quote and history through the app itself; returns the count."""
+    import httpx
+    headers = {"Accept": "application/json", "Accept-Encoding": "br, gzip"}  # what browsers send
+    done = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://warmup",
+                                 headers=headers) as client:
+        for symbol in symbols:
+            requests = [("/api/quote", {"symbol": symbol})]
+            requests += [("/api/history", {"symbol": symbol, "period": p}) for p in periods]
+            for path, params in requests:
+                r = await client.get(path, params=params)
+                done += r.status_code == 200
+    return done
+
+
+def split_budget(workers: int) -> None:
+    """Give each worker its share of the CPU and IO pools unless they were set explicitly.
+
+    Must run before the backend modules are imported (executor reads the
+    environment at import time); otherwise every worker would size its
+    process pool to all cores and cpu_count workers could start cpu_count**2
+    processes under a sweep burst.
+    """
+    cpus = os.cpu_count() or 1
+    if not (os.getenv("CPU_WORKERS") or os.getenv("BACKTEST_WORKERS")):
+        os.environ["CPU_WORKERS"] = str(max(1, cpus // workers))
+    os.environ.setdefault("IO_THREADS", str(max(4, IO_THREADS_TOTAL // workers)))
+
+
+def prepare(periods: List[str]):
+    """Load, share and warm everything in this (parent) process; returns the app and segment."""
+    t0 = time.perf_counter()
+    import main
+    from catalog import catalog
+    from chatbot import warm_summaries
+    from metrics import reset as reset_metrics
+    from price_store import store
+    from shared_store import publish
+
+    universe = publish(store)
+    catalog.refresh()
+    symbols = catalog.symbols()
+    warmed = asyncio.run(warm(main.app, symbols, periods)) if periods else 0
+    warm_summaries(symbols)
+    reset_metrics()
+    print(f"serve: {len(universe.blocks)} symbols in shared memory ({universe.shm.size / 1e6:.1f} MB), "
+          f"{warmed} responses warmed in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return main.app, universe
+
+
+def run_worker(app, sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+    signal.signal(signal.SIGINT, signal.SIG_DFL)  # uvicorn installs its own graceful handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level, proxy_headers=True))
+    parent = os.getppid()
+
+    def orphaned() -> None:  # parent killed without forwarding a signal: shut down too
+        while os.getppid() == parent:
+            time.sleep(1)
+        server.should_exit = True
+
+    threading.Thread(target=orphaned, name="orphan-check", daemon=True).start()
+    server.run(sockets=[sock])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Pre-fork server with shared-memory market data")
+    ap.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or (os.cpu_count() or 1))
+    ap.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    ap.add_argument("--no-warm", action="store_true", help="share the data but skip the warmup requests")
+    args = ap.parse_args()
+
+    workers_n = max(1, args.workers)
+    split_budget(workers_n)
+    sock = bind(args.host, args.port)
+    app, universe = prepare([] if args.no_warm else WARM_PERIODS)
+    gc.freeze()  # warmed objects move to a permanent generation; GC passes won't dirty their pages
+
+    workers: Dict[int, float] = {}  # pid -> start time
+    stopping = False
+
+    def fork() -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, args.log_level)
+                os._exit(0)
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+        workers[pid] = time.monotonic()
+
+    def stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers_n):
+        fork()
+    print(f"serve: {len(workers)} workers on http://{args.host}:{args.port}", file=sys.stderr)
+
+    try:
+        while workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = workers.pop(pid, None)
+            if started is None or stopping:
+                continue
+            print(f"serve: worker {pid} exited ({os.waitstatus_to_exitcode(status)}), restarting", file=sys.stderr)
+            if time.monotonic() - started < RESPAWN_DELAY:
+                time.sleep(RESPAWN_DELAY)
+            fork()
+    finally:
+        universe.unlink()
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# backend/shared_store.py
+# Market data in POSIX shared memory for the pre-fork server (serve.py).
+#
+# The parent process loads every CSV once and copies the bars into a single
+# multiprocessing.shared_memory segment, one (6, n) float64 block per symbol
+# in the binary-cache layout (row 0 the int64 epoch-ms dates bit-for-bit,
+# rows 1-5 OHLCV). Forked workers inherit the mapping and hand out read-only
+# PriceSeries views of it, so N workers hold one copy of the universe.
+#
+# The store still stat()s the CSV on every request: a file rewritten after
+# the fork no longer matches its block and is loaded privately by each
+# worker, as without the segment. Ingested bars (segments.py) are merged on
+# top per worker, as before.
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from metrics import register_stats
+from price_store import PriceSeries, Version
+
+
+class SharedUniverse:
+    """Index of (version, block) per file stem over one shared memory segment."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, blocks: Dict[str, Tuple[Version, np.ndarray]]):
+        self.shm = shm
+        self.blocks = blocks
+        self.hits = self.misses = 0
+
+    @classmethod
+    def publish(cls, series: Iterable[Tuple[str, PriceSeries]]) -> "SharedUniverse":
+        """Copy every series into a new segment; call in the parent, before forking."""
+        series = list(series)
+        size = sum(6 * len(s) * 8 for _, s in series)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 8))
+        blocks, offset = {}, 0
+        for stem, s in series:
+            n = len(s)
+            block = np.ndarray((6, n), dtype=np.float64, buffer=shm.buf, offset=offset)
+            block[0] = s.t.view(np.float64)
+            block[1:] = s.ohlcv
+            block.flags.writeable = False
+            blocks[stem] = (s.version, block)
+            offset += block.nbytes
+        return cls(shm, blocks)
+
+    def get(self, stem: str, symbol: str, version: Version) -> Optional[PriceSeries]:
+        entry = self.blocks.get(stem)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.hits += 1
+        block = entry[1]
+        return PriceSeries(symbol, version, block[0].view(np.int64), block[1:])
+
+    def unlink(self) -> None:
+        """Remove the segment name (parent, on shutdown); mappings stay valid until unmapped."""
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        return {"name": self.shm.name, "symbols": len(self.blocks), "bytes": self.shm.size,
+                "hits": self.hits, "misses": self.misses}
+
+
+def publish(store) -> SharedUniverse:
+    """Load the store's CSVs into shared memory and serve them from there."""
+    universe = SharedUniverse.publish(store.csv_series())
+    store.share(universe)
+    register_stats("shared_store", universe.stats)
+    return universe
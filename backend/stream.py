@@ -0,0 +1,344 @@
+# backend/stream.py
+# Server-Sent Events for price bars: a subscriber gets one snapshot, then
+# only new bars with incrementally updated SMA20/EMA20, 52-week stats and
+# the next-day forecast.
+#
+#   GET /api/stream?symbol=AAPL                        live: follows the CSV as bars are appended
+#   GET /api/stream?symbol=AAPL&mode=replay&speed=20   steps through the stored bars, 20 bars/s
+#
+# One producer task per channel (symbol + mode + replay settings) updates the
+# rolling state and encodes each event once; subscribers only receive the
+# bytes through their own bounded queue. A subscriber that falls behind by
+# more than STREAM_QUEUE_SIZE events is disconnected instead of slowing the
+# producer down.
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import date
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from http_cache import encode_json
+from indicators import ema as ema_arr, engine, to_json_list
+from metrics import register_stats
+from price_store import DEFAULT_PERIOD, PriceSeries, period_bounds, store, to_epoch_ms
+
+router = APIRouter(prefix="/api", tags=["stream"])
+
+POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "1"))       # live mode: how often the CSV is stat()ed
+QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))           # events buffered per subscriber
+KEEPALIVE_SECONDS = float(os.getenv("STREAM_KEEPALIVE_SECONDS", "15"))
+MAX_TICK_HZ = 50  # replay faster than this sends several bars per event
+
+RESET = b"reset"  # queue marker: the subscriber should send a fresh snapshot
+
+SMA_WINDOW = EMA_WINDOW = 20
+YEAR_BARS = 252        # 52-week stats, same window as main.stats_52w_full
+FORECAST_BARS = 60     # same window as main.naive_next_day_forecast
+
+
+class RollingState:
+    """O(1)-per-bar SMA/EMA, 52-week high/low/avg volume and linear-fit forecast."""
+
+    def __init__(self):
+        self.n = 0
+        self.closes: Deque[float] = deque(maxlen=FORECAST_BARS)
+        self.sma_sum = 0.0
+        self.ema: Optional[float] = None
+        self.vols: Deque[float] = deque()
+        self.vol_sum = 0.0
+        # monotonic deques of (bar index, value) for the 52-week max/min
+        self.highs: Deque[Tuple[int, float]] = deque()
+        self.lows: Deque[Tuple[int, float]] = deque()
+        # sums for the least-squares line through the last FORECAST_BARS closes (x = 0..m-1)
+        self.sy = self.sxy = 0.0
+        self._since_resync = 0
+
+    @classmethod
+    def from_series(cls, s: PriceSeries) -> "RollingState":
+        """State after the last bar of `s`; only the trailing year is replayed bar by bar."""
+        st = cls()
+        start = max(0, len(s) - YEAR_BARS)
+        if start:
+            st.ema = float(ema_arr(s.c[:start], EMA_WINDOW)[-1])
+        st.n = start
+        for t, o, h, l, c, v in zip(s.t[start:].tolist(), *s.ohlcv[:, start:].tolist()):
+            st.update(t, o, h, l, c, v)
+        return st
+
+    def update(self, t: int, o: float, h: float, l: float, c: float, v: float) -> dict:
+        i = self.n
+        self.n += 1
+        # SMA20 from a running sum over the close window
+        if len(self.closes) >= SMA_WINDOW:
+            self.sma_sum -= self.closes[-SMA_WINDOW]
+        self.sma_sum += c
+        # forecast sums: slide the window (re-indexing x) or grow it
+        if len(self.closes) == FORECAST_BARS:
+            y0 = self.closes[0]
+            self.sxy += -(self.sy - y0) + (FORECAST_BARS - 1) * c
+            self.sy += c - y0
+        else:
+            self.sxy += len(self.closes) * c
+            self.sy += c
+        self.closes.append(c)
+        self._since_resync += 1
+        if self._since_resync >= FORECAST_BARS:  # bound float drift of the sliding sums
+            ys = np.fromiter(self.closes, dtype=np.float64)
+            self.sy, self.sxy = float(ys.sum()), float(np.arange(ys.shape[0]) @ ys)
+            self.sma_sum = float(ys[-SMA_WINDOW:].sum())
+            self._since_resync = 0
+        k = 2.0 / (EMA_WINDOW + 1)
+        self.ema = c if self.ema is None else c * k + self.ema * (1 - k)
+        # 52-week window
+        self.vols.append(v)
+        self.vol_sum += v
+        if len(self.vols) > YEAR_BARS:
+            self.vol_sum -= self.vols.popleft()
+        while self.highs and self.highs[-1][1] <= h:
+            self.highs.pop()
+        self.highs.append((i, h))
+        while self.lows and self.lows[-1][1] >= l:
+            self.lows.pop()
+        self.lows.append((i, l))
+        oldest = self.n - YEAR_BARS
+        while self.highs[0][0] < oldest:
+            self.highs.popleft()
+        while self.lows[0][0] < oldest:
+            self.lows.popleft()
+        return {"t": t, "o": o, "h": h, "l": l, "c": c, "v": v,
+                "sma20": self.sma(), "ema20": self.ema, "stats": self.stats(), "prediction": self.prediction()}
+
+    def sma(self) -> Optional[float]:
+        return self.sma_sum / SMA_WINDOW if len(self.closes) >= SMA_WINDOW else None
+
+    def stats(self) -> dict:
+        if not self.vols:
+            return {"high_52w": None, "low_52w": None, "avg_volume_1y": None}
+        return {"high_52w": self.highs[0][1], "low_52w": self.lows[0][1],
+                "avg_volume_1y": self.vol_sum / len(self.vols)}
+
+    def forecast(self) -> Optional[float]:
+        m = len(self.closes)
+        if m < 5:
+            return None
+        sx = m * (m - 1) / 2.0
+        sxx = (m - 1) * m * (2 * m - 1) / 6.0
+        slope = (m * self.sxy - sx * self.sy) / (m * sxx - sx * sx)
+        intercept = (self.sy - slope * sx) / m
+        return float(intercept + slope * m)
+
+    def prediction(self) -> dict:
+        return {"next_day_close_forecast": self.forecast()}
+
+
+def sse(event: str, payload) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + encode_json(payload) + b"\n\n"
+
+
+class Channel:
+    """One producer fanning encoded events out to every subscriber of a symbol stream."""
+
+    def __init__(self, hub: "StreamHub", key: tuple, symbol: str, mode: str, start: int, speed: float):
+        self.hub, self.key = hub, key
+        self.symbol, self.mode, self.speed = symbol, mode, speed
+        full = store.get(symbol)
+        self.full = full
+        self.pos = len(full) if mode == "live" else start  # bars published so far
+        self.state = RollingState.from_series(self.view())
+        self.subscribers: List[asyncio.Queue] = []
+        self._snapshots: Dict[str, Tuple[tuple, bytes]] = {}  # period -> ((version, pos), frame)
+        self.task: Optional[asyncio.Task] = None
+
+    def view(self) -> PriceSeries:
+        """Bars published so far. Replay views get their own indicator-cache key."""
+        s = self.full
+        name = s.symbol if self.mode == "live" else f"{s.symbol}@replay"
+        return PriceSeries(name, s.version, s.t[:self.pos], s.ohlcv[:, :self.pos])
+
+    def snapshot(self, period: str) -> dict:
+        """Last `period` of the published bars.
+
+        Unlike /api/history, SMA/EMA are full-history values and the forecast
+        always fits the last 60 bars, so the numbers continue seamlessly into
+        the incremental updates whenever a client joins.
+        """
+        s = self.view()
+        i, j = period_bounds(s, period)
+        w = s.window(i, j)
+        return {
+            "symbol": self.symbol.upper(), "mode": self.mode, "period": period, "interval": "1d",
+            "points": [dict(zip(("t", "o", "h", "l", "c", "v"), row))
+                       for row in zip(w.t.tolist(), *w.ohlcv.tolist())],
+            "indicators": {"sma20": to_json_list(engine.sma(s, SMA_WINDOW)[i:j]),
+                           "ema20": engine.ema(s, EMA_WINDOW)[i:j].tolist()},
+            "stats": self.state.stats(),
+            "prediction": self.state.prediction(),
+        }
+
+    def snapshot_frame(self, period: str) -> bytes:
+        """Encoded snapshot event, shared by everyone joining at the same position."""
+        at = (self.full.version, self.pos)
+        hit = self._snapshots.get(period)
+        if hit is None or hit[0] != at:
+            hit = self._snapshots[period] = (at, sse("snapshot", self.snapshot(period)))
+        return hit[1]
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.append(q)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._run())
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue) -> None:
+        if q in self.subscribers:
+            self.subscribers.remove(q)
+        if not self.subscribers:
+            self.close()
+
+    def close(self) -> None:
+        self.hub.remove(self)
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    def publish(self, frame: Optional[bytes]) -> None:
+        """Queue one encoded event for every subscriber (None = end of stream, RESET = re-snapshot)."""
+        self.hub.events += 1
+        for q in list(self.subscribers):
+            try:
+                q.put_nowait(frame)
+            except asyncio.QueueFull:
+                # slow consumer: drop its backlog and tell it to go away
+                self.hub.dropped += 1
+                self.subscribers.remove(q)
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(None)
+
+    def _publish_bars(self, upto: int) -> None:
+        t, ohlcv = self.full.t, self.full.ohlcv
+        rows = [self.state.update(int(t[i]), *ohlcv[:, i].tolist()) for i in range(self.pos, upto)]
+        self.pos = upto
+        self.publish(sse("bars", {"symbol": self.symbol.upper(), "ts": time.time(), "bars": rows}))
+
+    async def _run(self) -> None:
+        try:
+            if self.mode == "replay":
+                await self._replay()
+            else:
+                await self._follow()
+        finally:
+            self.publish(None)
+            self.hub.remove(self)
+
+    async def _replay(self) -> None:
+        per_tick = max(1, int(np.ceil(self.speed / MAX_TICK_HZ)))
+        interval = per_tick / self.speed
+        next_at = time.monotonic()
+        while self.pos < len(self.full):
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            self._publish_bars(min(len(self.full), self.pos + per_tick))
+        self.publish(sse("end", {"symbol": self.symbol.upper(), "bars": self.pos}))
+
+    async def _follow(self) -> None:
+        while True:
+            await asyncio.sleep(POLL_SECONDS)
+            try:
+                cur = store.get(self.symbol)
+            except HTTPException:
+                self.publish(sse("end", {"symbol": self.symbol.upper(), "reason": "removed"}))
+                return
+            if cur.version == self.full.version:
+                continue
+            n = self.pos
+            appended = len(cur) > n and n > 0 and int(cur.t[n - 1]) == int(self.full.t[n - 1]) \
+                and float(cur.c[n - 1]) == float(self.full.c[n - 1])
+            self.full = cur
+            if appended:
+                self._publish_bars(len(cur))
+            else:
+                # history was rewritten: rebuild and ask clients to re-snapshot
+                self.pos = len(cur)
+                self.state = RollingState.from_series(self.view())
+                self.publish(RESET)
+
+
+class StreamHub:
+    def __init__(self):
+        self.channels: Dict[tuple, Channel] = {}
+        self.events = self.dropped = 0  # cumulative: events published, slow subscribers dropped
+
+    def channel(self, symbol: str, mode: str, start: int = 0, speed: float = 1.0) -> Channel:
+        key = (symbol.upper(), mode) if mode == "live" else (symbol.upper(), mode, start, speed)
+        ch = self.channels.get(key)
+        if ch is None:
+            ch = self.channels[key] = Channel(self, key, symbol, mode, start, speed)
+        return ch
+
+    def remove(self, ch: Channel) -> None:
+        if self.channels.get(ch.key) is ch:
+            del self.channels[ch.key]
+
+    def stats(self) -> dict:
+        chans = list(self.channels.values())
+        return {"channels": len(chans), "subscribers": sum(len(c.subscribers) for c in chans),
+                "events": self.events, "dropped": self.dropped}
+
+
+hub = StreamHub()
+register_stats("stream", hub.stats)
+
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    symbol: str = Query(...),
+    period: str = Query(DEFAULT_PERIOD, description="Window of the initial snapshot"),
+    mode: str = Query("live", pattern="^(live|replay)$"),
+    speed: float = Query(10.0, gt=0, le=10_000, description="Replay speed in bars per second"),
+    replay_from: Optional[date] = Query(None, alias="from", description="Replay start date (default: start of `period`)"),
+):
+    """SSE stream: `snapshot`, then `bars` events; `reset` asks for a fresh snapshot, `end` closes."""
+    full = store.get(symbol)
+    start = 0
+    if mode == "replay":
+        if replay_from:
+            start = int(np.searchsorted(full.t, to_epoch_ms(replay_from)))
+        else:
+            start = period_bounds(full, period)[0]
+        start = max(1, min(start, len(full)))  # the snapshot needs at least one bar
+
+    async def events():
+        # subscribe only once the response is being sent: a client that disconnects
+        # before the body starts never registers, so nothing is left to clean up
+        ch = hub.channel(symbol, mode, start, speed)
+        q = ch.subscribe()
+        try:
+            yield ch.snapshot_frame(period)
+            while True:
+                try:
+                    frame = await asyncio.wait_for(q.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield b": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    return
+                if frame is RESET:
+                    yield ch.snapshot_frame(period)
+                    continue
+                yield frame
+        finally:
+            ch.unsubscribe(q)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,75 @@
+# backend/stubs/llm_stub.py
+# Minimal OpenAI-compatible chat completions server standing in for Groq.
+# Returns canned JSON for the trend / news prompts and an echo for chat.
+#
+#   uvicorn stubs.llm_stub:app --port 9100
+#   GROQ_BASE_URL=http://127.0.0.1:9100 GROQ_API_KEY=stub uvicorn main:app
+#
+# STUB_LLM_DELAY_MS adds a fixed latency to every completion (before the
+# first token when streaming); with "stream": true the answer is sent as SSE
+# chunks, one word each, STUB_LLM_TOKEN_MS apart.
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+
+from fastapi import Body, FastAPI
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="LLM stub")
+DELAY = float(os.getenv("STUB_LLM_DELAY_MS", "0")) / 1000.0
+TOKEN_DELAY = float(os.getenv("STUB_LLM_TOKEN_MS", "0")) / 1000.0
+calls = 0
+
+
+def _answer(messages: list[dict]) -> str:
+    prompt = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    if "Classify the CURRENT trend" in prompt:
+        return json.dumps({"label": "Bullish", "confidence": 70, "reasoning": "Stub: price above rising SMAs."})
+    if '"bullets"' in prompt:
+        return json.dumps({"bullets": ["Stub bullet one.", "Stub bullet two.", "Stub bullet three."],
+                           "sentiment": "neutral", "risk": "Stub response; not real analysis."})
+    return f"Stub answer to: {prompt[:200]}"
+
+
+@app.post("/openai/v1/chat/completions")
+async def completions(body: dict = Body(...)):
+    global calls
+    calls += 1
+    if DELAY:
+        await asyncio.sleep(DELAY)
+    content = _answer(body.get("messages") or [])
+    if body.get("stream"):
+        return StreamingResponse(_chunks(f"stub-{calls}", body.get("model", "stub"), content),
+                                 media_type="text/event-stream")
+    return {
+        "id": f"stub-{calls}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+async def _chunks(cid: str, model: str, content: str):
+    def chunk(delta: dict, finish=None) -> bytes:
+        body = {"id": cid, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+        return f"data: {json.dumps(body)}\n\n".encode()
+
+    yield chunk({"role": "assistant", "content": ""})
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        if TOKEN_DELAY:
+            await asyncio.sleep(TOKEN_DELAY)
+        yield chunk({"content": word if i == 0 else " " + word})
+    yield chunk({}, "stop")
+    yield b"data: [DONE]\n\n"
+
+
+@app.get("/stats")
+async def stats():
+    return {"calls": calls}
@@ -0,0 +1,66 @@
+# backend/stubs/rss_stub.py
+# Serves fixture RSS at the Google News search path, with ETag /
+# Last-Modified support, so the live-news path runs without network access.
+#
+#   uvicorn stubs.rss_stub:app --port 9101
+#   NEWS_FEED_BASE=http://127.0.0.1:9101/rss/search uvicorn main:app
+#
+# STUB_RSS_DELAY_MS adds a fixed latency to every 200 response.
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+from email.utils import formatdate
+from xml.sax.saxutils import escape
+
+from fastapi import FastAPI, Request, Response
+
+app = FastAPI(title="RSS stub")
+DELAY = float(os.getenv("STUB_RSS_DELAY_MS", "0")) / 1000.0
+LAST_MODIFIED = formatdate(usegmt=True)
+counts = {"requests": 0, "not_modified": 0}
+
+HEADLINES = [
+    "{c} shares rise after strong quarterly profit",
+    "{c} beats revenue estimates; analysts upgrade outlook",
+    "Regulators open probe into {c} supply chain",
+    "{c} stock falls as margins weaken",
+    "{c} announces record buyback programme",
+    "Brokerages keep neutral rating on {c}",
+]
+
+
+def fixture_rss(query: str, items: int = 12) -> str:
+    company = query.split(" (")[0] or "Company"
+    entries = []
+    for i in range(items):
+        title = HEADLINES[i % len(HEADLINES)].format(c=company)
+        entries.append(
+            f"<item><title>{escape(title)}</title>"
+            f"<link>http://stub.local/{i}</link>"
+            f"<description>{escape(title)} (fixture #{i})</description></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{escape(query)}</title>{''.join(entries)}</channel></rss>"
+    )
+
+
+@app.get("/rss/search")
+async def search(request: Request, q: str = ""):
+    counts["requests"] += 1
+    body = fixture_rss(q)
+    etag = '"' + hashlib.md5(body.encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Last-Modified": LAST_MODIFIED}
+    if request.headers.get("if-none-match") == etag:
+        counts["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    if DELAY:
+        await asyncio.sleep(DELAY)
+    return Response(content=body, media_type="application/rss+xml", headers=headers)
+
+
+@app.get("/stats")
+async def stats():
+    return counts
@@ -0,0 +1,33 @@
+# backend/tests/conftest.py
+# Tests import the backend's flat modules the way uvicorn does (from backend/).
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def stub_gateway(monkeypatch):
+    """LLMGateway factory whose client talks to stubs/llm_stub.py in-process (or `transport`)."""
+    import asyncio
+
+    import httpx
+    from groq import AsyncGroq
+
+    from llm import LLMGateway
+    from stubs import llm_stub
+
+    monkeypatch.setenv("GROQ_API_KEY", "stub")
+    monkeypatch.setattr(llm_stub, "calls", 0)
+
+    def make(max_concurrency: int = 4, timeout: float = 5.0, transport=None) -> LLMGateway:
+        gw = LLMGateway(max_concurrency=max_concurrency, timeout=timeout, max_retries=0)
+        transport = transport or httpx.ASGITransport(app=llm_stub.app)
+        gw._client = AsyncGroq(api_key="stub", base_url="http://llm-stub", max_retries=0, timeout=timeout,
+                               http_client=httpx.AsyncClient(transport=transport))
+        gw._sem = asyncio.Semaphore(max_concurrency)
+        return gw
+
+    return make
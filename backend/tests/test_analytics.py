@@ -0,0 +1,63 @@
+# backend/tests/test_analytics.py
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import analytics
+from analytics import MAX_STALE_BARS, AlignedCloses
+from price_store import PriceSeries
+
+DAY_MS = 86_400_000
+
+
+def series(symbol: str, start: int, n: int, seed: int) -> PriceSeries:
+    t = (np.arange(start, start + n, dtype=np.int64) + 20_000) * DAY_MS
+    c = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, n)))
+    return PriceSeries(symbol, (seed, n), t, np.vstack([c, c, c, c, np.ones(n)]))
+
+
+def ragged_universe():
+    # SAP ends two days before the others, like the shipped data
+    return [series("AAPL", 0, 120, 1), series("MSFT", 0, 120, 2), series("SAP", 0, 118, 3)]
+
+
+def test_ragged_end_keeps_every_symbol():
+    st = AlignedCloses(ragged_universe()).stats("daily", 60)
+    assert st.symbols == ["AAPL", "MSFT", "SAP"]
+    assert st.excluded == []
+
+
+def test_single_symbol_append_keeps_the_rest():
+    universe = ragged_universe()
+    universe[0] = series("AAPL", 0, 121, 1)
+    st = AlignedCloses(universe).stats("daily", 60)
+    assert st.symbols == ["AAPL", "MSFT", "SAP"]
+    # the others carry their last close into the new row: a zero return
+    assert st.returns[-1, st.index["MSFT"]] == 0.0
+
+
+def test_long_stale_symbol_is_excluded():
+    universe = ragged_universe() + [series("OLD", 0, 120 - MAX_STALE_BARS - 1, 4)]
+    st = AlignedCloses(universe).stats("daily", 60)
+    assert st.excluded == ["OLD"]
+
+
+def test_correlated_after_single_symbol_append(monkeypatch):
+    universe = ragged_universe()
+    universe[0] = series("AAPL", 0, 121, 1)
+    closes = AlignedCloses(universe)
+    monkeypatch.setattr(analytics, "get_closes", lambda: closes)
+    app = FastAPI()
+    app.include_router(analytics.router)
+    r = TestClient(app).get("/api/analytics/correlated", params={"symbol": "SAP", "window": 60})
+    assert r.status_code == 200
+    assert {row["symbol"] for row in r.json()["results"]} == {"AAPL", "MSFT"}
+
+
+@pytest.mark.parametrize("freq", ["daily", "weekly"])
+def test_missing_symbol_is_404(freq):
+    st = AlignedCloses(ragged_universe()).stats(freq, 5)
+    with pytest.raises(analytics.HTTPException) as e:
+        st.select(["NOPE"])
+    assert e.value.status_code == 404
@@ -0,0 +1,48 @@
+# backend/tests/test_backtest.py
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backtest import router
+
+@pytest.fixture(scope="module")
+def api():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_sweep_ranks_shallowest_drawdown_first(api):
+    r = api.post("/api/backtest/sweep", json={
+        "symbols": ["AAPL", "TCS.NS"], "strategy": "sma_cross",
+        "grid": {"fast": [5, 10, 20], "slow": [50, 100, 200]}, "rank_by": "max_drawdown", "top": 100,
+    })
+    assert r.status_code == 200
+    out = r.json()
+    drawdowns = [row["mean_max_drawdown"] for row in out["ranking"]]
+    assert drawdowns[0] == max(drawdowns)
+    assert drawdowns == sorted(drawdowns, reverse=True)
+
+
+def test_sweep_best_by_symbol_is_shallowest(api):
+    body = {"symbols": ["AAPL"], "strategy": "sma_cross",
+            "grid": {"fast": [5, 10, 20], "slow": [50, 100, 200]}, "rank_by": "max_drawdown"}
+    best = api.post("/api/backtest/sweep", json=body).json()["best_by_symbol"]["AAPL"]
+    single = [api.post("/api/backtest", json={"symbols": ["AAPL"], "strategy": "sma_cross", "curve": False,
+                                               "params": {"fast": f, "slow": s}}).json()
+              for f in (5, 10, 20) for s in (50, 100, 200)]
+    assert best["max_drawdown"] == max(r["results"][0]["metrics"]["max_drawdown"] for r in single)
+
+
+@pytest.mark.parametrize("params", [
+    {"fast": 0}, {"fast": -5}, {"slow": 1}, {"fast": 2.5}, {"fast": 50, "slow": 50}, {"fast": 100, "slow": 50},
+])
+def test_backtest_rejects_bad_windows(api, params):
+    r = api.post("/api/backtest", json={"symbols": ["AAPL"], "strategy": "sma_cross", "params": params})
+    assert r.status_code == 400
+
+
+def test_sweep_rejects_bad_window_values(api):
+    r = api.post("/api/backtest/sweep", json={"symbols": ["AAPL"], "strategy": "forecast",
+                                              "grid": {"window": [1, 60]}})
+    assert r.status_code == 400
@@ -0,0 +1,85 @@
+# backend/tests/test_chatbot.py
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import chatbot
+
+
+@pytest.fixture
+def summaries(monkeypatch):
+    monkeypatch.setattr(chatbot, "_SUMMARIES", chatbot.OrderedDict())
+    return chatbot._SUMMARIES
+
+
+def test_unknown_periods_share_the_default_entry(summaries):
+    for period in ("6mo", "bogus-1", "bogus-2", ""):
+        text = asyncio.run(chatbot.chat_summary("AAPL", period))
+        assert "Period: 6mo" in text
+    assert list(summaries) == [("AAPL", "6mo")]
+
+
+def test_summaries_are_bounded(summaries, monkeypatch):
+    monkeypatch.setattr(chatbot, "MAX_SUMMARIES", 2)
+    for period in ("1mo", "3mo", "1y"):
+        asyncio.run(chatbot.chat_summary("AAPL", period))
+    asyncio.run(chatbot.chat_summary("AAPL", "3mo"))  # refreshes 3mo
+    asyncio.run(chatbot.chat_summary("AAPL", "2y"))
+    assert list(summaries) == [("AAPL", "3mo"), ("AAPL", "2y")]
+
+
+# --- /api/chat/stream ---
+def events(body: str):
+    out = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def post_stream(gw, monkeypatch, **body):
+    monkeypatch.setattr(chatbot, "gateway", gw)
+    app = FastAPI()
+    app.include_router(chatbot.router)
+    with TestClient(app) as api:
+        return api.post("/api/chat/stream", json={"symbol": "AAPL", **body})
+
+
+def test_stream_sends_meta_tokens_done(stub_gateway, monkeypatch):
+    r = post_stream(stub_gateway(), monkeypatch, messages=[{"role": "user", "content": "hi there"}])
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/event-stream")
+    ev = events(r.text)
+    assert ev[0] == ("meta", {"symbol": "AAPL", "period": "6mo", "origin": "llm"})
+    assert [e for e, _ in ev[1:-1]] == ["token"] * (len(ev) - 2) and len(ev) > 3
+    answer = "".join(d["text"] for _, d in ev[1:-1])
+    assert ev[-1] == ("done", {"answer": answer}) and answer == "Stub answer to: hi there"
+
+
+def test_stream_without_key_is_heuristic(stub_gateway, monkeypatch):
+    gw = stub_gateway()
+    monkeypatch.delenv("GROQ_API_KEY")
+    ev = events(post_stream(gw, monkeypatch).text)
+    assert [e for e, _ in ev] == ["meta", "token", "done"]
+    assert ev[0][1]["origin"] == "heuristic"
+    assert ev[2][1]["answer"].startswith("GROQ_API_KEY is not set") and "Symbol: AAPL" in ev[2][1]["answer"]
+
+
+def test_stream_reports_upstream_failure_as_error_event(stub_gateway, monkeypatch):
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    gw = stub_gateway(transport=httpx.MockTransport(refuse))
+    ev = events(post_stream(gw, monkeypatch).text)
+    assert [e for e, _ in ev] == ["meta", "error"]
+    assert ev[0][1]["origin"] == "llm"
+    assert ev[1][1]["detail"].startswith("LLM request failed")
+    assert gw.errors == 1 and gw._sem._value == gw.max_concurrency
+
+
+def test_stream_unknown_symbol_is_404_before_any_event(stub_gateway, monkeypatch):
+    r = post_stream(stub_gateway(), monkeypatch, symbol="NOPE")
+    assert r.status_code == 404
@@ -0,0 +1,77 @@
+# backend/tests/test_feeds.py
+# FeedFetcher against stubs/rss_stub.py, served in-process.
+import asyncio
+
+import httpx
+import pytest
+
+import feeds
+from feeds import FeedFetcher
+from stubs import rss_stub
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(rss_stub, "counts", {"requests": 0, "not_modified": 0})
+    return rss_stub
+
+
+def fetcher(ttl: float) -> FeedFetcher:
+    f = FeedFetcher(ttl=ttl)
+    f._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=rss_stub.app))
+    return f
+
+
+def run(f: FeedFetcher, *calls):
+    async def go():
+        try:
+            return [await f.get(*c) for c in calls]
+        finally:
+            await f.aclose()
+    return asyncio.run(go())
+
+
+def test_fresh_entry_is_served_from_memory(stub):
+    f = fetcher(ttl=300)
+    first, second = run(f, ("Infosys",), ("Infosys",))
+    assert first == second and len(first) == 12
+    assert stub.counts == {"requests": 1, "not_modified": 0}
+    assert (f.hits, f.fetches, f.not_modified) == (1, 1, 0)
+
+
+def test_stale_entry_revalidates_with_etag(stub):
+    f = fetcher(ttl=0)
+    first, second = run(f, ("Infosys",), ("Infosys",))
+    assert first == second
+    assert stub.counts == {"requests": 2, "not_modified": 1}
+    assert (f.fetches, f.not_modified, f.errors) == (2, 1, 0)
+
+
+def test_changed_feed_is_refetched(stub, monkeypatch):
+    f = fetcher(ttl=0)
+    run_calls = []
+
+    async def counting_run_io(fn, *args):
+        run_calls.append(fn)
+        return fn(*args)
+
+    monkeypatch.setattr(feeds, "run_io", counting_run_io)
+    infosys, tcs = run(f, ("Infosys",), ("TCS",))
+    assert infosys != tcs
+    assert stub.counts == {"requests": 2, "not_modified": 0}
+    assert run_calls == [feeds.parse_feed, feeds.parse_feed]  # parsing goes through the IO pool
+
+
+def test_unreachable_feed_serves_stale_items(stub, monkeypatch):
+    f = fetcher(ttl=0)
+
+    async def go():
+        items = await f.get("Infosys")
+        monkeypatch.setattr(feeds, "google_news_url", lambda *k: "http://stub.local/missing")
+        try:
+            return items, await f.get("Infosys")
+        finally:
+            await f.aclose()
+
+    items, stale = asyncio.run(go())
+    assert stale == items and f.errors == 1
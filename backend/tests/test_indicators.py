@@ -0,0 +1,47 @@
+# backend/tests/test_indicators.py
+import numpy as np
+import pytest
+
+import segments
+from indicators import IndicatorEngine, ema, sma
+from price_store import PriceStore
+
+HEADER = "Date,Open,High,Low,Close,Volume\n"
+
+
+def write_csv(path, closes, start_day=1):
+    rows = [f"2024-01-{start_day + i:02d},{c},{c},{c},{c},1000\n" for i, c in enumerate(closes)]
+    path.write_text(HEADER + "".join(rows))
+
+
+@pytest.fixture
+def store(tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "bars").mkdir()
+    return PriceStore(tmp_path / "data", cache_dir=None, bars_dir=tmp_path / "bars")
+
+
+def check(engine, s):
+    np.testing.assert_allclose(engine.sma(s, 3), sma(s.c, 3), equal_nan=True)
+    np.testing.assert_allclose(engine.ema(s, 3), ema(s.c, 3))
+
+
+def test_ingested_bars_extend_the_cached_series(store):
+    write_csv(store.data_dir / "X.csv", [10.0, 11, 12, 13, 14])
+    engine = IndicatorEngine()
+    check(engine, store.get("X"))
+    t = np.array([np.datetime64("2024-01-06", "ms").astype(np.int64)])
+    segments.append(store.bars_dir, "X", t, np.full((5, 1), 15.0), None)
+    check(engine, store.get("X"))
+    assert engine.extends == 2
+
+
+def test_rewritten_csv_is_rebuilt_even_when_it_appends(store):
+    path = store.data_dir / "X.csv"
+    write_csv(path, [10.0, 11, 12, 13, 14])
+    engine = IndicatorEngine()
+    check(engine, store.get("X"))
+    # corrects a middle bar and appends two; the last old bar is unchanged
+    write_csv(path, [10.0, 11, 99, 13, 14, 15, 16])
+    check(engine, store.get("X"))
+    assert engine.extends == 0
@@ -0,0 +1,80 @@
+# backend/tests/test_llm.py
+# LLMGateway against stubs/llm_stub.py, served in-process.
+import asyncio
+import time
+
+import pytest
+
+from llm import LLMError
+from stubs import llm_stub
+
+MSGS = [{"role": "user", "content": "hello"}]
+
+
+def run(gw, fn):
+    async def go():
+        try:
+            return await fn()
+        finally:
+            await gw.aclose()
+    return asyncio.run(go())
+
+
+def test_identical_requests_share_one_completion(stub_gateway, monkeypatch):
+    monkeypatch.setattr(llm_stub, "DELAY", 0.05)
+    gw = stub_gateway()
+    answers = run(gw, lambda: asyncio.gather(*(gw.complete(MSGS) for _ in range(5))))
+    assert answers == ["Stub answer to: hello"] * 5
+    assert llm_stub.calls == 1
+    assert (gw.calls, gw.coalesced, gw.stats()["inflight"]) == (1, 4, 0)
+
+
+def test_different_requests_are_not_coalesced(stub_gateway):
+    gw = stub_gateway()
+    run(gw, lambda: asyncio.gather(gw.complete(MSGS), gw.complete(MSGS, temperature=0.7),
+                           gw.complete([{"role": "user", "content": "bye"}])))
+    assert llm_stub.calls == 3 and gw.coalesced == 0
+
+
+def test_concurrency_is_bounded_by_the_semaphore(stub_gateway, monkeypatch):
+    monkeypatch.setattr(llm_stub, "DELAY", 0.1)
+    gw = stub_gateway(max_concurrency=2)
+    prompts = [[{"role": "user", "content": f"q{i}"}] for i in range(4)]
+    t0 = time.perf_counter()
+    run(gw, lambda: asyncio.gather(*(gw.complete(m) for m in prompts)))
+    assert time.perf_counter() - t0 >= 0.2  # two rounds of two
+    assert gw.calls == 4 and gw._sem._value == 2
+
+
+def test_timeout_releases_the_semaphore(stub_gateway, monkeypatch):
+    monkeypatch.setattr(llm_stub, "DELAY", 0.5)
+    gw = stub_gateway(max_concurrency=2, timeout=0.05)
+    with pytest.raises(LLMError, match="timed out"):
+        run(gw, lambda: gw.complete(MSGS))
+    assert gw.errors == 1 and gw._sem._value == 2 and gw.stats()["inflight"] == 0
+
+
+def test_one_caller_cancelling_keeps_the_shared_result(stub_gateway, monkeypatch):
+    monkeypatch.setattr(llm_stub, "DELAY", 0.05)
+    gw = stub_gateway()
+
+    async def go():
+        first = asyncio.ensure_future(gw.complete(MSGS))
+        second = asyncio.ensure_future(gw.complete(MSGS))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert run(gw, go) == "Stub answer to: hello"
+    assert llm_stub.calls == 1 and gw._sem._value == 4
+
+
+def test_stream_yields_words_and_releases_the_semaphore(stub_gateway):
+    gw = stub_gateway(max_concurrency=1)
+
+    async def collect():
+        return [t async for t in gw.stream(MSGS)]
+
+    parts = run(gw, collect)
+    assert "".join(parts) == "Stub answer to: hello" and len(parts) == 4
+    assert (gw.streams, gw._sem._value) == (1, 1)
@@ -0,0 +1,16 @@
+# backend/tests/test_screener.py
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from screener import get_universe, router
+
+
+def test_unknown_periods_share_the_default_table():
+    app = FastAPI()
+    app.include_router(router)
+    api = TestClient(app)
+    default = api.get("/api/screen", params={"period": "6mo", "limit": 1000}).json()
+    for period in ("bogus-1", "bogus-2"):
+        out = api.get("/api/screen", params={"period": period, "limit": 1000}).json()
+        assert out == default
+    assert set(get_universe()._tables) == {"6mo"}
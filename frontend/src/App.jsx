@@ -1,6 +1,6 @@
 // frontend/src/App.jsx
 import React, { useEffect, useState, useCallback } from 'react'
-import { fetchCompanies, fetchQuote, fetchHistory } from './api'
+import { fetchCompanies, fetchBatch } from './api'
 import Sidebar from './components/Sidebar'
 import Metrics from './components/Metrics'
 import PriceChart from './components/PriceChart'
@@ -63,14 +63,13 @@ export default function App(){
     )
     const calcPeriod = chooseCalcPeriod(period, needed)
 
-    Promise.all([
-      fetchQuote(selected),
-      fetchHistory(selected, period),     // display range
-      fetchHistory(selected, calcPeriod)  // warm-up calc range
-    ])
-      .then(([q, disp, calc]) => {
-        setQuote(q)
-        setHistory({ display: disp, calc })
+    // One request: quote + display range + warm-up calc range
+    fetchBatch({ symbols: [selected], periods: [period, calcPeriod] })
+      .then(res => {
+        const entry = res.results?.[selected]
+        if (!entry) throw new Error(res.errors?.[selected] || `No data for ${selected}`)
+        setQuote(entry.quote)
+        setHistory({ display: entry.history[period], calc: entry.history[calcPeriod] })
       })
       .catch(err => { console.error(err); setHistory(null) })
   }, [selected, period, settings])
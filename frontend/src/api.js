@@ -76,6 +76,27 @@ export function fetchHistory(symbol, period = "6mo", opts) {
   return request("/history", { params: { symbol, period }, ...opts });
 }
 
+/** Quote + several history periods for several symbols in one round trip */
+export function fetchBatch({ symbols, periods = ["6mo"], includeQuote = true, format }, opts) {
+  return request("/batch", {
+    method: "POST",
+    body: { symbols, periods, include_quote: includeQuote, ...(format ? { format } : {}) },
+    ...opts,
+  });
+}
+
+/**
+ * Live bars over SSE: one `snapshot`, then `bars` events with updated indicators.
+ * Pass { mode: "replay", speed } to step through stored history. Returns a close() function.
+ */
+export function subscribeBars({ symbol, period = "6mo", mode, speed }, { onSnapshot, onBars, onEnd } = {}) {
+  const es = new EventSource(buildURL("/stream", { symbol, period, mode, speed }));
+  es.addEventListener("snapshot", (e) => onSnapshot?.(JSON.parse(e.data)));
+  es.addEventListener("bars", (e) => onBars?.(JSON.parse(e.data)));
+  es.addEventListener("end", (e) => { es.close(); onEnd?.(JSON.parse(e.data)); });
+  return () => es.close();
+}
+
 /** Optional: AI trend classification (backend provides /api/trend_ai) */
 export function fetchTrendAI(symbol, period = "6mo", opts) {
   return request("/trend_ai", { params: { symbol, period }, ...opts });
@@ -90,6 +111,51 @@ export function chat({ message, symbol, period }, opts) {
   });
 }
 
+/**
+ * Streaming chat: POSTs the conversation and reads the SSE reply
+ * (meta → token… → done | error) from the response body, since
+ * EventSource cannot POST. Resolves with the full answer.
+ */
+export async function streamChat({ symbol, period, messages }, { onMeta, onToken, signal } = {}) {
+  const url = buildURL("/chat/stream");
+  const res = await fetch(url, {
+    method: "POST",
+    headers: { "Accept": "text/event-stream", "Content-Type": "application/json" },
+    body: JSON.stringify({ symbol, period, messages }),
+    signal,
+  });
+  if (!res.ok) {
+    const msg = await res.json().catch(() => ({}));
+    throw new Error(`HTTP ${res.status} ${res.statusText} on ${url} → ${msg.detail || "Request failed"}`);
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buf = "";
+  let answer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return answer;
+    buf += value;
+    let end;
+    while ((end = buf.indexOf("\n\n")) >= 0) {
+      const block = buf.slice(0, end);
+      buf = buf.slice(end + 2);
+      let event = "message";
+      let data = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      if (!data) continue;
+      const payload = JSON.parse(data);
+      if (event === "meta") onMeta?.(payload);
+      else if (event === "token") { answer += payload.text; onToken?.(payload.text, answer); }
+      else if (event === "done") { reader.cancel(); return payload.answer; }
+      else if (event === "error") { reader.cancel(); throw new Error(payload.detail); }
+    }
+  }
+}
+
 /** Optional: Summarize pasted news items */
 export function newsSummarize({ symbol, items }, opts) {
   return request("/news_summarize", {
@@ -1,6 +1,6 @@
 // frontend/src/components/Chatbot.jsx
 import React, { useState, useRef, useEffect } from 'react'
-import { chat as chatAPI } from '../api'   // <-- use shared client
+import { streamChat } from '../api'   // <-- use shared client
 
 // Minimal assistant robot icon (inherits currentColor)
 function AssistantIcon({ size = 22 }) {
@@ -45,14 +45,15 @@ export default function Chatbot({ symbol, period }) {
     setLoading(true)
 
     try {
-      // Call backend via shared client (respects VITE_API_URL or Netlify proxy /api)
-      const data = await chatAPI({ message: text, symbol, period })
-      const answer = data?.answer ?? 'No response'
-      setMessages(m => {
-        const c = [...m, { role: 'assistant', content: answer }]
-        if (!open) setHasUnread(true)
-        return c
-      })
+      // Stream the answer into a new bubble as tokens arrive (respects VITE_API_URL or Netlify proxy /api)
+      const at = nextMsgs.length
+      const show = (content) => setMessages(m => [...m.slice(0, at), { role: 'assistant', content }])
+      const answer = await streamChat(
+        { symbol, period, messages: nextMsgs.slice(1) },   // skip the greeting
+        { onToken: (_, soFar) => { setLoading(false); show(soFar) } },
+      )
+      show(answer || 'No response')
+      if (!open) setHasUnread(true)
     } catch (e) {
       setMessages(m => [...m, { role: 'assistant', content: `Error: ${e.message || 'chat API failed'}` }])
       if (!open) setHasUnread(true)